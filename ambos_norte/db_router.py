@@ -0,0 +1,94 @@
+"""
+Ruteo de lecturas analíticas a una réplica de solo lectura
+
+Las lecturas pesadas (dashboards, reportes, métricas) se envían al alias
+`replica` cuando está configurado (DB_REPLICA_HOST). Si en el mismo request
+hubo una escritura, las lecturas siguientes vuelven a `default` para leer lo
+recién escrito (sticky). Sin réplica configurada todo va a `default`.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+ALIAS_REPLICA = 'replica'
+
+_estado = ContextVar('estado_replica', default=None)
+
+
+class _EstadoLecturas:
+    __slots__ = ('sticky', 'escritura')
+
+    def __init__(self, sticky):
+        self.sticky = sticky
+        self.escritura = False
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+@contextmanager
+def lecturas_en_replica(sticky=True):
+    """
+    Envía las lecturas del bloque a la réplica (context manager o decorador)
+
+    Con sticky=False las lecturas siguen en la réplica aunque haya escrituras,
+    útil en comandos que solo escriben datos derivados (métricas).
+    """
+    token = _estado.set(_EstadoLecturas(sticky))
+    try:
+        yield
+    finally:
+        _estado.reset(token)
+
+
+class ReplicaRouter:
+    """Router de lecturas: réplica dentro de `lecturas_en_replica`, default en el resto"""
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or not replica_configurada():
+            return None
+        if estado.sticky and estado.escritura:
+            return None
+        # Dentro de una transacción se lee de la misma conexión que escribe
+        if connections['default'].in_atomic_block:
+            return None
+        return ALIAS_REPLICA
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escritura = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La réplica contiene los mismos datos que default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != ALIAS_REPLICA
+
+
+class LecturasReplicaMiddleware:
+    """
+    Activa las lecturas en réplica para GET/HEAD en las rutas analíticas
+    configuradas en DB_REPLICA_RUTAS
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rutas = tuple(getattr(settings, 'DB_REPLICA_RUTAS', ()))
+
+    def __call__(self, request):
+        if (
+            request.method in ('GET', 'HEAD')
+            and self.rutas
+            and request.path.startswith(self.rutas)
+            and replica_configurada()
+        ):
+            with lecturas_en_replica():
+                return self.get_response(request)
+        return self.get_response(request)
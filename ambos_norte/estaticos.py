@@ -0,0 +1,213 @@
+"""
+Servido de archivos estáticos y media en producción
+
+- ManifestComprimidoStorage: nombres con hash (manifest) y versiones .gz/.br
+  generadas en collectstatic.
+- servir_estatico / servir_media: respuestas con ETag, Last-Modified,
+  rangos (206) y Cache-Control inmutable para los nombres que nunca cambian
+  de contenido (estáticos con hash y media por contenido).
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Extensiones que vale la pena comprimir (las imágenes ya vienen comprimidas)
+EXTENSIONES_COMPRIMIBLES = ('.css', '.js', '.mjs', '.map', '.svg', '.html', '.txt', '.json', '.xml', '.ico')
+TAMANO_MINIMO_COMPRESION = 256
+
+CACHE_INMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_ESTATICO = 'public, max-age=3600'
+CACHE_MEDIA = 'public, max-age=86400'
+
+# ManifestStaticFilesStorage agrega 12 caracteres hexadecimales antes de la extensión
+PATRON_HASH_ESTATICO = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Prefijos de media cuyo nombre depende del contenido (ver apps.catalogo.storage)
+PREFIJOS_MEDIA_INMUTABLE = ('contenido/', 'derivados/contenido/')
+
+TAMANO_BLOQUE = 64 * 1024
+
+
+class ManifestComprimidoStorage(ManifestStaticFilesStorage):
+    """Manifest con hash + copias precomprimidas gzip (y brotli si está instalado)"""
+
+    # Si falta una entrada en el manifest se usa el nombre original en lugar de fallar
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        procesados = set()
+        for original, procesado, modificado in super().post_process(paths, dry_run, **options):
+            if procesado and not isinstance(procesado, Exception):
+                procesados.add(procesado)
+            yield original, procesado, modificado
+
+        if dry_run:
+            return
+
+        for nombre in procesados:
+            if nombre.endswith(EXTENSIONES_COMPRIMIBLES):
+                self._comprimir(nombre)
+
+    def _comprimir(self, nombre):
+        ruta = self.path(nombre)
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        if len(contenido) < TAMANO_MINIMO_COMPRESION:
+            return
+
+        versiones = [('.gz', gzip.compress(contenido, compresslevel=9, mtime=0))]
+        if BROTLI_AVAILABLE:
+            versiones.append(('.br', brotli.compress(contenido, quality=11)))
+
+        for extension, comprimido in versiones:
+            if len(comprimido) < len(contenido):
+                with open(ruta + extension, 'wb') as archivo:
+                    archivo.write(comprimido)
+
+
+@require_safe
+def servir_estatico(request, ruta):
+    inmutable = bool(PATRON_HASH_ESTATICO.search(ruta))
+    return _servir(request, ruta, settings.STATIC_ROOT, CACHE_INMUTABLE if inmutable else CACHE_ESTATICO, comprimidos=True)
+
+
+@require_safe
+def servir_media(request, ruta):
+    inmutable = ruta.startswith(PREFIJOS_MEDIA_INMUTABLE)
+    return _servir(request, ruta, settings.MEDIA_ROOT, CACHE_INMUTABLE if inmutable else CACHE_MEDIA)
+
+
+def _servir(request, ruta, raiz, cache_control, comprimidos=False):
+    try:
+        completa = safe_join(raiz, ruta)
+    except SuspiciousFileOperation:
+        raise Http404('Archivo no encontrado')
+    if not os.path.isfile(completa):
+        raise Http404('Archivo no encontrado')
+
+    tipo, _ = mimetypes.guess_type(completa)
+    tipo = tipo or 'application/octet-stream'
+
+    # Los rangos se sirven siempre sobre el archivo sin comprimir
+    rango = request.headers.get('Range')
+    codificacion = None
+    if comprimidos and not rango:
+        completa, codificacion = _elegir_comprimido(request, completa)
+
+    # Cada representación (br/gzip/original) tiene su propio ETag
+    estado = os.stat(completa)
+    etag = f'"{int(estado.st_mtime):x}-{estado.st_size:x}"'
+    ultima_modificacion = http_date(estado.st_mtime)
+
+    if _no_modificado(request, etag, estado.st_mtime):
+        respuesta = HttpResponseNotModified()
+        _cabeceras(respuesta, etag, ultima_modificacion, cache_control, comprimidos)
+        return respuesta
+
+    if rango and _if_range_vigente(request, etag, estado.st_mtime):
+        respuesta = _respuesta_rango(completa, rango, estado.st_size, tipo)
+        if respuesta is not None:
+            _cabeceras(respuesta, etag, ultima_modificacion, cache_control, comprimidos)
+            return respuesta
+
+    respuesta = FileResponse(open(completa, 'rb'), content_type=tipo)
+    if codificacion:
+        respuesta.headers['Content-Encoding'] = codificacion
+    _cabeceras(respuesta, etag, ultima_modificacion, cache_control, comprimidos)
+    return respuesta
+
+
+def _cabeceras(respuesta, etag, ultima_modificacion, cache_control, comprimidos):
+    respuesta.headers['ETag'] = etag
+    respuesta.headers['Last-Modified'] = ultima_modificacion
+    respuesta.headers['Cache-Control'] = cache_control
+    respuesta.headers['Accept-Ranges'] = 'bytes'
+    if comprimidos:
+        respuesta.headers['Vary'] = 'Accept-Encoding'
+
+
+def _no_modificado(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etiquetas = [e.strip().removeprefix('W/') for e in if_none_match.split(',')]
+        return '*' in etiquetas or etag in etiquetas
+
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return if_modified_since is not None and int(mtime) <= if_modified_since
+
+
+def _if_range_vigente(request, etag, mtime):
+    """Sin If-Range o si coincide con la versión actual se responde el rango"""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    fecha = parse_http_date_safe(if_range)
+    return fecha is not None and int(mtime) <= fecha
+
+
+def _respuesta_rango(completa, rango, tamano, tipo):
+    """
+    Responde un único rango `bytes=inicio-fin` con 206
+
+    Retorna None si el header no es un rango simple (se sirve el archivo completo).
+    """
+    coincidencia = re.fullmatch(r'bytes=(\d*)-(\d*)', rango.strip())
+    if not coincidencia or coincidencia.groups() == ('', ''):
+        return None
+
+    inicio, fin = coincidencia.groups()
+    if inicio == '':
+        # Sufijo: los últimos N bytes
+        largo = min(int(fin), tamano)
+        inicio, fin = tamano - largo, tamano - 1
+    else:
+        inicio = int(inicio)
+        fin = min(int(fin), tamano - 1) if fin else tamano - 1
+
+    if inicio >= tamano or inicio > fin:
+        respuesta = HttpResponse(status=416)
+        respuesta.headers['Content-Range'] = f'bytes */{tamano}'
+        return respuesta
+
+    largo = fin - inicio + 1
+    respuesta = StreamingHttpResponse(_leer_rango(completa, inicio, largo), status=206, content_type=tipo)
+    respuesta.headers['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+    respuesta.headers['Content-Length'] = str(largo)
+    return respuesta
+
+
+def _leer_rango(completa, inicio, largo):
+    with open(completa, 'rb') as archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def _elegir_comprimido(request, completa):
+    """Usa la versión .br/.gz generada en collectstatic si el cliente la acepta"""
+    aceptadas = request.headers.get('Accept-Encoding', '')
+    for codificacion, extension in (('br', '.br'), ('gzip', '.gz')):
+        if codificacion in aceptadas and os.path.isfile(completa + extension):
+            return completa + extension, codificacion
+    return completa, None
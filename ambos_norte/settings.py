@@ -13,6 +13,7 @@ import os
 import sys
 from pathlib import Path
 from decouple import config
+from corsheaders.defaults import default_headers
 #import mercadopago
 """
 import pymysql
@@ -32,7 +33,7 @@ sys.path.insert(0, os.path.join(BASE_DIR, 'apps'))
 SECRET_KEY = config('DJANGO_SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = config('DEBUG')
+DEBUG = config('DEBUG', default=False, cast=bool)
 
 ALLOWED_HOSTS = [
     "ambosbackend-production.up.railway.app",
@@ -68,6 +69,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'ambos_norte.db_router.LecturasReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -75,6 +77,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.analytics.middleware.AnalyticsMiddleware',
 ]
 
 ROOT_URLCONF = 'ambos_norte.urls'
@@ -113,9 +116,83 @@ DATABASES = {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
         },
+        # Conexiones persistentes: reutilizar la conexión entre requests evita
+        # el handshake TCP/TLS con MySQL en cada request. Los health checks
+        # descartan conexiones caídas antes de reutilizarlas.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
     }
 }
 
+# Modo de despliegue: 'wsgi' (gunicorn sync/gthread) o 'asgi' (gunicorn + uvicorn)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+# Pool de conexiones opcional (pip install django-db-connection-pool[mysql])
+# El tamaño del pool es por proceso de gunicorn y depende del tipo de worker:
+# un worker sync atiende un request a la vez, gthread uno por hilo y los
+# workers async (uvicorn) varios en simultáneo.
+GUNICORN_WORKER_CLASS = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+GUNICORN_THREADS = int(os.environ.get('GUNICORN_THREADS', 1))
+
+DB_POOL_SIZES = {
+    'sync': 1,
+    'gthread': GUNICORN_THREADS,
+    'uvicorn': 10,
+    'gevent': 10,
+    'eventlet': 10,
+}
+
+# Conexiones persistentes solo con workers sync/gthread (un hilo fijo por
+# request). Bajo ASGI cada request usa un hilo/contexto distinto y las
+# conexiones quedarían abiertas sin reutilizarse: Django recomienda CONN_MAX_AGE=0
+if SERVER_MODE == 'asgi' or GUNICORN_WORKER_CLASS not in ('sync', 'gthread'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+DB_POOL = os.environ.get('DB_POOL', 'false').lower() == 'true'
+
+if DB_POOL:
+    from importlib.util import find_spec
+
+    if find_spec('dj_db_conn_pool'):
+        DATABASES['default']['ENGINE'] = 'dj_db_conn_pool.backends.mysql'
+        # El pool administra la vida de las conexiones
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['POOL_OPTIONS'] = {
+            'POOL_SIZE': int(os.environ.get(
+                'DB_POOL_SIZE',
+                DB_POOL_SIZES.get(GUNICORN_WORKER_CLASS.split('.')[0].lower(), 5)
+            )),
+            'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 2)),
+            'RECYCLE': int(os.environ.get('DB_POOL_RECYCLE', 300)),
+            'PRE_PING': True,
+        }
+    else:
+        print('DB_POOL=true pero django-db-connection-pool no está instalado; se usan conexiones persistentes')
+
+# Réplica de solo lectura opcional para dashboards y reportes
+if os.environ.get('DB_REPLICA_HOST'):
+    import copy
+
+    DATABASES['replica'] = copy.deepcopy(DATABASES['default'])
+    DATABASES['replica'].update({
+        'HOST': os.environ.get('DB_REPLICA_HOST'),
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    })
+
+DATABASE_ROUTERS = ['ambos_norte.db_router.ReplicaRouter']
+
+# Rutas cuyas lecturas (GET) van a la réplica
+DB_REPLICA_RUTAS = (
+    '/dashboard/',
+    '/api/analytics/reportes/',
+    '/api/analytics/metricas-productos/',
+    '/api/analytics/metricas-diarias/',
+    '/api/analytics/eventos/',
+)
+
 # Modelo de usuario personalizado
 AUTH_USER_MODEL = 'usuarios.Usuario'
 
@@ -137,6 +214,54 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Login por email (una sola consulta) y, como respaldo, por username
+AUTHENTICATION_BACKENDS = [
+    'apps.usuarios.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Hasher preferido: 'pbkdf2' (iteraciones ajustables) o 'argon2' (requiere argon2-cffi).
+# Los hashes con otro hasher o con otras iteraciones se rehashean al iniciar sesión.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2').lower()
+PASSWORD_PBKDF2_ITERACIONES = int(os.environ.get('PASSWORD_PBKDF2_ITERACIONES', 1_000_000))
+
+if PASSWORD_HASHER == 'argon2':
+    from importlib.util import find_spec
+
+    if not find_spec('argon2'):
+        print('PASSWORD_HASHER=argon2 pero argon2-cffi no está instalado; se usa pbkdf2')
+        PASSWORD_HASHER = 'pbkdf2'
+
+PASSWORD_HASHERS = [
+    'apps.usuarios.hashers.PBKDF2IteracionesHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if PASSWORD_HASHER == 'argon2':
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(2))
+
+# Segundos entre escrituras agrupadas de last_login (apps.usuarios.ultimo_acceso)
+ULTIMO_ACCESO_INTERVALO = int(os.environ.get('ULTIMO_ACCESO_INTERVALO', 60))
+
+# Tracking automático (apps.analytics.middleware): view_name -> tipo de evento
+ANALYTICS_VISTAS_TRACKEADAS = {
+    'producto-detail': 'vista_producto',
+}
+# Eventos encolados que se guardan por lotes (apps.analytics.cola)
+ANALYTICS_COLA_INTERVALO = int(os.environ.get('ANALYTICS_COLA_INTERVALO', 10))  # segundos
+ANALYTICS_COLA_MAXIMO = int(os.environ.get('ANALYTICS_COLA_MAXIMO', 1000))
+# Filtros de eventos de alto volumen (apps.analytics.politicas)
+ANALYTICS_DEDUP_SEGUNDOS = int(os.environ.get('ANALYTICS_DEDUP_SEGUNDOS', 30 * 60))
+ANALYTICS_DEDUP_MAXIMO = int(os.environ.get('ANALYTICS_DEDUP_MAXIMO', 50000))
+# Tasa de muestreo por tipo de evento (1 = todos); las métricas suman el peso 1/tasa
+ANALYTICS_MUESTREO = {
+    'vista_producto': float(os.environ.get('ANALYTICS_MUESTREO_VISTAS', 1.0)),
+}
+# Archivo Parquet de eventos vencidos (apps.analytics.archivo, requiere pyarrow)
+ANALYTICS_ARCHIVO_DIR = os.environ.get('ANALYTICS_ARCHIVO_DIR', str(BASE_DIR / 'archivo_analytics'))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -154,19 +279,95 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# collectstatic genera nombres con hash y copias .gz/.br (ver ambos_norte/estaticos.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'ambos_norte.estaticos.ManifestComprimidoStorage',
+    },
+}
+
+# Servir estáticos y media desde Django (con caché inmutable y rangos)
+# cuando no hay un servidor web/CDN delante
+SERVIR_ARCHIVOS = os.environ.get('SERVIR_ARCHIVOS', 'true').lower() == 'true'
+
+# Miniaturas de imágenes de productos (anchos en px) y hilos que las generan
+IMAGENES_TAMANOS = (150, 320, 640)
+IMAGENES_WORKERS = int(os.environ.get('IMAGENES_WORKERS', 2))
+
+# Hilos que procesan las notificaciones de pago recibidas por el webhook
+PAGOS_WORKERS = int(os.environ.get('PAGOS_WORKERS', 2))
+
+# Cache: Redis si hay REDIS_URL (compartida entre workers), si no memoria local
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        # Sin Redis los carritos van a disco para que todos los workers los vean.
+        # Al pasar MAX_ENTRIES se borran carritos al azar: tiene que alcanzar
+        # para los carritos anónimos creados durante CARRITO_SESION_TTL
+        'carritos': {
+            'BACKEND': 'apps.carrito.cache.FileBasedCacheAtomica',
+            'LOCATION': os.environ.get('CARRITO_SESION_DIR', '/tmp/ambos_norte_carritos'),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('CARRITO_SESION_MAXIMO', 50000)),
+            },
+        },
+        # Versión del catálogo: la tienen que ver todos los workers
+        'catalogo': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CATALOGO_VERSION_DIR', '/tmp/ambos_norte_catalogo'),
+        },
+    }
+
+# Carritos anónimos en cache (ver apps.carrito.almacen)
+CARRITO_SESION_CACHE = 'carritos' if 'carritos' in CACHES else 'default'
+CARRITO_SESION_TTL = int(os.environ.get('CARRITO_SESION_TTL', 60 * 60 * 24 * 7))  # segundos
+
+# Versión del catálogo y registro de cambios (ver apps.catalogo.versionado)
+CATALOGO_VERSION_CACHE = 'catalogo' if 'catalogo' in CACHES else 'default'
+
+# Servir el listado público de productos desde una copia en memoria del
+# catálogo, reconstruida al cambiar la versión (ver apps.catalogo.snapshot)
+CATALOGO_SNAPSHOT = os.environ.get('CATALOGO_SNAPSHOT', 'false').lower() == 'true'
+
+# Segundos que se cachean las estadísticas del panel
+PEDIDOS_ESTADISTICAS_TTL = int(os.environ.get('PEDIDOS_ESTADISTICAS_TTL', 30))
+
+# Segundos que se cachea el reporte de cohortes (apps.analytics.cohortes)
+ANALYTICS_COHORTES_TTL = int(os.environ.get('ANALYTICS_COHORTES_TTL', 60 * 60))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CORS_ALLOW_ALL_ORIGINS = True
+# El frontend está en otro origen y no manda cookies (sin credenciales):
+# el carrito anónimo y analytics identifican al visitante con el header
+# X-Session-ID (apps.carrito.almacen), que el preflight tiene que aceptar
+CORS_ALLOW_HEADERS = (*default_headers, 'x-session-id')
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Arma request.user desde los claims del token, sin consultar la base
+        'apps.usuarios.autenticacion.JWTClaimsAuthentication',
     ),
 }
 
@@ -183,7 +384,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': False,
-    'UPDATE_LAST_LOGIN': True,
+    # last_login se guarda agrupado (apps.usuarios.ultimo_acceso), no en cada token
+    'UPDATE_LAST_LOGIN': False,
     
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -195,6 +397,12 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    # Al renovar se releen los claims del usuario (apps.usuarios.autenticacion)
+    'TOKEN_REFRESH_SERIALIZER': 'apps.usuarios.autenticacion.TokenRefreshClaimsSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
     'JTI_CLAIM': 'jti',
-}
\ No newline at end of file
+}
+
+# Índice local de sugerencias de búsqueda (apps.search_insights.indice)
+SUGERENCIAS_INTERVALO_ACTUALIZACION = int(os.environ.get('SUGERENCIAS_INTERVALO_ACTUALIZACION', 60))  # segundos
+SUGERENCIAS_MIN_BUSQUEDAS = int(os.environ.get('SUGERENCIAS_MIN_BUSQUEDAS', 2))
\ No newline at end of file
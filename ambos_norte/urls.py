@@ -14,10 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
+from ambos_norte.estaticos import servir_estatico, servir_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -34,5 +37,10 @@ urlpatterns = [
 
 ]
 
-if settings.DEBUG:
+if settings.SERVIR_ARCHIVOS:
+    urlpatterns += [
+        re_path(r'^%s/(?P<ruta>.+)$' % re.escape(settings.STATIC_URL.strip('/')), servir_estatico),
+        re_path(r'^%s/(?P<ruta>.+)$' % re.escape(settings.MEDIA_URL.strip('/')), servir_media),
+    ]
+elif settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
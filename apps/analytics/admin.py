@@ -1,8 +1,11 @@
 from django.contrib import admin
 from .models import (
     EventoUsuario,
+    BusquedaRegistrada,
     MetricaProducto,
     MetricaDiaria,
+    CarritoAbandonado,
+    RecomendacionProducto,
     ConfiguracionGoogleAnalytics,
     DatosGoogleAnalytics
 )
@@ -31,6 +34,15 @@ class EventoUsuarioAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(BusquedaRegistrada)
+class BusquedaRegistradaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'consulta', 'resultados', 'usuario', 'timestamp']
+    list_filter = ['timestamp']
+    search_fields = ['consulta_normalizada', 'session_id']
+    readonly_fields = ['evento', 'timestamp']
+    date_hierarchy = 'timestamp'
+
+
 @admin.register(MetricaProducto)
 class MetricaProductoAdmin(admin.ModelAdmin):
     list_display = [
@@ -116,6 +128,23 @@ class MetricaDiariaAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(CarritoAbandonado)
+class CarritoAbandonadoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'carrito', 'usuario', 'total_items', 'valor', 'estado', 'ultima_actividad']
+    list_filter = ['estado', 'ultima_actividad']
+    search_fields = ['usuario__username', 'usuario__email', 'session_id']
+    readonly_fields = ['fecha_deteccion', 'fecha_recuperacion']
+    date_hierarchy = 'ultima_actividad'
+
+
+@admin.register(RecomendacionProducto)
+class RecomendacionProductoAdmin(admin.ModelAdmin):
+    list_display = ['producto', 'posicion', 'recomendado', 'puntaje', 'compras', 'vistas', 'fecha_actualizacion']
+    search_fields = ['producto__nombre', 'recomendado__nombre']
+    raw_id_fields = ['producto', 'recomendado']
+    readonly_fields = ['fecha_actualizacion']
+
+
 @admin.register(ConfiguracionGoogleAnalytics)
 class ConfiguracionGoogleAnalyticsAdmin(admin.ModelAdmin):
     list_display = ['activo', 'property_id', 'ultima_sincronizacion']
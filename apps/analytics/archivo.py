@@ -0,0 +1,203 @@
+"""
+Archivo columnar (Parquet) de eventos vencidos
+
+limpiar_eventos_antiguos exporta los EventoUsuario que salen de la
+retención a archivos Parquet comprimidos (zstd) antes de borrarlos, uno
+por lote y particionados por mes:
+
+    ANALYTICS_ARCHIVO_DIR/eventos/mes=2024-01/eventos-<id_min>-<id_max>.parquet
+
+Las consultas leen solo las columnas y los meses pedidos (el mes es la
+partición, no se abren los archivos de otros meses) y agrupan con
+pyarrow.compute, sin pasar fila por fila por Python.
+
+pyarrow es opcional (pip install pyarrow): sin él no se archiva y
+limpiar_eventos_antiguos no borra salvo --sin-archivar.
+"""
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+TAMANO_LOTE = 50000
+
+CAMPOS = [
+    'id', 'timestamp', 'tipo_evento', 'usuario_id', 'session_id', 'producto_id',
+    'categoria_id', 'pedido_id', 'valor_monetario', 'metadata', 'ip_address',
+    'user_agent', 'peso',
+]
+
+
+def _esquema():
+    return pa.schema([
+        ('id', pa.int64()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('tipo_evento', pa.string()),
+        ('usuario_id', pa.int64()),
+        ('session_id', pa.string()),
+        ('producto_id', pa.int64()),
+        ('categoria_id', pa.int64()),
+        ('pedido_id', pa.int64()),
+        ('valor_monetario', pa.float64()),
+        ('metadata', pa.string()),  # JSON
+        ('ip_address', pa.string()),
+        ('user_agent', pa.string()),
+        ('peso', pa.float64()),
+    ])
+
+
+def directorio():
+    return Path(settings.ANALYTICS_ARCHIVO_DIR) / 'eventos'
+
+
+def _verificar_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError('pyarrow no está instalado. Ejecutar: pip install pyarrow')
+
+
+# ==================== EXPORTACIÓN ====================
+
+def archivar_eventos(hasta, tamano_lote=TAMANO_LOTE, borrar=True):
+    """
+    Exporta los eventos anteriores a `hasta` y (si borrar) los elimina
+
+    Cada lote se escribe y recién después se borra de la base, así un corte
+    a mitad de camino no pierde eventos (a lo sumo repite el último lote).
+    Retorna {mes: eventos archivados}.
+    """
+    from .models import EventoUsuario
+
+    _verificar_pyarrow()
+    esquema = _esquema()
+    por_mes = {}
+    ultimo_id = 0
+
+    while True:
+        filas = list(
+            EventoUsuario.objects.filter(timestamp__lt=hasta, id__gt=ultimo_id)
+            .order_by('id')
+            .values_list(*CAMPOS)[:tamano_lote]
+        )
+        if not filas:
+            break
+
+        meses = {}
+        for fila in filas:
+            mes = timezone.localtime(fila[1]).strftime('%Y-%m')
+            meses.setdefault(mes, []).append(fila)
+
+        for mes, filas_mes in meses.items():
+            columnas = list(zip(*filas_mes))
+            columnas[8] = [float(v) if v is not None else None for v in columnas[8]]
+            columnas[9] = [json.dumps(v, ensure_ascii=False) if v else None for v in columnas[9]]
+            tabla = pa.Table.from_arrays(
+                [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+                schema=esquema,
+            )
+            _escribir(tabla, mes, filas_mes[0][0], filas_mes[-1][0])
+            por_mes[mes] = por_mes.get(mes, 0) + len(filas_mes)
+
+        primero, ultimo_id = filas[0][0], filas[-1][0]
+        if borrar:
+            EventoUsuario.objects.filter(
+                id__gte=primero, id__lte=ultimo_id, timestamp__lt=hasta
+            ).delete()
+
+    return por_mes
+
+
+def _escribir(tabla, mes, id_min, id_max):
+    carpeta = directorio() / f'mes={mes}'
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ruta = carpeta / f'eventos-{id_min}-{id_max}.parquet'
+    # Prefijo '_': el dataset lo ignora mientras se escribe
+    temporal = carpeta / f'_{ruta.name}.tmp'
+    pq.write_table(tabla, temporal, compression='zstd')
+    os.replace(temporal, ruta)
+
+
+# ==================== CONSULTAS ====================
+
+def meses_archivados():
+    """Meses con eventos archivados ('YYYY-MM'), ordenados"""
+    if not directorio().exists():
+        return []
+    return sorted(
+        carpeta.name.split('=', 1)[1]
+        for carpeta in directorio().iterdir()
+        if carpeta.is_dir() and carpeta.name.startswith('mes=')
+    )
+
+
+def leer(meses=None, columnas=None, tipo_evento=None):
+    """
+    Tabla de pyarrow con los eventos archivados
+
+    meses: lista de 'YYYY-MM' (None = todos); columnas: subconjunto de
+    CAMPOS más 'mes' (None = todas).
+    """
+    _verificar_pyarrow()
+    if not meses_archivados():
+        return pa.Table.from_batches([], schema=_esquema().append(pa.field('mes', pa.string())))
+
+    dataset = ds.dataset(
+        directorio(),
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([('mes', pa.string())]), flavor='hive'),
+    )
+    filtro = None
+    if meses:
+        filtro = ds.field('mes').isin(list(meses))
+    if tipo_evento:
+        condicion = ds.field('tipo_evento') == tipo_evento
+        filtro = condicion if filtro is None else filtro & condicion
+    return dataset.to_table(columns=columnas, filter=filtro)
+
+
+def contar(meses=None, por=None, tipo_evento=None):
+    """
+    Eventos archivados, totales o agrupados
+
+    por: columnas para agrupar (ej: ['mes', 'tipo_evento']); acepta 'dia'.
+    Cada resultado trae 'eventos' (filas) y 'ponderado' (suma de pesos,
+    corrige el muestreo de apps.analytics.politicas).
+    """
+    por = list(por or [])
+    columnas = ['peso'] + [c for c in por if c != 'dia']
+    if 'dia' in por:
+        columnas.append('timestamp')
+    tabla = leer(meses, columnas=list(dict.fromkeys(columnas)), tipo_evento=tipo_evento)
+
+    if not por:
+        return {
+            'eventos': tabla.num_rows,
+            'ponderado': round(pc.sum(tabla['peso']).as_py() or 0),
+        }
+
+    if 'dia' in por:
+        # En la zona horaria local, igual que la partición por mes de archivar_eventos
+        local = tabla['timestamp'].cast(pa.timestamp('us', tz=timezone.get_current_timezone_name()))
+        tabla = tabla.append_column('dia', pc.strftime(local, format='%Y-%m-%d'))
+
+    agrupado = tabla.group_by(por).aggregate([('peso', 'count'), ('peso', 'sum')])
+    filas = agrupado.to_pylist()
+    resultado = [
+        {
+            **{c: fila[c] for c in por},
+            'eventos': fila['peso_count'],
+            'ponderado': round(fila['peso_sum'] or 0),
+        }
+        for fila in filas
+    ]
+    return sorted(resultado, key=lambda f: [str(f[c]) for c in por])
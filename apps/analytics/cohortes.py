@@ -0,0 +1,161 @@
+"""
+Cohortes semanales de registro y retención
+
+Se traen tres juegos de arreglos compactos con values_list (usuarios con su
+fecha de registro, eventos con usuario y fecha, pedidos pagados con
+usuario) y todo el cruce se hace con NumPy: cada evento se convierte en
+(cohorte, semanas desde el registro), se eliminan repetidos por usuario y
+semana y se cuentan con bincount. No hay consultas por usuario.
+
+La actividad de más de 90 días ya no está en EventoUsuario
+(limpiar_eventos_antiguos la archiva): para esos meses se leen las columnas
+usuario_id y timestamp del archivo Parquet (apps.analytics.archivo).
+
+NumPy es opcional (pip install numpy): sin él el reporte no está disponible.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.utils import timezone
+
+from . import archivo
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+SEGUNDOS_SEMANA = 7 * 24 * 60 * 60
+TAMANO_CHUNK = 20000
+
+
+def _arreglos(queryset, campos):
+    """(id, segundos epoch) de un values_list, sin armar una lista intermedia"""
+    tipo = np.dtype([('id', np.int64), ('t', np.float64)])
+    return np.fromiter(
+        ((pk, fecha.timestamp()) for pk, fecha in queryset.values_list(*campos).iterator(chunk_size=TAMANO_CHUNK)),
+        dtype=tipo,
+    )
+
+
+def _actividad_archivada(origen, tipo_evento):
+    """(usuario_id, segundos epoch) de los eventos archivados desde el mes de `origen`"""
+    tipo = np.dtype([('id', np.int64), ('t', np.float64)])
+    if not archivo.PYARROW_AVAILABLE:
+        return np.zeros(0, dtype=tipo)
+    desde = timezone.localtime(origen).strftime('%Y-%m')
+    meses = [mes for mes in archivo.meses_archivados() if mes >= desde]
+    if not meses:
+        return np.zeros(0, dtype=tipo)
+
+    tabla = archivo.leer(meses, columnas=['usuario_id', 'timestamp'], tipo_evento=tipo_evento)
+    tabla = tabla.filter(tabla['usuario_id'].is_valid())
+    resultado = np.zeros(tabla.num_rows, dtype=tipo)
+    resultado['id'] = tabla['usuario_id'].to_numpy()
+    # timestamp[us, UTC] -> segundos epoch, igual que datetime.timestamp()
+    resultado['t'] = tabla['timestamp'].cast('int64').to_numpy() / 1_000_000
+    return resultado
+
+
+def calcular_cohortes(semanas=12, tipo_evento=None):
+    """
+    Retención de las últimas `semanas` cohortes de registro
+
+    Para cada cohorte (semana de registro, de lunes a domingo): usuarios,
+    porcentaje activo en cada semana desde el registro (None si esa semana
+    todavía no terminó), compradores y tasa de recompra (compradores con
+    2+ pedidos pagados / compradores). tipo_evento limita qué eventos
+    cuentan como actividad.
+    """
+    from apps.pedidos.models import Pedido
+    from .models import EventoUsuario
+
+    Usuario = get_user_model()
+    ahora = timezone.now()
+    hoy = timezone.localtime(ahora).replace(hour=0, minute=0, second=0, microsecond=0)
+    origen = hoy - timedelta(days=hoy.weekday() + 7 * (semanas - 1))
+    t_origen = origen.timestamp()
+    t_ahora = ahora.timestamp()
+
+    # ==================== USUARIOS ====================
+    usuarios = _arreglos(
+        Usuario.objects.filter(fecha_registro__gte=origen).order_by('id'),
+        ('id', 'fecha_registro'),
+    )
+    ids = usuarios['id']
+    registro = usuarios['t']
+    cohorte = ((registro - t_origen) // SEGUNDOS_SEMANA).astype(np.int64)
+    tamanos = np.bincount(cohorte, minlength=semanas)
+
+    def posiciones(usuario_ids):
+        """Posición de cada usuario_id en `ids` (-1 si no es de ninguna cohorte)"""
+        pos = np.searchsorted(ids, usuario_ids)
+        pos[pos >= len(ids)] = 0
+        encontrados = len(ids) > 0 and ids[pos] == usuario_ids
+        return np.where(encontrados, pos, -1)
+
+    # ==================== ACTIVIDAD ====================
+    eventos = EventoUsuario.objects.filter(
+        usuario__fecha_registro__gte=origen, timestamp__gte=origen
+    ).order_by()
+    if tipo_evento:
+        eventos = eventos.filter(tipo_evento=tipo_evento)
+    archivada = _actividad_archivada(origen, tipo_evento)
+    # Un lote archivado puede seguir en la base si el borrado se cortó: los
+    # repetidos se descartan abajo (un usuario cuenta una vez por semana)
+    actividad = np.concatenate([_arreglos(eventos, ('usuario_id', 'timestamp')), archivada])
+
+    activos = np.zeros((semanas, semanas), dtype=np.int64)
+    pos = posiciones(actividad['id'])
+    validos = pos >= 0
+    pos = pos[validos]
+    semana = ((actividad['t'][validos] - registro[pos]) // SEGUNDOS_SEMANA).astype(np.int64)
+    en_rango = (semana >= 0) & (semana < semanas)
+    # Un usuario activo cuenta una sola vez por semana
+    pares = np.unique(pos[en_rango] * semanas + semana[en_rango])
+    np.add.at(activos, (cohorte[pares // semanas], pares % semanas), 1)
+
+    # ==================== COMPRAS ====================
+    pedidos = _arreglos(
+        Pedido.objects.filter(
+            Q(estado_pago='pagado') | Q(estado='entregado'),
+            usuario__fecha_registro__gte=origen,
+        ).order_by(),
+        ('usuario_id', 'fecha_pedido'),
+    )
+    pos = posiciones(pedidos['id'])
+    por_usuario = np.bincount(pos[pos >= 0], minlength=len(ids))
+    compradores = np.bincount(cohorte, weights=por_usuario >= 1, minlength=semanas).astype(np.int64)
+    recompradores = np.bincount(cohorte, weights=por_usuario >= 2, minlength=semanas).astype(np.int64)
+
+    # ==================== RESULTADO ====================
+    resultado = []
+    for c in range(semanas):
+        usuarios_cohorte = int(tamanos[c])
+        compradores_cohorte = int(compradores[c])
+        inicio = origen + timedelta(weeks=c)
+        # Semanas terminadas para todos (también el último registrado de la cohorte)
+        semanas_cumplidas = int((t_ahora - inicio.timestamp()) // SEGUNDOS_SEMANA) - 1
+        retencion = [
+            round(int(activos[c, s]) * 100 / usuarios_cohorte, 2) if usuarios_cohorte and s < semanas_cumplidas else None
+            for s in range(semanas)
+        ]
+        resultado.append({
+            'semana': inicio.date().isoformat(),
+            'usuarios': usuarios_cohorte,
+            'retencion': retencion,
+            'compradores': compradores_cohorte,
+            'tasa_compra': round(compradores_cohorte * 100 / usuarios_cohorte, 2) if usuarios_cohorte else 0,
+            'tasa_recompra': round(int(recompradores[c]) * 100 / compradores_cohorte, 2) if compradores_cohorte else 0,
+        })
+
+    return {
+        'semanas': semanas,
+        'tipo_evento': tipo_evento,
+        'cohortes': resultado,
+        'eventos_procesados': int(len(actividad)),
+        'eventos_archivados': int(len(archivada)),
+        'generado': ahora.isoformat(),
+    }
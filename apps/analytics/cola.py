@@ -0,0 +1,91 @@
+"""
+Cola en memoria de eventos de analytics
+
+El middleware no escribe en la request: encola el evento y un hilo los
+guarda cada ANALYTICS_COLA_INTERVALO segundos (o al juntar
+ANALYTICS_COLA_MAXIMO) con un bulk_create. Las categorías de los productos
+vistos se resuelven con una sola consulta por lote. Al terminar el proceso
+se guarda lo pendiente.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+
+_pendientes = []
+_lock = threading.Lock()
+_despertar = threading.Event()
+_hilo = None
+
+
+def _maximo():
+    return getattr(settings, 'ANALYTICS_COLA_MAXIMO', 1000)
+
+
+def encolar_evento(**datos):
+    """Encola un EventoUsuario (mismos argumentos que EventoUsuario(...))"""
+    global _hilo
+    with _lock:
+        _pendientes.append(datos)
+        lleno = len(_pendientes) >= _maximo()
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_bucle, name='cola-analytics', daemon=True)
+            _hilo.start()
+    if lleno:
+        _despertar.set()
+
+
+def guardar_pendientes():
+    """Guarda los eventos encolados; retorna cuántos guardó"""
+    from apps.catalogo.models import Producto
+    from .models import EventoUsuario
+
+    with _lock:
+        lote = list(_pendientes)
+        _pendientes.clear()
+    if not lote:
+        return 0
+
+    try:
+        # Categoría de cada producto visto (y descarta productos ya borrados)
+        productos = {d['producto_id'] for d in lote if d.get('producto_id')}
+        categorias = dict(
+            Producto.objects.filter(id__in=productos).values_list('id', 'categoria_id')
+        ) if productos else {}
+
+        eventos = []
+        for datos in lote:
+            producto_id = datos.get('producto_id')
+            if producto_id:
+                if producto_id not in categorias:
+                    continue
+                datos.setdefault('categoria_id', categorias[producto_id])
+            eventos.append(EventoUsuario(**datos))
+
+        EventoUsuario.objects.bulk_create(eventos, batch_size=TAMANO_LOTE)
+    except Exception as e:
+        logger.error(f"Error guardando eventos de analytics: {str(e)}")
+        # Se reintentan en la próxima pasada, sin crecer sin límite
+        with _lock:
+            _pendientes[:0] = lote[-_maximo() * 10:]
+        return 0
+    return len(eventos)
+
+
+def _bucle():
+    while True:
+        _despertar.wait(getattr(settings, 'ANALYTICS_COLA_INTERVALO', 10))
+        _despertar.clear()
+        try:
+            guardar_pendientes()
+        finally:
+            connections.close_all()
+
+
+atexit.register(guardar_pendientes)
@@ -1,8 +1,10 @@
 from django.core.management.base import BaseCommand
+from ambos_norte.db_router import lecturas_en_replica
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg
 from datetime import timedelta
 from apps.analytics.models import MetricaProducto, EventoUsuario
+from apps.analytics.politicas import total_ponderado
 from apps.catalogo.models import Producto
 from apps.pedidos.models import ItemPedido
 
@@ -17,6 +19,7 @@ class Command(BaseCommand):
             help='ID de un producto específico a actualizar'
         )
 
+    @lecturas_en_replica(sticky=False)
     def handle(self, *args, **options):
         producto_id = options.get('producto_id')
         
@@ -45,24 +48,25 @@ class Command(BaseCommand):
             
             # ==================== VISTAS ====================
             # Vistas totales
-            metrica.vistas_totales = EventoUsuario.objects.filter(
+            # Suma de pesos: las vistas pueden estar muestreadas
+            metrica.vistas_totales = total_ponderado(EventoUsuario.objects.filter(
                 tipo_evento='vista_producto',
                 producto=producto
-            ).count()
+            ))
             
             # Vistas últimos 7 días
-            metrica.vistas_ultimos_7d = EventoUsuario.objects.filter(
+            metrica.vistas_ultimos_7d = total_ponderado(EventoUsuario.objects.filter(
                 tipo_evento='vista_producto',
                 producto=producto,
                 timestamp__gte=hace_7_dias
-            ).count()
+            ))
             
             # Vistas últimos 30 días
-            metrica.vistas_ultimos_30d = EventoUsuario.objects.filter(
+            metrica.vistas_ultimos_30d = total_ponderado(EventoUsuario.objects.filter(
                 tipo_evento='vista_producto',
                 producto=producto,
                 timestamp__gte=hace_30_dias
-            ).count()
+            ))
             
             # ==================== CARRITO ====================
             metrica.agregados_carrito = EventoUsuario.objects.filter(
@@ -0,0 +1,162 @@
+import io
+import statistics
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from apps.analytics.utils import percentil
+
+
+class Command(BaseCommand):
+    help = 'Compara la latencia de requests con y sin conexiones persistentes a la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='/api/catalogo/categoria/',
+            help='Endpoint público a consultar (por defecto: /api/catalogo/categoria/)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests por modo (por defecto: 200)'
+        )
+        parser.add_argument(
+            '--calentamiento',
+            type=int,
+            default=10,
+            help='Requests previos que no se miden (por defecto: 10)'
+        )
+
+    def handle(self, *args, **options):
+        url = options['url']
+        cantidad = options['requests']
+        calentamiento = options['calentamiento']
+
+        base = connections['default'].settings_dict
+        conn_max_age_original = base.get('CONN_MAX_AGE', 0)
+        health_checks_original = base.get('CONN_HEALTH_CHECKS', False)
+
+        self.stdout.write(self.style.WARNING(
+            f'⏱️  Benchmark de conexiones: {cantidad} requests a {url} '
+            f'({base["ENGINE"].split(".")[-1]})'
+        ))
+
+        # Se usa el WSGIHandler directamente para que request_started y
+        # request_finished cierren o reutilicen conexiones como en gunicorn
+        handler = WSGIHandler()
+
+        conn_max_age = conn_max_age_original or 300
+        modos = [
+            ('Sin persistencia (CONN_MAX_AGE=0)', 0, False),
+            (f'Persistente (CONN_MAX_AGE={conn_max_age}, health checks)', conn_max_age, True),
+        ]
+
+        resultados = []
+        try:
+            for nombre, conn_max_age, health_checks in modos:
+                resultados.append(
+                    (nombre, self._medir(handler, url, cantidad, calentamiento, conn_max_age, health_checks))
+                )
+        finally:
+            base['CONN_MAX_AGE'] = conn_max_age_original
+            base['CONN_HEALTH_CHECKS'] = health_checks_original
+            connections['default'].close()
+
+        self.stdout.write('')
+        for nombre, medicion in resultados:
+            self.stdout.write(self.style.SUCCESS(f'📊 {nombre}'))
+            self.stdout.write(f'   Conexiones abiertas: {medicion["conexiones"]}')
+            self.stdout.write(f'   Errores: {medicion["errores"]}')
+            self.stdout.write(f'   p50: {medicion["p50"]:.2f} ms')
+            self.stdout.write(f'   p95: {medicion["p95"]:.2f} ms')
+            self.stdout.write(f'   p99: {medicion["p99"]:.2f} ms')
+            self.stdout.write(f'   Promedio: {medicion["promedio"]:.2f} ms')
+            self.stdout.write(f'   Requests/seg: {medicion["rps"]:.1f}')
+
+        if len(resultados) == 2 and resultados[0][1]['p50']:
+            mejora = 100 * (1 - resultados[1][1]['p50'] / resultados[0][1]['p50'])
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(f'✅ Diferencia en p50: {mejora:.1f}%'))
+
+    def _medir(self, handler, url, cantidad, calentamiento, conn_max_age, health_checks):
+        conexion = connections['default']
+        conexion.close()
+        conexion.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        conexion.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+
+        abiertas = []
+
+        def contar(sender, connection, **kwargs):
+            abiertas.append(connection.alias)
+
+        for _ in range(calentamiento):
+            self._request(handler, url)
+
+        connection_created.connect(contar)
+        tiempos = []
+        errores = 0
+        try:
+            inicio_total = time.perf_counter()
+            for _ in range(cantidad):
+                inicio = time.perf_counter()
+                status = self._request(handler, url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                if not status.startswith('2'):
+                    errores += 1
+            duracion = time.perf_counter() - inicio_total
+        finally:
+            connection_created.disconnect(contar)
+            conexion.close()
+
+        tiempos.sort()
+        return {
+            'conexiones': len(abiertas),
+            'errores': errores,
+            'p50': percentil(tiempos, 50),
+            'p95': percentil(tiempos, 95),
+            'p99': percentil(tiempos, 99),
+            'promedio': statistics.mean(tiempos) if tiempos else 0,
+            'rps': cantidad / duracion if duracion else 0,
+        }
+
+    def _request(self, handler, url):
+        ruta, _, query = url.partition('?')
+        host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith('.') and h != '*'), 'localhost')
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': ruta,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': host,
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': host,
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(b''),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        estado = {}
+
+        def start_response(status, headers, exc_info=None):
+            estado['status'] = status
+
+        respuesta = handler(environ, start_response)
+        try:
+            for _ in respuesta:
+                pass
+        finally:
+            # close() dispara request_finished (close_old_connections)
+            respuesta.close()
+        return estado.get('status', '500')
@@ -1,9 +1,11 @@
 from django.core.management.base import BaseCommand
+from ambos_norte.db_router import lecturas_en_replica
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg, F
+from django.db.models import Sum, Count, Avg, F, Q
 from datetime import date, timedelta
 from apps.analytics.models import MetricaDiaria, EventoUsuario
-from apps.pedidos.models import Pedido
+from apps.analytics.politicas import total_ponderado
+from apps.pedidos.models import Pedido, ItemPedido
 from apps.carrito.models import Carrito
 from apps.usuarios.models import Usuario
 from apps.catalogo.models import Producto
@@ -19,6 +21,7 @@ class Command(BaseCommand):
             help='Fecha para calcular métricas (formato: YYYY-MM-DD). Por defecto: ayer'
         )
 
+    @lecturas_en_replica(sticky=False)
     def handle(self, *args, **options):
         # Determinar fecha a procesar
         if options['fecha']:
@@ -52,17 +55,18 @@ class Command(BaseCommand):
             fecha_pedido__lte=fin_dia
         )
         
+        # Completados: pagados o ya entregados (efectivo en local)
+        pedidos_completados = pedidos_del_dia.filter(
+            Q(estado_pago='pagado') | Q(estado='entregado')
+        )
+        
         metrica.pedidos_totales = pedidos_del_dia.count()
-        metrica.pedidos_completados = pedidos_del_dia.filter(
-            estado_pedido__in=['pagado', 'entregado']
-        ).count()
+        metrica.pedidos_completados = pedidos_completados.count()
         
         # Calcular ingresos
-        ingresos = pedidos_del_dia.filter(
-            estado_pedido__in=['pagado', 'entregado']
-        ).aggregate(
+        ingresos = pedidos_completados.aggregate(
             bruto=Sum('total'),
-            envio=Sum('costo_envio')
+            envio=Sum(F('total') - F('subtotal'))  # total incluye el envío
         )
         
         metrica.ingreso_bruto = ingresos['bruto'] or 0
@@ -105,30 +109,17 @@ class Command(BaseCommand):
         
         metrica.carritos_creados = carritos_del_dia.count()
         
-        # Carritos abandonados (carritos con items pero sin pedido asociado)
-        carritos_con_items = carritos_del_dia.filter(items__isnull=False).distinct()
-        carritos_con_pedidos = Pedido.objects.filter(
-            fecha_pedido__gte=inicio_dia,
-            fecha_pedido__lte=fin_dia
-        ).values_list('usuario', flat=True)
+        # Carritos abandonados (tabla de detectar_carritos_abandonados): los de
+        # este día se siguen detectando durante --horas y el detector actualiza
+        # estos dos campos cuando los registra
+        metrica.calcular_abandono()
         
-        # Simplificación: carritos que no derivaron en pedido
-        metrica.carritos_abandonados = carritos_con_items.exclude(
-            usuario__in=carritos_con_pedidos
-        ).count()
-        
-        # Tasa de abandono
-        if metrica.carritos_creados > 0:
-            metrica.tasa_abandono = (metrica.carritos_abandonados / metrica.carritos_creados) * 100
-        else:
-            metrica.tasa_abandono = 0
-        
-        # Tasa de conversión (visitas a compras)
-        vistas = EventoUsuario.objects.filter(
+        # Tasa de conversión (visitas a compras; las vistas pueden estar muestreadas)
+        vistas = total_ponderado(EventoUsuario.objects.filter(
             timestamp__gte=inicio_dia,
             timestamp__lte=fin_dia,
             tipo_evento='vista_producto'
-        ).count()
+        ))
         
         compras = EventoUsuario.objects.filter(
             timestamp__gte=inicio_dia,
@@ -143,11 +134,8 @@ class Command(BaseCommand):
         
         # ==================== PRODUCTOS ====================
         # Total de productos vendidos (unidades)
-from apps.pedidos.models import ItemPedido
-        
         items_vendidos = ItemPedido.objects.filter(
-            pedido__in=pedidos_del_dia,
-            pedido__estado_pedido__in=['pagado', 'entregado']
+            pedido__in=pedidos_completados
         ).aggregate(total=Sum('cantidad'))
         
         metrica.productos_vendidos = items_vendidos['total'] or 0
@@ -155,8 +143,7 @@ from apps.pedidos.models import ItemPedido
         # Producto más vendido
         if metrica.productos_vendidos > 0:
             producto_top = ItemPedido.objects.filter(
-                pedido__in=pedidos_del_dia,
-                pedido__estado_pedido__in=['pagado', 'entregado']
+                pedido__in=pedidos_completados
             ).values('producto').annotate(
                 total_vendido=Sum('cantidad')
             ).order_by('-total_vendido').first()
@@ -167,8 +154,7 @@ from apps.pedidos.models import ItemPedido
         # Categoría más vendida
         if metrica.productos_vendidos > 0:
             categoria_top = ItemPedido.objects.filter(
-                pedido__in=pedidos_del_dia,
-                pedido__estado_pedido__in=['pagado', 'entregado']
+                pedido__in=pedidos_completados
             ).values('producto__categoria').annotate(
                 total_vendido=Sum('cantidad')
             ).order_by('-total_vendido').first()
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics import recomendaciones
+
+
+class Command(BaseCommand):
+    help = 'Calcula las recomendaciones por co-ocurrencia en pedidos pagados y sesiones (también compraron / vieron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Sumar solo los pedidos y vistas nuevos desde la última corrida'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=recomendaciones.TOP,
+            help=f'Recomendaciones por producto (por defecto: {recomendaciones.TOP})'
+        )
+        parser.add_argument(
+            '--peso-compra',
+            type=float,
+            default=recomendaciones.PESO_COMPRA,
+            help=f'Cuánto vale un pedido en común frente a una sesión en común (por defecto: {recomendaciones.PESO_COMPRA})'
+        )
+
+    def handle(self, *args, **options):
+        if not recomendaciones.SCIPY_AVAILABLE:
+            raise CommandError('scipy no está instalado. Ejecutar: pip install scipy')
+
+        inicio = time.perf_counter()
+        resumen = recomendaciones.actualizar(
+            incremental=options['incremental'],
+            top=options['top'],
+            peso_compra=options['peso_compra'],
+        )
+
+        if options['incremental'] and not resumen['incremental']:
+            self.stdout.write(self.style.WARNING('⚠️  No había una corrida anterior: se calculó todo'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Recomendaciones actualizadas: {resumen["productos"]} productos, '
+            f'{resumen["recomendaciones"]} recomendaciones'
+        ))
+        self.stdout.write(f'   📦 Pedidos nuevos: {resumen["pedidos"]} | 👀 Sesiones: {resumen["sesiones"]}')
+        self.stdout.write(f'   📊 Pares con compras en común: {resumen["pares_compras"]}')
+        self.stdout.write(f'   📊 Pares vistos en la misma sesión: {resumen["pares_vistas"]}')
+        self.stdout.write(f'   ⏱️  {time.perf_counter() - inicio:.2f} s')
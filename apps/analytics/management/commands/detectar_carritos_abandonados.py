@@ -0,0 +1,193 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.analytics.models import CarritoAbandonado, EventoUsuario, MetricaDiaria, PuntoControlAnalytics
+from apps.carrito.models import Carrito, ItemCarrito
+from apps.pedidos.models import Pedido
+
+PROCESO = 'carritos_abandonados'
+
+
+class Command(BaseCommand):
+    help = 'Detecta carritos abandonados de forma incremental y actualiza la tabla de abandonos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Horas de inactividad para considerar un carrito abandonado (por defecto: 24)'
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Ignorar el punto de control y volver a escanear todos los carritos'
+        )
+
+    def handle(self, *args, **options):
+        ahora = timezone.now()
+        limite = ahora - timedelta(hours=options['horas'])
+
+        punto, _ = PuntoControlAnalytics.objects.get_or_create(proceso=PROCESO)
+        desde = None if options['reiniciar'] else punto.ultima_marca
+
+        if desde and desde >= limite:
+            self.stdout.write(self.style.WARNING(f'⚠️  Nada para procesar: ya se escaneó hasta {desde}'))
+            return
+
+        self.stdout.write(f'Escaneando actividad de carritos entre {desde or "el inicio"} y {limite}')
+
+        # ==================== CANDIDATOS ====================
+        # Dos rangos por índice: carritos modificados e items agregados en la ventana
+        carritos_modificados = Carrito.objects.filter(fecha_modificacion__lte=limite)
+        items_agregados = ItemCarrito.objects.filter(fecha_agregado__lte=limite)
+        if desde:
+            carritos_modificados = carritos_modificados.filter(fecha_modificacion__gt=desde)
+            items_agregados = items_agregados.filter(fecha_agregado__gt=desde)
+
+        candidatos = set(carritos_modificados.values_list('id', flat=True))
+        candidatos.update(items_agregados.order_by().values_list('carrito_id', flat=True).distinct())
+
+        carritos = list(
+            Carrito.objects.filter(id__in=candidatos, activo=True)
+            .annotate(
+                ultimo_item=Max('items__fecha_agregado'),
+                cantidad=Sum('items__cantidad'),
+                valor=Coalesce(
+                    Sum(F('items__cantidad') * F('items__precio_unitario'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                    Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+                ),
+            )
+            .filter(cantidad__gt=0)
+            .values('id', 'usuario_id', 'session_id', 'fecha_creacion', 'fecha_modificacion', 'ultimo_item', 'cantidad', 'valor')
+        )
+        for carrito in carritos:
+            carrito['ultima_actividad'] = max(filter(None, [carrito['fecha_modificacion'], carrito['ultimo_item']]))
+
+        # Con actividad posterior al límite todavía no está inactivo: entra en otra corrida
+        carritos = [c for c in carritos if c['ultima_actividad'] <= limite]
+
+        # ==================== PEDIDOS POR USUARIO O SESIÓN ====================
+        pedidos_por_usuario, pedidos_por_sesion = self._pedidos(carritos)
+
+        existentes = CarritoAbandonado.objects.in_bulk(
+            [c['id'] for c in carritos], field_name='carrito_id'
+        )
+        nuevos = []
+        actualizados = []
+        convertidos = 0
+
+        for carrito in carritos:
+            if carrito['usuario_id']:
+                pedidos = pedidos_por_usuario.get(carrito['usuario_id'], [])
+            else:
+                pedidos = pedidos_por_sesion.get(carrito['session_id'], [])
+            # Convertido si hubo un pedido después de crear el carrito
+            pedido = next((p for p in pedidos if p[1] >= carrito['fecha_creacion']), None)
+
+            registro = existentes.get(carrito['id'])
+            if pedido and registro is None:
+                convertidos += 1
+                continue
+
+            if registro is None:
+                registro = CarritoAbandonado(carrito_id=carrito['id'])
+                nuevos.append(registro)
+            else:
+                actualizados.append(registro)
+
+            registro.usuario_id = carrito['usuario_id']
+            registro.session_id = carrito['session_id']
+            registro.total_items = carrito['cantidad']
+            registro.valor = carrito['valor']
+            registro.ultima_actividad = carrito['ultima_actividad']
+            if pedido:
+                registro.estado = 'recuperado'
+                registro.pedido_id = pedido[0]
+                registro.fecha_recuperacion = pedido[1]
+
+        # ==================== RECUPERACIONES ====================
+        # Abandonos previos cuyo dueño compró después de abandonar
+        recuperados = self._recuperados(desde, limite, excluir={r.carrito_id for r in actualizados})
+
+        with transaction.atomic():
+            CarritoAbandonado.objects.bulk_create(nuevos, batch_size=500)
+            CarritoAbandonado.objects.bulk_update(
+                actualizados + recuperados,
+                ['usuario', 'session_id', 'total_items', 'valor', 'ultima_actividad',
+                 'estado', 'pedido', 'fecha_recuperacion'],
+                batch_size=500
+            )
+            punto.ultima_marca = limite
+            punto.save(update_fields=['ultima_marca', 'fecha_actualizacion'])
+
+            # Los abandonos se detectan con --horas de atraso: se completan las
+            # métricas diarias ya calculadas de los días afectados
+            dias = {timezone.localdate(r.ultima_actividad) for r in nuevos + actualizados}
+            metricas = list(MetricaDiaria.objects.filter(fecha__in=dias))
+            for metrica in metricas:
+                metrica.calcular_abandono()
+                metrica.save(update_fields=['carritos_abandonados', 'tasa_abandono'])
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Carritos escaneados: {len(carritos)}'))
+        self.stdout.write(f'   🛒 Abandonos nuevos: {sum(1 for r in nuevos if r.estado == "abandonado")}')
+        self.stdout.write(f'   🔄 Abandonos actualizados: {len(actualizados)}')
+        self.stdout.write(f'   💰 Recuperados: {len(recuperados) + sum(1 for r in actualizados if r.estado == "recuperado")}')
+        self.stdout.write(f'   ✔️  Convertidos sin abandono: {convertidos}')
+        if metricas:
+            self.stdout.write(f'   📊 Métricas diarias actualizadas: {", ".join(str(m.fecha) for m in metricas)}')
+
+    def _pedidos(self, carritos):
+        """(pedido_id, fecha) por usuario y por sesión, ordenados por fecha"""
+        usuarios = {c['usuario_id'] for c in carritos if c['usuario_id']}
+        sesiones = {c['session_id'] for c in carritos if not c['usuario_id'] and c['session_id']}
+        if not carritos:
+            return {}, {}
+        desde = min(c['fecha_creacion'] for c in carritos)
+
+        por_usuario = defaultdict(list)
+        if usuarios:
+            for pedido_id, usuario_id, fecha in Pedido.objects.filter(
+                usuario_id__in=usuarios, fecha_pedido__gte=desde
+            ).order_by('fecha_pedido').values_list('id', 'usuario_id', 'fecha_pedido'):
+                por_usuario[usuario_id].append((pedido_id, fecha))
+
+        # Los pedidos no guardan la sesión: se vinculan por los eventos con pedido
+        por_sesion = defaultdict(list)
+        if sesiones:
+            for pedido_id, session_id, fecha in EventoUsuario.objects.filter(
+                session_id__in=sesiones, pedido__isnull=False, timestamp__gte=desde
+            ).order_by('timestamp').values_list('pedido_id', 'session_id', 'timestamp'):
+                por_sesion[session_id].append((pedido_id, fecha))
+
+        return por_usuario, por_sesion
+
+    def _recuperados(self, desde, limite, excluir):
+        pedidos = Pedido.objects.filter(usuario__isnull=False, fecha_pedido__lte=limite)
+        if desde:
+            pedidos = pedidos.filter(fecha_pedido__gt=desde)
+        pedidos_por_usuario = defaultdict(list)
+        for pedido_id, usuario_id, fecha in pedidos.order_by('fecha_pedido').values_list('id', 'usuario_id', 'fecha_pedido'):
+            pedidos_por_usuario[usuario_id].append((pedido_id, fecha))
+        if not pedidos_por_usuario:
+            return []
+
+        recuperados = []
+        for registro in CarritoAbandonado.objects.filter(
+            estado='abandonado', usuario_id__in=pedidos_por_usuario
+        ).exclude(carrito_id__in=excluir):
+            pedido = next(
+                (p for p in pedidos_por_usuario[registro.usuario_id] if p[1] >= registro.ultima_actividad),
+                None
+            )
+            if pedido:
+                registro.estado = 'recuperado'
+                registro.pedido_id = pedido[0]
+                registro.fecha_recuperacion = pedido[1]
+                recuperados.append(registro)
+        return recuperados
@@ -1,11 +1,12 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 from datetime import timedelta
+from apps.analytics import archivo
 from apps.analytics.models import EventoUsuario
 
 
 class Command(BaseCommand):
-    help = 'Elimina eventos de usuario más antiguos que X días'
+    help = 'Archiva en Parquet y elimina eventos de usuario más antiguos que X días'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -19,39 +20,63 @@ class Command(BaseCommand):
             action='store_true',
             help='Confirmar eliminación sin preguntar'
         )
+        parser.add_argument(
+            '--sin-archivar',
+            action='store_true',
+            help='Eliminar sin exportar al archivo Parquet'
+        )
 
     def handle(self, *args, **options):
         dias = options['dias']
         confirmar = options['confirmar']
-        
+        archivar = not options['sin_archivar']
+
+        if archivar and not archivo.PYARROW_AVAILABLE:
+            # Error (no return): el scheduler tiene que enterarse de que no se limpió nada
+            raise CommandError(
+                '❌ pyarrow no está instalado: no se puede archivar. '
+                'Ejecutar: pip install pyarrow (o usar --sin-archivar para solo eliminar)'
+            )
+
         fecha_limite = timezone.now() - timedelta(days=dias)
-        
+
         eventos_antiguos = EventoUsuario.objects.filter(
             timestamp__lt=fecha_limite
         )
-        
+
         total = eventos_antiguos.count()
-        
+
         if total == 0:
             self.stdout.write(
                 self.style.SUCCESS(f'✅ No hay eventos anteriores a {dias} días para eliminar')
             )
             return
-        
+
         self.stdout.write(
             self.style.WARNING(
                 f'⚠️  Se encontraron {total} eventos anteriores a {fecha_limite.date()}'
             )
         )
-        
+
         if not confirmar:
-            respuesta = input('¿Desea eliminarlos? (s/n): ')
+            pregunta = '¿Desea archivarlos y eliminarlos? (s/n): ' if archivar else '¿Desea eliminarlos? (s/n): '
+            respuesta = input(pregunta)
             if respuesta.lower() != 's':
                 self.stdout.write('Operación cancelada')
                 return
-        
-        eventos_antiguos.delete()
-        
+
+        if not archivar:
+            eventos_antiguos.delete()
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ {total} eventos eliminados correctamente')
+            )
+            return
+
+        por_mes = archivo.archivar_eventos(fecha_limite)
+
         self.stdout.write(
-            self.style.SUCCESS(f'✅ {total} eventos eliminados correctamente')
+            self.style.SUCCESS(f'✅ {sum(por_mes.values())} eventos archivados y eliminados correctamente')
         )
+        for mes, cantidad in sorted(por_mes.items()):
+            self.stdout.write(f'   📦 {mes}: {cantidad} eventos')
+        self.stdout.write(f'   📁 {archivo.directorio()}')
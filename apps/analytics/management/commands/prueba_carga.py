@@ -0,0 +1,174 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.analytics.utils import percentil
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga: compara req/s y p99 entre los modos wsgi y asgi de gunicorn'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='/api/search-insights/suggestions/local/?q=re',
+            help='Ruta a consultar (por defecto: sugerencias locales)'
+        )
+        parser.add_argument(
+            '--modos',
+            nargs='+',
+            choices=['wsgi', 'asgi'],
+            default=['wsgi', 'asgi'],
+            help='Modos de SERVER_MODE a comparar (por defecto: wsgi asgi)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=1000,
+            help='Total de requests por modo (por defecto: 1000)'
+        )
+        parser.add_argument(
+            '--concurrencia',
+            type=int,
+            default=50,
+            help='Requests simultáneos (por defecto: 50)'
+        )
+        parser.add_argument(
+            '--metodo',
+            type=str,
+            default='GET',
+            help='Método HTTP (por defecto: GET)'
+        )
+        parser.add_argument(
+            '--datos',
+            type=str,
+            default=None,
+            help='Cuerpo JSON para POST'
+        )
+        parser.add_argument(
+            '--header',
+            action='append',
+            default=[],
+            help='Header extra, ej: "Authorization: Bearer <token>" (repetible)'
+        )
+        parser.add_argument(
+            '--puerto',
+            type=int,
+            default=8765,
+            help='Puerto donde se levanta gunicorn (por defecto: 8765)'
+        )
+        parser.add_argument(
+            '--base-url',
+            type=str,
+            default=None,
+            help='Usar un servidor ya levantado en lugar de arrancar gunicorn'
+        )
+
+    def handle(self, *args, **options):
+        headers = {}
+        for header in options['header']:
+            nombre, _, valor = header.partition(':')
+            headers[nombre.strip()] = valor.strip()
+        if options['datos']:
+            headers.setdefault('Content-Type', 'application/json')
+
+        parametros = {
+            'ruta': options['url'],
+            'total': options['requests'],
+            'concurrencia': options['concurrencia'],
+            'metodo': options['metodo'].upper(),
+            'headers': headers,
+            'cuerpo': options['datos'].encode() if options['datos'] else None,
+        }
+
+        resultados = []
+        if options['base_url']:
+            self.stdout.write(self.style.WARNING(f'⏱️  Prueba de carga contra {options["base_url"]}'))
+            resultados.append((options['base_url'], asyncio.run(self._cargar(options['base_url'], **parametros))))
+        else:
+            for modo in options['modos']:
+                self.stdout.write(self.style.WARNING(f'⏱️  Levantando gunicorn en modo {modo}...'))
+                base_url = f'http://127.0.0.1:{options["puerto"]}'
+                servidor = self._levantar_servidor(modo, options['puerto'], base_url)
+                try:
+                    resultados.append((modo, asyncio.run(self._cargar(base_url, **parametros))))
+                finally:
+                    servidor.terminate()
+                    try:
+                        servidor.wait(timeout=15)
+                    except subprocess.TimeoutExpired:
+                        servidor.kill()
+
+        self.stdout.write('')
+        self.stdout.write(
+            f'{options["requests"]} requests a {options["url"]} '
+            f'con concurrencia {options["concurrencia"]}'
+        )
+        for nombre, medicion in resultados:
+            self.stdout.write(self.style.SUCCESS(f'📊 {nombre}'))
+            self.stdout.write(f'   Requests/seg: {medicion["rps"]:.1f}')
+            self.stdout.write(f'   p50: {medicion["p50"]:.1f} ms')
+            self.stdout.write(f'   p99: {medicion["p99"]:.1f} ms')
+            self.stdout.write(f'   Errores: {medicion["errores"]}')
+
+    def _levantar_servidor(self, modo, puerto, base_url):
+        entorno = {**os.environ, 'SERVER_MODE': modo, 'PORT': str(puerto)}
+        servidor = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py'],
+            cwd=settings.BASE_DIR,
+            env=entorno,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if servidor.poll() is not None:
+                raise CommandError(f'gunicorn terminó al arrancar en modo {modo} (código {servidor.returncode})')
+            try:
+                httpx.get(base_url, timeout=1)
+                return servidor
+            except httpx.HTTPError:
+                time.sleep(0.3)
+
+        servidor.kill()
+        raise CommandError(f'gunicorn no respondió en modo {modo}')
+
+    async def _cargar(self, base_url, ruta, total, concurrencia, metodo, headers, cuerpo):
+        tiempos = []
+        errores = 0
+        pendientes = iter(range(total))
+
+        limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+        async with httpx.AsyncClient(base_url=base_url, headers=headers, timeout=30, limits=limites) as cliente:
+
+            async def trabajador():
+                nonlocal errores
+                for _ in pendientes:
+                    inicio = time.perf_counter()
+                    try:
+                        respuesta = await cliente.request(metodo, ruta, content=cuerpo)
+                        if respuesta.status_code >= 400:
+                            errores += 1
+                    except httpx.HTTPError:
+                        errores += 1
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+
+            inicio_total = time.perf_counter()
+            await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+            duracion = time.perf_counter() - inicio_total
+
+        tiempos.sort()
+        return {
+            'rps': total / duracion if duracion else 0,
+            'p50': percentil(tiempos, 50),
+            'p99': percentil(tiempos, 99),
+            'errores': errores,
+        }
@@ -0,0 +1,146 @@
+import re
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.pagos.views import PagoViewSet
+from apps.pedidos.views import PedidoViewSet
+from apps.usuarios.models import Usuario
+from apps.usuarios.views import UsuarioViewSet
+
+# (nombre, viewset, acción, query params, como staff)
+ESCENARIOS = [
+    ('pedidos: listado del cliente', PedidoViewSet, 'list', {}, False),
+    ('pedidos: cliente por estado', PedidoViewSet, 'list', {'estado': 'enviado'}, False),
+    ('pedidos: listado admin', PedidoViewSet, 'list', {}, True),
+    ('pedidos: admin por estado', PedidoViewSet, 'list', {'estado': 'en_preparacion'}, True),
+    ('pedidos: admin por rango de fechas', PedidoViewSet, 'list',
+     {'fecha_desde': '2025-01-01T00:00:00Z', 'fecha_hasta': '2025-01-31T23:59:59Z'}, True),
+    ('pedidos: admin por usuario', PedidoViewSet, 'list', {'usuario': '1'}, True),
+    ('pedidos: estadísticas', PedidoViewSet, 'estadisticas', {'dias': '7', 'refrescar': '1'}, True),
+    ('pagos: por pedido y estado', PagoViewSet, 'list', {'pedido': '1', 'estado': 'aprobado'}, True),
+    ('usuarios: listado de clientes', UsuarioViewSet, 'list', {}, True),
+    ('usuarios: búsqueda por prefijo', UsuarioViewSet, 'list', {'search': 'juan pe'}, True),
+    ('usuarios: estadísticas', UsuarioViewSet, 'estadisticas', {}, True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta EXPLAIN sobre el SQL de los viewsets y falla si hay escaneos completos en tablas grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--umbral',
+            type=int,
+            default=1000,
+            help='Filas a partir de las cuales un escaneo completo es un error (por defecto: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        umbral = options['umbral']
+        self._filas_por_tabla = {}
+        factory = APIRequestFactory()
+        problemas = []
+
+        for nombre, viewset, accion, parametros, staff in ESCENARIOS:
+            consultas = self._capturar(factory, viewset, accion, parametros, staff)
+            self.stdout.write(f'📊 {nombre}: {len(consultas)} consulta(s)')
+
+            for alias, sql, params in consultas:
+                plan, escaneos = self._explicar(alias, sql, params)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'   {sql[:150]}')
+                    for linea in plan:
+                        self.stdout.write(f'      {linea}')
+
+                for tabla in escaneos:
+                    filas = self._filas(alias, tabla)
+                    if filas >= umbral:
+                        problemas.append((nombre, tabla, filas, sql))
+                        self.stdout.write(self.style.ERROR(f'   ❌ Escaneo completo de {tabla} ({filas} filas)'))
+                    else:
+                        self.stdout.write(self.style.WARNING(
+                            f'   ⚠️  Escaneo completo de {tabla} ({filas} filas, bajo el umbral)'
+                        ))
+
+        if problemas:
+            for nombre, tabla, filas, sql in problemas:
+                self.stdout.write(f'\n{nombre} -> {tabla} ({filas} filas)\n   {sql}')
+            raise CommandError(f'{len(problemas)} consulta(s) con escaneo completo sobre tablas de {umbral}+ filas')
+
+        self.stdout.write(self.style.SUCCESS('\n✅ Ningún escaneo completo sobre tablas grandes'))
+
+    def _capturar(self, factory, viewset, accion, parametros, staff):
+        """Ejecuta la acción y retorna los SELECT ejecutados con sus parámetros"""
+        consultas = []
+
+        def registrar(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                consultas.append((context['connection'].alias, sql, params))
+            return execute(sql, params, many, context)
+
+        # Usuario en memoria: no escribe nada en la base
+        usuario = Usuario(pk=0, username='planes_consulta', is_staff=staff, is_superuser=staff)
+        request = factory.get('/', parametros)
+        force_authenticate(request, user=usuario)
+
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registrar))
+            respuesta = viewset.as_view({'get': accion})(request)
+
+        if respuesta.status_code >= 400:
+            raise CommandError(f'{viewset.__name__}.{accion} respondió {respuesta.status_code}: {respuesta.data}')
+        return consultas
+
+    def _explicar(self, alias, sql, params):
+        """Plan de la consulta y tablas recorridas completas, según el motor"""
+        conexion = connections[alias]
+        vendor = conexion.vendor
+
+        with conexion.cursor() as cursor:
+            if vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = [fila[-1] for fila in cursor.fetchall()]
+                # "SCAN pedidos" sin índice (con índice: "SCAN pedidos USING INDEX ...")
+                escaneos = [
+                    m.group(1) for m in (re.match(r'SCAN (\w+)$', linea) for linea in plan) if m
+                ]
+            elif vendor == 'postgresql':
+                cursor.execute('EXPLAIN ' + sql, params)
+                plan = [fila[0] for fila in cursor.fetchall()]
+                escaneos = [
+                    m.group(1) for m in (re.search(r'Seq Scan on (\w+)', linea) for linea in plan) if m
+                ]
+            else:
+                cursor.execute('EXPLAIN ' + sql, params)
+                columnas = [c[0].lower() for c in cursor.description]
+                filas = [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+                plan = [
+                    f"{f.get('table')}: type={f.get('type')} key={f.get('key')} rows={f.get('rows')}"
+                    for f in filas
+                ]
+                escaneos = [f['table'] for f in filas if f.get('type') == 'ALL' and f.get('table')]
+
+        return plan, escaneos
+
+    def _filas(self, alias, tabla):
+        """Filas de la tabla (estimación de MySQL o COUNT en otros motores)"""
+        clave = (alias, tabla)
+        if clave not in self._filas_por_tabla:
+            conexion = connections[alias]
+            with conexion.cursor() as cursor:
+                if conexion.vendor == 'mysql':
+                    cursor.execute(
+                        'SELECT table_rows FROM information_schema.tables '
+                        'WHERE table_schema = DATABASE() AND table_name = %s',
+                        [tabla]
+                    )
+                    fila = cursor.fetchone()
+                    self._filas_por_tabla[clave] = (fila[0] or 0) if fila else 0
+                else:
+                    cursor.execute(f'SELECT COUNT(*) FROM {conexion.ops.quote_name(tabla)}')
+                    self._filas_por_tabla[clave] = cursor.fetchone()[0]
+        return self._filas_por_tabla[clave]
@@ -1,74 +1,75 @@
+import logging
+
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
-from django.urls import resolve
-from .models import EventoUsuario
-import json
+
+from apps.carrito.almacen import COOKIE_SESION, obtener_session_id
+from . import politicas
+from .cola import encolar_evento
+from .utils import get_client_ip
+
+logger = logging.getLogger(__name__)
+
+# 30 días, igual que la cookie del carrito de sesión
+DURACION_COOKIE_VISITANTE = 60 * 60 * 24 * 30
 
 
 class AnalyticsMiddleware(MiddlewareMixin):
     """
     Middleware para capturar eventos de navegación automáticamente
+
+    Solo registra las vistas de ANALYTICS_VISTAS_TRACKEADAS (view_name ->
+    tipo de evento) y sin trabajo en la base durante la request:
+    - la vista se toma de request.resolver_match (no se vuelve a resolver)
+    - el visitante se identifica con la cookie del carrito de sesión (o el
+      header X-Session-ID), sin crear filas en django_session; así los
+      eventos y el carrito anónimo comparten session_id. Sin ninguno de los
+      dos el evento se guarda con session_id NULL
+    - bots, prefetch, recargas y muestreo se filtran en memoria
+      (apps.analytics.politicas)
+    - el evento se encola y se guarda por lotes (apps.analytics.cola)
     """
-    
-    def process_request(self, request):
-        # Guardar información de la request en el objeto para usarla después
-        request.analytics_data = {
-            'ip_address': self.get_client_ip(request),
-            'user_agent': request.META.get('HTTP_USER_AGENT', ''),
-            'session_id': request.session.session_key or self.get_or_create_session(request),
-        }
-    
+
     def process_response(self, request, response):
         # Solo trackear requests exitosas (200-299)
-        if not (200 <= response.status_code < 300):
+        if not (200 <= response.status_code < 300) or request.method != 'GET':
+            return response
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
             return response
-        
-        # Solo trackear ciertas URLs
+
+        tipo_evento = settings.ANALYTICS_VISTAS_TRACKEADAS.get(resolver_match.view_name)
+        if tipo_evento is None:
+            return response
+
         try:
-            resolved = resolve(request.path)
-            view_name = resolved.view_name
-            
-            # Registrar vista de producto
-            if 'producto' in view_name and request.method == 'GET':
-                producto_id = resolved.kwargs.get('pk')
-                if producto_id:
-                    self.registrar_evento(
-                        request,
-                        tipo_evento='vista_producto',
-                        producto_id=producto_id
-                    )
-        
+            # Sin header ni cookie el evento queda sin sesión (NULL): un uuid
+            # nuevo por request no deduplica ni arma canastas de co-vistas
+            session_id = obtener_session_id(request, crear=False)
+            producto_id = resolver_match.kwargs.get('pk')
+            producto_id = int(producto_id) if producto_id and str(producto_id).isdigit() else None
+
+            peso = politicas.evaluar(request, tipo_evento, session_id, producto_id)
+            if peso is not None:
+                # request.user ya es el usuario del JWT (DRF lo copia a la request)
+                usuario = getattr(request, 'user', None)
+                encolar_evento(
+                    usuario_id=usuario.pk if usuario is not None and usuario.is_authenticated else None,
+                    tipo_evento=tipo_evento,
+                    session_id=session_id,
+                    producto_id=producto_id,
+                    ip_address=get_client_ip(request),
+                    user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                    peso=peso,
+                )
+
+            # Mismo origen: las próximas requests ya llegan con la cookie
+            cookie = session_id or obtener_session_id(request)
+            if request.COOKIES.get(COOKIE_SESION) != cookie:
+                response.set_cookie(COOKIE_SESION, cookie, max_age=DURACION_COOKIE_VISITANTE, samesite='Lax')
         except Exception as e:
             # No bloquear la request si hay error en analytics
-            pass
-        
+            logger.error(f"Error registrando evento: {str(e)}")
+
         return response
-    
-    def get_client_ip(self, request):
-        """Obtener IP real del cliente"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-    
-    def get_or_create_session(self, request):
-        """Crear sesión si no existe"""
-        if not request.session.session_key:
-            request.session.create()
-        return request.session.session_key
-    
-    def registrar_evento(self, request, tipo_evento, **kwargs):
-        """Registrar evento en segundo plano"""
-        try:
-            EventoUsuario.objects.create(
-                usuario=request.user if request.user.is_authenticated else None,
-                tipo_evento=tipo_evento,
-                session_id=request.analytics_data.get('session_id'),
-                ip_address=request.analytics_data.get('ip_address'),
-                user_agent=request.analytics_data.get('user_agent'),
-                **kwargs
-            )
-        except Exception as e:
-            # Log el error pero no bloquear la request
-            print(f"Error registrando evento: {e}")
\ No newline at end of file
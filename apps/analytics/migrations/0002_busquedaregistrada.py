@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:06
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusquedaRegistrada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('consulta', models.CharField(help_text='Texto tal cual lo escribió el usuario', max_length=255)),
+                ('consulta_normalizada', models.CharField(help_text='Minúsculas, sin acentos y con espacios simples', max_length=255)),
+                ('resultados', models.PositiveIntegerField(default=0)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('evento', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='busqueda', to='analytics.eventousuario')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='busquedas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Búsqueda Registrada',
+                'verbose_name_plural': 'Búsquedas Registradas',
+                'db_table': 'analytics_busquedas',
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['timestamp', 'consulta_normalizada', 'resultados'], name='analytics_b_timesta_3bfc2a_idx'), models.Index(fields=['resultados', 'timestamp', 'consulta_normalizada'], name='analytics_b_resulta_c87c40_idx'), models.Index(fields=['consulta_normalizada', 'timestamp'], name='analytics_b_consult_121fab_idx')],
+            },
+        ),
+    ]
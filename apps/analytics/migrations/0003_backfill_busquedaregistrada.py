@@ -0,0 +1,61 @@
+import re
+import unicodedata
+
+from django.db import migrations
+
+
+def normalizar(texto):
+    # Copia de apps.analytics.utils.normalizar_consulta (las migraciones no importan código vivo)
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto).strip().lower()
+
+
+def forwards(apps, schema_editor):
+    EventoUsuario = apps.get_model('analytics', 'EventoUsuario')
+    BusquedaRegistrada = apps.get_model('analytics', 'BusquedaRegistrada')
+
+    eventos = EventoUsuario.objects.filter(tipo_evento='busqueda').order_by('id').values_list(
+        'id', 'usuario_id', 'session_id', 'metadata', 'timestamp'
+    )
+
+    lote = []
+    for evento_id, usuario_id, session_id, metadata, timestamp in eventos.iterator(chunk_size=2000):
+        metadata = metadata or {}
+        consulta = str(metadata.get('query') or '')[:255]
+        try:
+            resultados = max(int(metadata.get('resultados') or 0), 0)
+        except (TypeError, ValueError):
+            resultados = 0
+
+        lote.append(BusquedaRegistrada(
+            evento_id=evento_id,
+            usuario_id=usuario_id,
+            session_id=session_id,
+            consulta=consulta,
+            consulta_normalizada=normalizar(consulta)[:255],
+            resultados=resultados,
+            timestamp=timestamp,
+        ))
+        if len(lote) >= 2000:
+            BusquedaRegistrada.objects.bulk_create(lote)
+            lote = []
+
+    if lote:
+        BusquedaRegistrada.objects.bulk_create(lote)
+
+
+def backwards(apps, schema_editor):
+    BusquedaRegistrada = apps.get_model('analytics', 'BusquedaRegistrada')
+    BusquedaRegistrada.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_busquedaregistrada'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
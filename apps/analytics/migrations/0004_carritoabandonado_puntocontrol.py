@@ -0,0 +1,55 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_backfill_busquedaregistrada'),
+        ('carrito', '0007_alter_itemcarrito_unique_together_and_more'),
+        ('pedidos', '0011_pedido_estado_pago_pedido_metodo_pago'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proceso', models.CharField(max_length=100, unique=True)),
+                ('ultima_marca', models.DateTimeField(blank=True, null=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Punto de Control',
+                'verbose_name_plural': 'Puntos de Control',
+                'db_table': 'analytics_puntos_control',
+            },
+        ),
+        migrations.CreateModel(
+            name='CarritoAbandonado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('total_items', models.IntegerField(default=0)),
+                ('valor', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('ultima_actividad', models.DateTimeField(help_text='Último cambio del carrito o sus items')),
+                ('estado', models.CharField(choices=[('abandonado', 'Abandonado'), ('recuperado', 'Recuperado')], default='abandonado', max_length=20)),
+                ('fecha_deteccion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_recuperacion', models.DateTimeField(blank=True, null=True)),
+                ('carrito', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='abandono', to='carrito.carrito')),
+                ('pedido', models.ForeignKey(blank=True, help_text='Pedido que recuperó el carrito', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='carritos_recuperados', to='pedidos.pedido')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='carritos_abandonados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Carrito Abandonado',
+                'verbose_name_plural': 'Carritos Abandonados',
+                'db_table': 'analytics_carritos_abandonados',
+                'ordering': ['-ultima_actividad'],
+                'indexes': [models.Index(fields=['ultima_actividad'], name='analytics_c_ultima__e853d1_idx'), models.Index(fields=['estado', 'ultima_actividad'], name='analytics_c_estado_20d474_idx'), models.Index(fields=['usuario', 'estado'], name='analytics_c_usuario_19b79e_idx'), models.Index(fields=['session_id', 'estado'], name='analytics_c_session_c8e22a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_carritoabandonado_puntocontrol'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventousuario',
+            name='peso',
+            field=models.FloatField(default=1, help_text='Eventos que representa (1 / tasa de muestreo, ver apps.analytics.politicas)'),
+        ),
+    ]
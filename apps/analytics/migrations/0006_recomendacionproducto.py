@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-19 06:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_eventousuario_peso'),
+        ('catalogo', '0009_archivos_media_contenido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomendacionProducto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('puntaje', models.FloatField()),
+                ('compras', models.PositiveIntegerField(default=0, help_text='Pedidos pagados con ambos productos')),
+                ('vistas', models.PositiveIntegerField(default=0, help_text='Sesiones que vieron ambos productos')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recomendaciones', to='catalogo.producto')),
+                ('recomendado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='catalogo.producto')),
+            ],
+            options={
+                'verbose_name': 'Recomendación de Producto',
+                'verbose_name_plural': 'Recomendaciones de Productos',
+                'db_table': 'analytics_recomendaciones_producto',
+                'ordering': ['producto', 'posicion'],
+                'constraints': [models.UniqueConstraint(fields=('producto', 'posicion'), name='recomendacion_producto_posicion')],
+            },
+        ),
+    ]
@@ -67,6 +67,10 @@ class EventoUsuario(models.Model):
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True, null=True)
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
+    peso = models.FloatField(
+        default=1,
+        help_text='Eventos que representa (1 / tasa de muestreo, ver apps.analytics.politicas)'
+    )
     
     class Meta:
         db_table = 'analytics_eventos_usuario'
@@ -84,6 +88,51 @@ class EventoUsuario(models.Model):
         return f"{usuario_str} - {self.get_tipo_evento_display()} - {self.timestamp}"
 
 
+class BusquedaRegistrada(models.Model):
+    """
+    Búsquedas de usuario en formato tipado e indexado
+    (espejo de los eventos 'busqueda' para reportes sin parsear JSON)
+    """
+    evento = models.OneToOneField(
+        EventoUsuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='busqueda'
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='busquedas'
+    )
+    session_id = models.CharField(max_length=255, blank=True, null=True)
+    consulta = models.CharField(max_length=255, help_text='Texto tal cual lo escribió el usuario')
+    consulta_normalizada = models.CharField(
+        max_length=255,
+        help_text='Minúsculas, sin acentos y con espacios simples'
+    )
+    resultados = models.PositiveIntegerField(default=0)
+    timestamp = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'analytics_busquedas'
+        verbose_name = 'Búsqueda Registrada'
+        verbose_name_plural = 'Búsquedas Registradas'
+        ordering = ['-timestamp']
+        indexes = [
+            # Top búsquedas en un rango de fechas (índice cubriente)
+            models.Index(fields=['timestamp', 'consulta_normalizada', 'resultados']),
+            # Búsquedas sin resultados / por cantidad de resultados
+            models.Index(fields=['resultados', 'timestamp', 'consulta_normalizada']),
+            models.Index(fields=['consulta_normalizada', 'timestamp']),
+        ]
+    
+    def __str__(self):
+        return f"{self.consulta} ({self.resultados} resultados) - {self.timestamp}"
+
+
 class MetricaProducto(models.Model):
     """
     Métricas agregadas por producto (actualizado diariamente)
@@ -225,6 +274,140 @@ class MetricaDiaria(models.Model):
     
     def __str__(self):
         return f"Métricas del {self.fecha}"
+    
+    def calcular_abandono(self):
+        """
+        Carritos abandonados con última actividad en el día y tasa de abandono
+
+        detectar_carritos_abandonados registra un carrito recién después de
+        --horas de inactividad: cuando corre calcular_metricas_diarias los
+        del día anterior todavía no están, así que el detector vuelve a
+        llamar a este método para los días en que encontró abandonos.
+        No guarda.
+        """
+        inicio_dia = timezone.make_aware(timezone.datetime.combine(self.fecha, timezone.datetime.min.time()))
+        fin_dia = timezone.make_aware(timezone.datetime.combine(self.fecha, timezone.datetime.max.time()))
+        self.carritos_abandonados = CarritoAbandonado.objects.filter(
+            ultima_actividad__gte=inicio_dia,
+            ultima_actividad__lte=fin_dia
+        ).count()
+        if self.carritos_creados > 0:
+            self.tasa_abandono = (self.carritos_abandonados / self.carritos_creados) * 100
+        else:
+            self.tasa_abandono = 0
+
+
+class CarritoAbandonado(models.Model):
+    """
+    Carritos con items que quedaron inactivos sin derivar en un pedido
+
+    Tabla mantenida de forma incremental por detectar_carritos_abandonados;
+    las métricas diarias y la recuperación de carritos leen de acá.
+    """
+    ESTADO_CHOICES = [
+        ('abandonado', 'Abandonado'),
+        ('recuperado', 'Recuperado'),
+    ]
+
+    carrito = models.OneToOneField(
+        'carrito.Carrito',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='abandono'
+    )
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='carritos_abandonados'
+    )
+    session_id = models.CharField(max_length=255, blank=True, null=True)
+    total_items = models.IntegerField(default=0)
+    valor = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    ultima_actividad = models.DateTimeField(help_text='Último cambio del carrito o sus items')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='abandonado')
+    pedido = models.ForeignKey(
+        Pedido,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='carritos_recuperados',
+        help_text='Pedido que recuperó el carrito'
+    )
+    fecha_deteccion = models.DateTimeField(auto_now_add=True)
+    fecha_recuperacion = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'analytics_carritos_abandonados'
+        verbose_name = 'Carrito Abandonado'
+        verbose_name_plural = 'Carritos Abandonados'
+        ordering = ['-ultima_actividad']
+        indexes = [
+            models.Index(fields=['ultima_actividad']),
+            models.Index(fields=['estado', 'ultima_actividad']),
+            models.Index(fields=['usuario', 'estado']),
+            models.Index(fields=['session_id', 'estado']),
+        ]
+
+    def __str__(self):
+        dueno = self.usuario_id or f"sesión {(self.session_id or '')[:8]}"
+        return f"Carrito {self.carrito_id} ({dueno}) - {self.get_estado_display()}"
+
+
+class PuntoControlAnalytics(models.Model):
+    """
+    Marca de agua de los procesos incrementales (hasta dónde se procesó)
+    """
+    proceso = models.CharField(max_length=100, unique=True)
+    ultima_marca = models.DateTimeField(null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_puntos_control'
+        verbose_name = 'Punto de Control'
+        verbose_name_plural = 'Puntos de Control'
+
+    def __str__(self):
+        return f"{self.proceso}: {self.ultima_marca}"
+
+
+class RecomendacionProducto(models.Model):
+    """
+    Vecinos más cercanos de cada producto ("también compraron / vieron")
+
+    La calcula calcular_recomendaciones a partir de la co-ocurrencia en
+    pedidos pagados y en sesiones; la vista lee las de un producto por el
+    índice (producto, posicion).
+    """
+    producto = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='recomendaciones'
+    )
+    recomendado = models.ForeignKey(
+        Producto,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    posicion = models.PositiveSmallIntegerField()
+    puntaje = models.FloatField()
+    compras = models.PositiveIntegerField(default=0, help_text='Pedidos pagados con ambos productos')
+    vistas = models.PositiveIntegerField(default=0, help_text='Sesiones que vieron ambos productos')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'analytics_recomendaciones_producto'
+        verbose_name = 'Recomendación de Producto'
+        verbose_name_plural = 'Recomendaciones de Productos'
+        ordering = ['producto', 'posicion']
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'posicion'], name='recomendacion_producto_posicion'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} -> {self.recomendado_id} ({self.puntaje:.2f})"
 
 
 class ConfiguracionGoogleAnalytics(models.Model):
@@ -0,0 +1,106 @@
+"""
+Política de registro de eventos de alto volumen (vista_producto)
+
+Antes de encolar un evento se descarta si:
+- viene de un bot, un crawler o un cliente sin user agent
+- es un prefetch/preview del navegador (header Purpose / Sec-Purpose)
+- la misma sesión ya registró el mismo evento dentro de la ventana de
+  deduplicación (recargas, volver atrás)
+- no entra en la muestra (ANALYTICS_MUESTREO, tasa por tipo de evento)
+
+Los eventos muestreados se guardan con peso = 1 / tasa, y las métricas
+suman el peso en lugar de contar filas (total_ponderado), así bajar la
+tasa reduce filas sin cambiar los totales esperados.
+
+La ventana de deduplicación es un LRU con vencimiento en memoria de cada
+proceso: con varios workers una recarga puede caer en otro proceso y
+contarse, lo que solo agrega algún duplicado ocasional.
+"""
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Sum
+
+PATRON_BOTS = re.compile(
+    r'bot|crawl|spider|slurp|scrap|facebookexternalhit|embedly|preview|'
+    r'headless|phantomjs|lighthouse|pingdom|uptime|monitor|'
+    r'curl|wget|python-requests|aiohttp|httpx|go-http-client|java/|okhttp|axios',
+    re.IGNORECASE
+)
+
+HEADERS_PREFETCH = ('Purpose', 'Sec-Purpose', 'X-Purpose', 'X-Moz')
+
+
+def es_bot(user_agent):
+    return not user_agent or bool(PATRON_BOTS.search(user_agent))
+
+
+def es_prefetch(request):
+    return any(
+        valor in request.headers.get(header, '').lower()
+        for header in HEADERS_PREFETCH
+        for valor in ('prefetch', 'preview')
+    )
+
+
+class VentanaDedup:
+    """Conjunto LRU de claves recientes que vencen a los `segundos`"""
+
+    def __init__(self, maximo, segundos):
+        self.maximo = maximo
+        self.segundos = segundos
+        self._claves = OrderedDict()
+        self._lock = threading.Lock()
+
+    def visto(self, clave):
+        """True si la clave ya estaba vigente; si no, la registra"""
+        ahora = time.monotonic()
+        with self._lock:
+            vence = self._claves.get(clave)
+            if vence is not None and vence > ahora:
+                self._claves.move_to_end(clave)
+                return True
+            self._claves[clave] = ahora + self.segundos
+            self._claves.move_to_end(clave)
+            while len(self._claves) > self.maximo:
+                self._claves.popitem(last=False)
+            return False
+
+    def limpiar(self):
+        with self._lock:
+            self._claves.clear()
+
+
+_ventana = VentanaDedup(
+    maximo=getattr(settings, 'ANALYTICS_DEDUP_MAXIMO', 50000),
+    segundos=getattr(settings, 'ANALYTICS_DEDUP_SEGUNDOS', 30 * 60),
+)
+
+
+def evaluar(request, tipo_evento, session_id, producto_id=None):
+    """
+    Peso con el que se registra el evento, o None si se descarta
+
+    Los eventos sin tasa configurada se registran siempre con peso 1.
+    """
+    if es_bot(request.META.get('HTTP_USER_AGENT', '')) or es_prefetch(request):
+        return None
+
+    if session_id and _ventana.visto((session_id, tipo_evento, producto_id)):
+        return None
+
+    tasa = getattr(settings, 'ANALYTICS_MUESTREO', {}).get(tipo_evento, 1.0)
+    if tasa <= 0:
+        return None
+    if tasa < 1 and random.random() >= tasa:
+        return None
+    return 1 / min(tasa, 1.0)
+
+
+def total_ponderado(eventos):
+    """Cantidad de eventos corregida por muestreo (suma de pesos)"""
+    return round(eventos.aggregate(total=Sum('peso'))['total'] or 0)
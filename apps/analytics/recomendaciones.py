@@ -0,0 +1,259 @@
+"""
+Índice de recomendaciones por co-ocurrencia ("también compraron / vieron")
+
+Cada pedido pagado y cada sesión con vistas es una fila de una matriz
+dispersa canasta x producto (SciPy); B.T @ B da cuántas canastas comparten
+cada par de productos. El puntaje de un par es
+
+    PESO_COMPRA * pedidos en común + sesiones que vieron ambos
+
+y se guardan los `top` mejores de cada producto en RecomendacionProducto.
+
+Las dos matrices de co-ocurrencia y los pedidos ya contados se guardan en
+ANALYTICS_ARCHIVO_DIR/recomendaciones/coocurrencia.npz: la corrida
+incremental solo suma los pedidos y las sesiones nuevas y reescribe los
+productos afectados. Una sesión que cruza el punto de control se cuenta
+como dos canastas (se pierden los pares entre las dos mitades).
+
+SciPy es opcional (pip install scipy).
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+try:
+    import numpy as np
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+PESO_COMPRA = 5
+TOP = 20
+TAMANO_CHUNK = 20000
+
+
+def ruta_matrices():
+    return Path(settings.ANALYTICS_ARCHIVO_DIR) / 'recomendaciones' / 'coocurrencia.npz'
+
+
+# ==================== MATRICES ====================
+
+def coocurrencia(canastas, productos, tamano):
+    """
+    Matriz producto x producto con la cantidad de canastas en común
+
+    canastas y productos son arreglos paralelos (una fila por línea); un
+    producto repetido en la misma canasta cuenta una vez.
+    """
+    if len(canastas) == 0:
+        return sparse.csr_matrix((tamano, tamano), dtype=np.int32)
+    _, filas = np.unique(canastas, return_inverse=True)
+    b = sparse.csr_matrix(
+        (np.ones(len(filas), dtype=np.int32), (filas, productos)),
+        shape=(filas.max() + 1, tamano),
+    )
+    b.sum_duplicates()
+    b.data[:] = 1
+    c = (b.T @ b).tocsr()
+    c.setdiag(0)
+    c.eliminate_zeros()
+    return c
+
+
+def _redimensionar(matriz, tamano):
+    if matriz.shape[0] >= tamano:
+        return matriz
+    matriz = matriz.tocoo()
+    return sparse.csr_matrix((matriz.data, (matriz.row, matriz.col)), shape=(tamano, tamano))
+
+
+def cargar():
+    """(compras, vistas, pedidos procesados) guardados, o None"""
+    ruta = ruta_matrices()
+    if not ruta.exists():
+        return None
+    with np.load(ruta) as datos:
+        matrices = [
+            sparse.csr_matrix(
+                (datos[f'{nombre}_data'], datos[f'{nombre}_indices'], datos[f'{nombre}_indptr']),
+                shape=tuple(datos[f'{nombre}_shape']),
+            )
+            for nombre in ('compras', 'vistas')
+        ]
+        return matrices[0], matrices[1], datos['pedidos']
+
+
+def guardar(compras, vistas, pedidos):
+    ruta = ruta_matrices()
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    arreglos = {'pedidos': pedidos}
+    for nombre, matriz in (('compras', compras), ('vistas', vistas)):
+        arreglos[f'{nombre}_data'] = matriz.data
+        arreglos[f'{nombre}_indices'] = matriz.indices
+        arreglos[f'{nombre}_indptr'] = matriz.indptr
+        arreglos[f'{nombre}_shape'] = np.array(matriz.shape)
+    temporal = ruta.with_name('_' + ruta.name)
+    with open(temporal, 'wb') as archivo:
+        np.savez_compressed(archivo, **arreglos)
+    temporal.replace(ruta)
+
+
+# ==================== CANASTAS ====================
+
+def lineas_de_pedidos(desde=None, excluir=None):
+    """(pedido_id, producto_id) de pedidos pagados o entregados"""
+    from apps.pedidos.models import ItemPedido
+
+    lineas = ItemPedido.objects.filter(
+        Q(pedido__estado_pago='pagado') | Q(pedido__estado='entregado'),
+        producto__isnull=False,
+    )
+    if desde:
+        # Un pedido se paga después de crearse: se miran los actualizados
+        lineas = lineas.filter(pedido__fecha_actualizacion__gte=desde)
+    datos = np.fromiter(
+        lineas.order_by().values_list('pedido_id', 'producto_id').iterator(chunk_size=TAMANO_CHUNK),
+        dtype=np.dtype([('canasta', np.int64), ('producto', np.int64)]),
+    )
+    if excluir is not None and len(excluir):
+        datos = datos[~np.isin(datos['canasta'], excluir)]
+    return datos['canasta'], datos['producto']
+
+
+def vistas_de_sesiones(desde, hasta):
+    """(sesión como entero, producto_id) de los eventos vista_producto"""
+    from .models import EventoUsuario
+
+    eventos = EventoUsuario.objects.filter(
+        tipo_evento='vista_producto', session_id__isnull=False, producto__isnull=False,
+        timestamp__lt=hasta,
+    )
+    if desde:
+        eventos = eventos.filter(timestamp__gte=desde)
+    sesiones = []
+    productos = []
+    for session_id, producto_id in eventos.order_by().values_list('session_id', 'producto_id').iterator(chunk_size=TAMANO_CHUNK):
+        sesiones.append(session_id)
+        productos.append(producto_id)
+    if not sesiones:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    _, canastas = np.unique(np.array(sesiones, dtype=object).astype(str), return_inverse=True)
+    return canastas.astype(np.int64), np.array(productos, dtype=np.int64)
+
+
+# ==================== TOP-K ====================
+
+def vecinos(compras, vistas, productos, top=TOP, peso_compra=PESO_COMPRA):
+    """{producto_id: [(recomendado_id, puntaje, compras, vistas), ...]} ordenado por puntaje"""
+    puntajes = (compras.astype(np.float64) * peso_compra + vistas).tocsr()
+
+    def fila(matriz, i):
+        inicio, fin = matriz.indptr[i], matriz.indptr[i + 1]
+        return matriz.indices[inicio:fin], matriz.data[inicio:fin]
+
+    resultado = {}
+    for producto_id in productos:
+        columnas, valores = fila(puntajes, producto_id)
+        if len(valores) > top:
+            mejores = np.argpartition(-valores, top)[:top]
+            columnas, valores = columnas[mejores], valores[mejores]
+        orden = np.lexsort((columnas, -valores))
+        en_compras = dict(zip(*(x.tolist() for x in fila(compras, producto_id))))
+        en_vistas = dict(zip(*(x.tolist() for x in fila(vistas, producto_id))))
+        resultado[int(producto_id)] = [
+            (int(columnas[i]), float(valores[i]), en_compras.get(int(columnas[i]), 0), en_vistas.get(int(columnas[i]), 0))
+            for i in orden
+        ]
+    return resultado
+
+
+def guardar_vecinos(por_producto):
+    """Reemplaza las recomendaciones de los productos dados"""
+    from apps.catalogo.models import Producto
+    from .models import RecomendacionProducto
+
+    # Las matrices pueden tener productos que ya se borraron
+    referenciados = set(por_producto)
+    for lista in por_producto.values():
+        referenciados.update(v[0] for v in lista)
+    vigentes = set(Producto.objects.filter(id__in=referenciados).values_list('id', flat=True))
+
+    recomendaciones = []
+    for producto_id, lista in por_producto.items():
+        if producto_id not in vigentes:
+            continue
+        lista = [v for v in lista if v[0] in vigentes]
+        for posicion, (recomendado_id, puntaje, compras, vistas) in enumerate(lista):
+            recomendaciones.append(RecomendacionProducto(
+                producto_id=producto_id,
+                recomendado_id=recomendado_id,
+                posicion=posicion,
+                puntaje=puntaje,
+                compras=compras,
+                vistas=vistas,
+            ))
+
+    with transaction.atomic():
+        RecomendacionProducto.objects.filter(producto_id__in=list(por_producto)).delete()
+        RecomendacionProducto.objects.bulk_create(recomendaciones, batch_size=1000)
+    return len(recomendaciones)
+
+
+# ==================== PROCESO ====================
+
+def actualizar(incremental=False, top=TOP, peso_compra=PESO_COMPRA):
+    """
+    Recalcula las recomendaciones (todas o, si incremental, las afectadas)
+
+    Retorna un resumen con lo procesado para el comando.
+    """
+    from django.utils import timezone
+    from .models import PuntoControlAnalytics, RecomendacionProducto
+
+    ahora = timezone.now()
+    punto, _ = PuntoControlAnalytics.objects.get_or_create(proceso='recomendaciones')
+    guardado = cargar() if incremental and punto.ultima_marca else None
+    desde = punto.ultima_marca if guardado is not None else None
+    procesados = guardado[2] if guardado is not None else np.zeros(0, dtype=np.int64)
+
+    pedidos, productos_pedidos = lineas_de_pedidos(desde, excluir=procesados)
+    sesiones, productos_vistos = vistas_de_sesiones(desde, ahora)
+
+    tamano = 1 + max(
+        [int(productos_pedidos.max()) if len(productos_pedidos) else 0,
+         int(productos_vistos.max()) if len(productos_vistos) else 0]
+        + ([guardado[0].shape[0] - 1] if guardado is not None else [])
+    )
+    compras = coocurrencia(pedidos, productos_pedidos, tamano)
+    vistas = coocurrencia(sesiones, productos_vistos, tamano)
+
+    if guardado is not None:
+        # Solo cambian las filas de los productos de las canastas nuevas
+        afectados = np.unique(np.concatenate([productos_pedidos, productos_vistos]))
+        compras = (compras + _redimensionar(guardado[0], tamano)).tocsr()
+        vistas = (vistas + _redimensionar(guardado[1], tamano)).tocsr()
+    else:
+        afectados = np.unique(np.concatenate([compras.tocoo().row, vistas.tocoo().row]))
+
+    por_producto = vecinos(compras, vistas, afectados, top=top, peso_compra=peso_compra)
+    if guardado is None:
+        # Cálculo completo: los productos sin co-ocurrencias quedan sin recomendaciones
+        RecomendacionProducto.objects.exclude(producto_id__in=list(por_producto)).delete()
+    guardadas = guardar_vecinos(por_producto)
+
+    guardar(compras, vistas, np.union1d(procesados, np.unique(pedidos)))
+    punto.ultima_marca = ahora
+    punto.save(update_fields=['ultima_marca', 'fecha_actualizacion'])
+
+    return {
+        'incremental': guardado is not None,
+        'pedidos': int(len(np.unique(pedidos))),
+        'sesiones': int(len(np.unique(sesiones))),
+        'productos': len(por_producto),
+        'recomendaciones': guardadas,
+        'pares_compras': int(compras.nnz // 2),
+        'pares_vistas': int(vistas.nnz // 2),
+    }
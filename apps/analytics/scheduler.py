@@ -22,6 +22,8 @@ def ejecutar_comando(comando):
         print(result.stdout)
         if result.stderr:
             print(f'Errores: {result.stderr}')
+        if result.returncode:
+            print(f'❌ {comando} terminó con código {result.returncode}')
     except Exception as e:
         print(f'Error ejecutando {comando}: {e}')
 
@@ -40,6 +42,30 @@ def tarea_actualizar_productos():
     print('=== Finalizando actualización de métricas de productos ===\n')
 
 
+def tarea_carritos_abandonados():
+    """Detectar carritos abandonados (incremental)"""
+    print('=== Iniciando detección de carritos abandonados ===')
+    ejecutar_comando('detectar_carritos_abandonados')
+    print('=== Finalizando detección de carritos abandonados ===\n')
+
+
+def tarea_notificaciones_pago():
+    """Reintentar notificaciones de pago pendientes o con error"""
+    ejecutar_comando('procesar_notificaciones_pago')
+
+
+def tarea_recomendaciones():
+    """Sumar pedidos y vistas nuevos a las recomendaciones"""
+    ejecutar_comando('calcular_recomendaciones --incremental')
+
+
+def tarea_recomendaciones_completo():
+    """Recalcular las recomendaciones desde cero (descarta pedidos cancelados)"""
+    print('=== Iniciando cálculo completo de recomendaciones ===')
+    ejecutar_comando('calcular_recomendaciones')
+    print('=== Finalizando cálculo completo de recomendaciones ===\n')
+
+
 def tarea_limpiar_eventos():
     """Limpiar eventos antiguos"""
     print('=== Iniciando limpieza de eventos antiguos ===')
@@ -48,14 +74,21 @@ def tarea_limpiar_eventos():
 
 
 # Programar tareas
+schedule.every(5).minutes.do(tarea_notificaciones_pago)
+schedule.every().hour.at(":15").do(tarea_carritos_abandonados)
 schedule.every().day.at("00:30").do(tarea_metricas_diarias)
 schedule.every().day.at("01:00").do(tarea_actualizar_productos)
+schedule.every().hour.at(":45").do(tarea_recomendaciones)
+schedule.every().day.at("03:00").do(tarea_recomendaciones_completo)
 schedule.every().sunday.at("02:00").do(tarea_limpiar_eventos)
 
 print('Scheduler iniciado. Presiona Ctrl+C para detener.')
 print('Tareas programadas:')
+print('  - Notificaciones de pago: cada 5 minutos')
+print('  - Carritos abandonados: cada hora (:15)')
 print('  - Métricas diarias: 00:30')
 print('  - Actualizar productos: 01:00')
+print('  - Recomendaciones: cada hora (:45), completo 03:00')
 print('  - Limpiar eventos: Domingos 02:00')
 
 # Loop principal
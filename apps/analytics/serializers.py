@@ -3,9 +3,11 @@ from .models import (
     EventoUsuario,
     MetricaProducto,
     MetricaDiaria,
+    RecomendacionProducto,
     ConfiguracionGoogleAnalytics,
     DatosGoogleAnalytics
 )
+from apps.catalogo.imagenes import urls_derivados
 # ✅ CORREGIDO: CategoriaSerializer sin alias
 from apps.catalogo.serializers import ProductoListSerializer, CategoriaSerializer
 from apps.usuarios.serializer import UsuarioSerializer
@@ -131,6 +133,47 @@ class MetricaProductoSerializer(serializers.ModelSerializer):
         read_only_fields = ['ultima_actualizacion', 'tasa_conversion']
 
 
+class RecomendacionProductoSerializer(serializers.ModelSerializer):
+    """
+    Producto recomendado (solo campos del producto, sin consultas extra)
+    """
+    id = serializers.IntegerField(source='recomendado_id', read_only=True)
+    nombre = serializers.CharField(source='recomendado.nombre', read_only=True)
+    precio = serializers.DecimalField(
+        source='recomendado.precio_base',
+        max_digits=10,
+        decimal_places=2,
+        read_only=True
+    )
+    categoria = serializers.IntegerField(source='recomendado.categoria_id', read_only=True)
+    imagen_principal_url = serializers.SerializerMethodField()
+    imagen_principal_responsive = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = RecomendacionProducto
+        fields = [
+            'id',
+            'nombre',
+            'precio',
+            'categoria',
+            'imagen_principal_url',
+            'imagen_principal_responsive',
+            'puntaje',
+            'compras',
+            'vistas'
+        ]
+    
+    def get_imagen_principal_url(self, obj):
+        imagen = obj.recomendado.imagen_principal
+        if not imagen:
+            return None
+        request = self.context.get('request')
+        return request.build_absolute_uri(imagen.url) if request else imagen.url
+    
+    def get_imagen_principal_responsive(self, obj):
+        return urls_derivados(obj.recomendado.imagen_principal_derivados, self.context.get('request'))
+
+
 class MetricaDiariaSerializer(serializers.ModelSerializer):
     """
     Serializer para métricas diarias
@@ -277,4 +320,14 @@ class EmbudoConversionSerializer(serializers.Serializer):
     tasa_vista_a_carrito = serializers.DecimalField(max_digits=5, decimal_places=2)
     tasa_carrito_a_checkout = serializers.DecimalField(max_digits=5, decimal_places=2)
     tasa_checkout_a_compra = serializers.DecimalField(max_digits=5, decimal_places=2)
-    tasa_conversion_total = serializers.DecimalField(max_digits=5, decimal_places=2)
\ No newline at end of file
+    tasa_conversion_total = serializers.DecimalField(max_digits=5, decimal_places=2)
+
+
+class BusquedaTopSerializer(serializers.Serializer):
+    """
+    Serializer para reportes de búsquedas agregadas por consulta normalizada
+    """
+    consulta = serializers.CharField(source='consulta_normalizada')
+    total = serializers.IntegerField()
+    sin_resultados = serializers.IntegerField(required=False)
+    ultima_busqueda = serializers.DateTimeField()
@@ -4,7 +4,8 @@ from django.contrib.auth.signals import user_logged_in
 from apps.carrito.models import ItemCarrito, Carrito
 from apps.pedidos.models import Pedido
 from apps.usuarios.models import Usuario
-from .models import EventoUsuario
+from .models import EventoUsuario, BusquedaRegistrada
+from .utils import normalizar_consulta
 
 
 @receiver(user_logged_in)
@@ -47,11 +48,12 @@ def registrar_item_carrito(sender, instance, created, **kwargs):
     """
     if created:
         try:
+            # Por id: no cargar usuario ni categoría solo para el evento
             EventoUsuario.objects.create(
-                usuario=instance.carrito.usuario,
+                usuario_id=instance.carrito.usuario_id,
                 tipo_evento='agregar_carrito',
-                producto=instance.producto,
-                categoria=instance.producto.categoria,
+                producto_id=instance.producto_id,
+                categoria_id=instance.producto.categoria_id,
                 session_id=instance.carrito.session_id,
                 metadata={
                     'cantidad': instance.cantidad,
@@ -129,6 +131,35 @@ def registrar_pedido(sender, instance, created, **kwargs):
             print(f"Error registrando compra completada: {e}")
 
 
+@receiver(post_save, sender=EventoUsuario)
+def registrar_busqueda_tipada(sender, instance, created, **kwargs):
+    """
+    Copiar cada evento de búsqueda a la tabla tipada e indexada
+    (cubre AnalyticsTracker y los eventos enviados por el frontend)
+    """
+    if not created or instance.tipo_evento != 'busqueda':
+        return
+    try:
+        metadata = instance.metadata or {}
+        consulta = str(metadata.get('query') or '')
+        try:
+            resultados = max(int(metadata.get('resultados') or 0), 0)
+        except (TypeError, ValueError):
+            resultados = 0
+        
+        BusquedaRegistrada.objects.create(
+            evento=instance,
+            usuario_id=instance.usuario_id,
+            session_id=instance.session_id,
+            consulta=consulta[:255],
+            consulta_normalizada=normalizar_consulta(consulta)[:255],
+            resultados=resultados,
+            timestamp=instance.timestamp
+        )
+    except Exception as e:
+        print(f"Error registrando búsqueda: {e}")
+
+
 def get_client_ip(request):
     """Obtener IP del cliente"""
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -1,3 +1,248 @@
-from django.test import TestCase
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.test import RequestFactory, TestCase, override_settings
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils import timezone
+
+from apps.catalogo.models import Categoria, Producto
+from apps.pedidos.models import ItemPedido, Pedido
+from apps.usuarios.models import Usuario
+from . import archivo, cohortes, politicas, recomendaciones
+from .middleware import AnalyticsMiddleware
+from .models import EventoUsuario, RecomendacionProducto
+
+if recomendaciones.SCIPY_AVAILABLE:
+    import numpy as np
+    from scipy import sparse
+
+
+@skipUnless(recomendaciones.SCIPY_AVAILABLE, 'Requiere SciPy')
+class MatricesRecomendacionesTests(TestCase):
+    """Co-ocurrencias y top-K sobre matrices armadas a mano"""
+
+    def test_coocurrencia_cuenta_canastas_en_comun(self):
+        # Canasta 10: productos 1, 2 y el 1 repetido; canasta 20: 1 y 3
+        c = recomendaciones.coocurrencia(np.array([10, 10, 10, 20, 20]), np.array([1, 2, 1, 1, 3]), 4)
+
+        self.assertEqual(c.shape, (4, 4))
+        self.assertEqual(c[1, 2], 1)
+        self.assertEqual(c[2, 1], 1)
+        self.assertEqual(c[1, 3], 1)
+        self.assertEqual(c[2, 3], 0)
+        self.assertEqual(c.diagonal().sum(), 0)
+
+    def test_redimensionar_agranda_sin_perder_valores(self):
+        guardada = recomendaciones.coocurrencia(np.array([1, 1]), np.array([1, 2]), 3)
+
+        agrandada = recomendaciones._redimensionar(guardada, 6)
+        self.assertEqual(agrandada.shape, (6, 6))
+        self.assertEqual((agrandada[:3, :3] != guardada).nnz, 0)
+        self.assertEqual(agrandada[:, 3:].nnz, 0)
+        # Nunca achica
+        self.assertIs(recomendaciones._redimensionar(agrandada, 4), agrandada)
+
+    def test_vecinos_ordena_por_puntaje_y_corta_en_top(self):
+        compras = sparse.csr_matrix(np.array([
+            [0, 1, 0, 0, 0],
+            [1, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0],
+            [0, 0, 0, 0, 0],
+        ]))
+        vistas = sparse.csr_matrix(np.array([
+            [0, 1, 6, 3, 2],
+            [1, 0, 0, 0, 0],
+            [6, 0, 0, 0, 0],
+            [3, 0, 0, 0, 0],
+            [2, 0, 0, 0, 0],
+        ]))
+
+        resultado = recomendaciones.vecinos(compras, vistas, [0], top=3, peso_compra=5)
+
+        # 1: 5*1 + 1 = 6 empata con 2: 6 vistas (desempata el id); 4 queda afuera
+        self.assertEqual(resultado, {0: [(1, 6.0, 1, 1), (2, 6.0, 0, 6), (3, 3.0, 0, 3)]})
+
+
+@skipUnless(recomendaciones.SCIPY_AVAILABLE, 'Requiere SciPy')
+@override_settings(CATALOGO_VERSION_CACHE='default')
+class ActualizarRecomendacionesTests(TestCase):
+    """Corrida completa seguida de corridas incrementales"""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(ANALYTICS_ARCHIVO_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.categoria = Categoria.objects.create(nombre='Remeras')
+        self.a, self.b, self.c = (self.producto(nombre) for nombre in 'ABC')
+
+    def producto(self, nombre):
+        return Producto.objects.create(nombre=nombre, categoria=self.categoria, precio_base=10)
+
+    def pedido(self, *productos, estado_pago='pagado'):
+        pedido = Pedido.objects.create(
+            numero_pedido='P', email_contacto='a@x.com', telefono_contacto='1',
+            subtotal=10, total=10, estado_pago=estado_pago,
+        )
+        for producto in productos:
+            ItemPedido.objects.create(
+                pedido=pedido, producto=producto, nombre_producto=producto.nombre,
+                cantidad=1, precio_unitario=10, subtotal=10,
+            )
+        return pedido
+
+    def ver(self, session_id, *productos):
+        for producto in productos:
+            EventoUsuario.objects.create(tipo_evento='vista_producto', session_id=session_id, producto=producto)
+
+    def recomendados(self, producto):
+        return list(
+            RecomendacionProducto.objects.filter(producto=producto)
+            .order_by('posicion').values_list('recomendado_id', 'compras', 'vistas')
+        )
+
+    def test_corrida_completa(self):
+        self.pedido(self.a, self.b)
+        self.pedido(self.a, self.c, estado_pago='pendiente')
+        self.ver('s1', self.a, self.c)
+
+        resumen = recomendaciones.actualizar()
+
+        self.assertFalse(resumen['incremental'])
+        self.assertEqual(resumen['pedidos'], 1)
+        # A-B por la compra (5) queda antes que A-C por la vista (1)
+        self.assertEqual(self.recomendados(self.a), [(self.b.id, 1, 0), (self.c.id, 0, 1)])
+        self.assertEqual(self.recomendados(self.b), [(self.a.id, 1, 0)])
+
+    def test_incremental_suma_sobre_lo_guardado(self):
+        pedido = self.pedido(self.a, self.b)
+        self.ver('s1', self.b, self.c)
+        recomendaciones.actualizar()
+        tamano_guardado = recomendaciones.cargar()[0].shape[0]
+
+        # El pedido ya contado se vuelve a guardar: no se cuenta dos veces
+        pedido.save()
+        d = self.producto('D')
+        self.pedido(self.a, self.b, d)
+        self.ver('s2', self.a, d)
+
+        resumen = recomendaciones.actualizar(incremental=True)
+
+        self.assertTrue(resumen['incremental'])
+        self.assertEqual(resumen['pedidos'], 1)
+        self.assertEqual(self.recomendados(self.a), [(self.b.id, 2, 0), (d.id, 1, 1)])
+        # Un producto nuevo agranda las matrices guardadas
+        compras, vistas, procesados = recomendaciones.cargar()
+        self.assertGreater(compras.shape[0], tamano_guardado)
+        self.assertEqual(compras.shape, vistas.shape)
+        self.assertEqual(len(procesados), 2)
+        # B-C de la primera corrida sigue contado
+        self.assertEqual(vistas[self.b.id, self.c.id], 1)
+
+    def test_incremental_solo_reescribe_los_productos_afectados(self):
+        self.pedido(self.a, self.b)
+        self.ver('s1', self.b, self.c)
+        recomendaciones.actualizar()
+        RecomendacionProducto.objects.filter(producto=self.c).update(puntaje=99)
+
+        self.pedido(self.a, self.b)
+        recomendaciones.actualizar(incremental=True)
+
+        # C no estuvo en ninguna canasta nueva: su fila no se recalculó
+        self.assertEqual(
+            list(RecomendacionProducto.objects.filter(producto=self.c).values_list('puntaje', flat=True)), [99]
+        )
+        self.assertEqual(self.recomendados(self.a), [(self.b.id, 2, 0)])
+
+
+class AnalyticsMiddlewareSesionTests(TestCase):
+    """El visitante sin header ni cookie no recibe un session_id descartable"""
+
+    def setUp(self):
+        politicas._ventana.limpiar()
+        self.addCleanup(politicas._ventana.limpiar)
+        self.middleware = AnalyticsMiddleware(lambda request: HttpResponse())
+
+    def vista_producto(self, **headers):
+        request = RequestFactory().get('/api/catalogo/producto/7/', HTTP_USER_AGENT='Mozilla/5.0', **headers)
+        request.resolver_match = resolve('/api/catalogo/producto/7/')
+        with mock.patch('apps.analytics.middleware.encolar_evento') as encolar:
+            respuesta = self.middleware.process_response(request, HttpResponse())
+        return [llamada.kwargs for llamada in encolar.call_args_list], respuesta
+
+    def test_sin_identificador_el_evento_queda_sin_sesion(self):
+        eventos, respuesta = self.vista_producto()
+
+        self.assertEqual(len(eventos), 1)
+        self.assertIsNone(eventos[0]['session_id'])
+        # Mismo origen: la cookie identifica las próximas requests
+        self.assertTrue(respuesta.cookies['carrito_sesion'].value)
+
+    def test_con_header_deduplica_la_misma_vista(self):
+        eventos, _ = self.vista_producto(HTTP_X_SESSION_ID='visitante')
+        self.assertEqual(eventos[0]['session_id'], 'visitante')
+        self.assertEqual(self.vista_producto(HTTP_X_SESSION_ID='visitante')[0], [])
+
+
+@skipUnless(cohortes.NUMPY_AVAILABLE and archivo.PYARROW_AVAILABLE, 'Requiere NumPy y pyarrow')
+class CohortesArchivoTests(TestCase):
+    """La retención de semanas viejas sale de los eventos archivados"""
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(ANALYTICS_ARCHIVO_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_actividad_archivada_cuenta_en_la_retencion(self):
+        ahora = timezone.now()
+        registro = ahora - timedelta(weeks=18)
+        usuario = Usuario.objects.create_user(username='viejo', email='viejo@x.com', password='x')
+        Usuario.objects.filter(pk=usuario.pk).update(fecha_registro=registro)
+        # Sin el evento de registro que crea la señal
+        EventoUsuario.objects.all().delete()
+        evento = EventoUsuario.objects.create(usuario=usuario, tipo_evento='vista_producto')
+        EventoUsuario.objects.filter(pk=evento.pk).update(timestamp=registro + timedelta(days=8))
+
+        archivo.archivar_eventos(ahora - timedelta(days=90))
+        self.assertFalse(EventoUsuario.objects.exists())
+
+        datos = cohortes.calcular_cohortes(20)
+
+        self.assertEqual(datos['eventos_archivados'], 1)
+        cohorte = next(c for c in datos['cohortes'] if c['usuarios'])
+        self.assertEqual(cohorte['retencion'][1], 100.0)
+        self.assertEqual(cohorte['retencion'][2], 0.0)
+
+
+@skipUnless(archivo.PYARROW_AVAILABLE, 'Requiere pyarrow')
+class ArchivoEventosTests(TestCase):
+
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        ajustes = override_settings(ANALYTICS_ARCHIVO_DIR=directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    @override_settings(TIME_ZONE='America/Argentina/Buenos_Aires')
+    def test_el_dia_se_agrupa_en_hora_local_como_el_mes(self):
+        evento = EventoUsuario.objects.create(tipo_evento='vista_producto', session_id='s')
+        # 01:00 UTC del 1 de febrero = 22:00 del 31 de enero en Buenos Aires
+        momento = datetime(2024, 2, 1, 1, 0, tzinfo=dt_timezone.utc)
+        EventoUsuario.objects.filter(pk=evento.pk).update(timestamp=momento)
+
+        archivo.archivar_eventos(timezone.now())
+
+        self.assertEqual(archivo.meses_archivados(), ['2024-01'])
+        self.assertEqual(
+            archivo.contar(por=['mes', 'dia']),
+            [{'mes': '2024-01', 'dia': '2024-01-31', 'eventos': 1, 'ponderado': 1}],
+        )
@@ -1,6 +1,9 @@
 from .models import EventoUsuario
+from .politicas import total_ponderado
 from django.db.models import Count, Sum, Avg
 from datetime import datetime, timedelta
+import re
+import unicodedata
 
 
 class AnalyticsTracker:
@@ -51,6 +54,12 @@ class AnalyticsTracker:
         }
         
         if request:
+            # Bots, prefetch, recargas y muestreo (ver apps.analytics.politicas)
+            from .politicas import evaluar
+            peso = evaluar(request, 'vista_producto', session_id, producto.pk)
+            if peso is None:
+                return
+            kwargs['peso'] = peso
             kwargs['ip_address'] = get_client_ip(request)
             kwargs['user_agent'] = request.META.get('HTTP_USER_AGENT', '')
         
@@ -124,6 +133,8 @@ class AnalyticsTracker:
     def obtener_productos_mas_vistos(dias=7, limite=10):
         """
         Obtener productos más vistos en los últimos X días
+
+        Las vistas suman el peso de cada evento (corregidas por muestreo).
         """
         fecha_desde = datetime.now() - timedelta(days=dias)
         return EventoUsuario.objects.filter(
@@ -131,7 +142,7 @@ class AnalyticsTracker:
             timestamp__gte=fecha_desde,
             producto__isnull=False
         ).values('producto', 'producto__nombre').annotate(
-            vistas=Count('id')
+            vistas=Sum('peso')
         ).order_by('-vistas')[:limite]
     
     @staticmethod
@@ -142,7 +153,8 @@ class AnalyticsTracker:
         fecha_desde = datetime.now() - timedelta(days=dias)
         eventos = EventoUsuario.objects.filter(timestamp__gte=fecha_desde)
         
-        vistas = eventos.filter(tipo_evento='vista_producto').count()
+        # Las vistas se muestrean: se cuentan por peso
+        vistas = total_ponderado(eventos.filter(tipo_evento='vista_producto'))
         compras = eventos.filter(tipo_evento='compra_completada').count()
         
         if vistas > 0:
@@ -157,4 +169,31 @@ def get_client_ip(request):
         ip = x_forwarded_for.split(',')[0]
     else:
         ip = request.META.get('REMOTE_ADDR')
-    return ip
\ No newline at end of file
+    return ip
+
+
+def normalizar_consulta(texto):
+    """
+    Normaliza un texto de búsqueda: minúsculas, sin acentos y con espacios simples
+    
+    Uso:
+    normalizar_consulta("  Remera  Négra ")  # -> "remera negra"
+    """
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r'\s+', ' ', texto).strip().lower()
+
+
+def percentil(valores_ordenados, p):
+    """
+    Percentil p (0-100) de una lista ya ordenada, por el rango más cercano
+    
+    Uso:
+    percentil([10, 20, 30, 40], 50)  # -> 30
+    """
+    if not valores_ordenados:
+        return 0
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
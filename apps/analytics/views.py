@@ -2,11 +2,14 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg, Q, F
+from django.db.models import Sum, Count, Avg, Max, Q, F
 from datetime import timedelta, date
 from .models import (
     EventoUsuario,
+    BusquedaRegistrada,
     MetricaProducto,
     MetricaDiaria,
     ConfiguracionGoogleAnalytics,
@@ -21,8 +24,11 @@ from .serializers import (
     DatosGoogleAnalyticsSerializer,
     ResumenMetricasSerializer,
     TopProductoSerializer,
-    EmbudoConversionSerializer
+    EmbudoConversionSerializer,
+    BusquedaTopSerializer
 )
+from .politicas import total_ponderado
+from . import archivo, cohortes
 
 
 class EventoUsuarioViewSet(viewsets.ModelViewSet):
@@ -304,7 +310,7 @@ class ReportesViewSet(viewsets.ViewSet):
         # Contar eventos por tipo
         eventos = EventoUsuario.objects.filter(timestamp__gte=fecha_desde)
         
-        visitas = eventos.filter(tipo_evento='vista_producto').count()
+        visitas = total_ponderado(eventos.filter(tipo_evento='vista_producto'))
         agregados = eventos.filter(tipo_evento='agregar_carrito').count()
         checkouts = eventos.filter(tipo_evento='inicio_checkout').count()
         compras = eventos.filter(tipo_evento='compra_completada').count()
@@ -332,6 +338,69 @@ class ReportesViewSet(viewsets.ViewSet):
         serializer.is_valid()
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def historico(self, request):
+        """
+        Eventos archivados en Parquet (fuera de la retención de la base)
+        GET /api/analytics/reportes/historico/?meses=2024-01,2024-02&por=mes,tipo_evento&tipo_evento=vista_producto
+
+        Sin "por" retorna el total; "por" acepta columnas del archivo
+        (mes, dia, tipo_evento, producto_id, categoria_id, usuario_id).
+        """
+        if not archivo.PYARROW_AVAILABLE:
+            return Response(
+                {'error': 'pyarrow no está instalado. Ejecutar: pip install pyarrow'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        meses = [m for m in request.query_params.get('meses', '').split(',') if m]
+        por = [c for c in request.query_params.get('por', '').split(',') if c]
+        invalidos = set(por) - {'mes', 'dia', 'tipo_evento', 'producto_id', 'categoria_id', 'usuario_id'}
+        if invalidos:
+            return Response(
+                {'error': f'Columnas inválidas en "por": {", ".join(sorted(invalidos))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({
+            'meses_archivados': archivo.meses_archivados(),
+            'resultado': archivo.contar(
+                meses=meses or None,
+                por=por,
+                tipo_evento=request.query_params.get('tipo_evento') or None
+            ),
+        })
+    
+    @action(detail=False, methods=['get'])
+    def cohortes(self, request):
+        """
+        Cohortes semanales de registro: retención por semana y recompra
+        GET /api/analytics/reportes/cohortes/?semanas=12&tipo_evento=vista_producto&refrescar=1
+
+        Se calcula con NumPy (apps.analytics.cohortes) y se cachea
+        ANALYTICS_COHORTES_TTL segundos; `refrescar` ignora la cache.
+        """
+        if not cohortes.NUMPY_AVAILABLE:
+            return Response(
+                {'error': 'numpy no está instalado. Ejecutar: pip install numpy'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        
+        try:
+            semanas = min(max(int(request.query_params.get('semanas', 12)), 1), 52)
+        except ValueError:
+            return Response({'error': 'semanas debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+        tipo_evento = request.query_params.get('tipo_evento') or None
+        if tipo_evento and tipo_evento not in dict(EventoUsuario.TIPO_EVENTO):
+            return Response({'error': 'Tipo de evento inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        clave = f'analytics:cohortes:{semanas}:{tipo_evento or "todos"}'
+        datos = None if request.query_params.get('refrescar') else cache.get(clave)
+        if datos is None:
+            datos = cohortes.calcular_cohortes(semanas, tipo_evento)
+            cache.set(clave, datos, settings.ANALYTICS_COHORTES_TTL)
+        return Response(datos)
+    
     @action(detail=False, methods=['get'])
     def productos_performance(self, request):
         """
@@ -345,4 +414,71 @@ class ReportesViewSet(viewsets.ViewSet):
         )[:limite]
         
         serializer = MetricaProductoSerializer(metricas, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def busquedas_top(self, request):
+        """
+        Consultas más buscadas (agrupadas por texto normalizado)
+        GET /api/analytics/reportes/busquedas_top/?dias=30&limite=20&min_resultados=1&max_resultados=5
+        """
+        try:
+            dias = int(request.query_params.get('dias', 30))
+            limite = min(int(request.query_params.get('limite', 20)), 200)
+            min_resultados = request.query_params.get('min_resultados')
+            max_resultados = request.query_params.get('max_resultados')
+            min_resultados = int(min_resultados) if min_resultados not in (None, '') else None
+            max_resultados = int(max_resultados) if max_resultados not in (None, '') else None
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Parámetros numéricos inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        busquedas = BusquedaRegistrada.objects.filter(
+            timestamp__gte=timezone.now() - timedelta(days=dias)
+        )
+        if min_resultados is not None:
+            busquedas = busquedas.filter(resultados__gte=min_resultados)
+        if max_resultados is not None:
+            busquedas = busquedas.filter(resultados__lte=max_resultados)
+        
+        filas = busquedas.values('consulta_normalizada').annotate(
+            total=Count('id'),
+            sin_resultados=Count('id', filter=Q(resultados=0)),
+            ultima_busqueda=Max('timestamp')
+        ).order_by('-total', 'consulta_normalizada')[:limite]
+        
+        return Response({
+            'periodo': f'Últimos {dias} días',
+            'busquedas': BusquedaTopSerializer(filas, many=True).data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def busquedas_sin_resultados(self, request):
+        """
+        Consultas que no devolvieron productos (oportunidades de catálogo)
+        GET /api/analytics/reportes/busquedas_sin_resultados/?dias=30&limite=20
+        """
+        try:
+            dias = int(request.query_params.get('dias', 30))
+            limite = min(int(request.query_params.get('limite', 20)), 200)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Parámetros numéricos inválidos'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Usa el índice (resultados, timestamp, consulta_normalizada)
+        filas = BusquedaRegistrada.objects.filter(
+            resultados=0,
+            timestamp__gte=timezone.now() - timedelta(days=dias)
+        ).values('consulta_normalizada').annotate(
+            total=Count('id'),
+            ultima_busqueda=Max('timestamp')
+        ).order_by('-total', 'consulta_normalizada')[:limite]
+        
+        return Response({
+            'periodo': f'Últimos {dias} días',
+            'busquedas': BusquedaTopSerializer(filas, many=True).data
+        })
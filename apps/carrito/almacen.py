@@ -0,0 +1,306 @@
+"""
+Carrito de sesión para compradores anónimos
+
+Las líneas del carrito anónimo viven en cache (clave por sesión) y no tocan
+la base de datos mientras el usuario navega y agrega productos: solo se lee
+el producto/variante para validar stock y precio. El carrito se escribe en
+la base recién al hacer checkout (persistir) o al iniciar sesión (fusionar
+con el carrito del usuario).
+
+La sesión se identifica con el header X-Session-ID o la cookie
+`carrito_sesion`, sin crear filas en django_session. Desde otro origen la
+cookie no llega (CORS sin credenciales): el cliente guarda el session_id
+que devuelve la API y lo manda en el header (permitido en CORS_ALLOW_HEADERS).
+
+Agregar y quitar leen, modifican y vuelven a escribir el carrito: se hace
+con un bloqueo por sesión (cache.add) para no perder líneas cuando llegan
+dos requests a la vez.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+
+from apps.analytics.models import EventoUsuario
+from apps.catalogo.models import Producto, ProductoVariante
+from .models import Carrito, ItemCarrito
+
+PREFIJO = 'carrito_sesion:'
+COOKIE_SESION = 'carrito_sesion'
+HEADER_SESION = 'X-Session-ID'
+# Vencimiento del bloqueo (por si el proceso muere) y espera máxima
+BLOQUEO_SEGUNDOS = 5
+
+
+def _cache():
+    return caches[getattr(settings, 'CARRITO_SESION_CACHE', 'default')]
+
+
+@contextmanager
+def _bloqueo(session_id):
+    """
+    Exclusión por sesión con cache.add
+
+    add es atómico en Redis, LocMem y FileBasedCacheAtomica (la cache en
+    archivos que se usa sin Redis).
+    """
+    cache = _cache()
+    clave = f'{PREFIJO}bloqueo:{session_id}'
+    dueno = uuid.uuid4().hex
+    limite = time.monotonic() + BLOQUEO_SEGUNDOS
+    while not cache.add(clave, dueno, BLOQUEO_SEGUNDOS):
+        if time.monotonic() > limite:
+            raise ValidationError("El carrito se está actualizando, intentá de nuevo")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        if cache.get(clave) == dueno:
+            cache.delete(clave)
+
+
+def obtener_session_id(request, crear=True):
+    """
+    Identificador de la sesión anónima: header, cookie o uno nuevo
+
+    Retorna None si no hay identificador y crear=False.
+    """
+    session_id = request.headers.get(HEADER_SESION) or request.COOKIES.get(COOKIE_SESION)
+    if session_id:
+        return session_id[:64]
+    return uuid.uuid4().hex if crear else None
+
+
+class CarritoSesion:
+    """
+    Carrito anónimo guardado en cache
+
+    Estructura guardada: {'items': {'<producto>:<variante>': {...}}, 'actualizado': ts}
+    Cada línea guarda los datos para mostrarla (nombre, precio, talla, color)
+    así listar el carrito no consulta la base.
+    """
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.clave = PREFIJO + session_id
+        self._cargar()
+
+    def _cargar(self):
+        self._datos = _cache().get(self.clave) or {'items': {}}
+
+    @staticmethod
+    def clave_linea(producto_id, variante_id=None):
+        return f'{producto_id}:{variante_id or ""}'
+
+    @property
+    def lineas(self):
+        return self._datos['items']
+
+    def items(self):
+        return [
+            {**linea, 'clave': clave, 'subtotal': str(Decimal(linea['precio_unitario']) * linea['cantidad'])}
+            for clave, linea in self.lineas.items()
+        ]
+
+    def resumen(self):
+        subtotal = Decimal('0')
+        total_items = 0
+        for linea in self.lineas.values():
+            subtotal += Decimal(linea['precio_unitario']) * linea['cantidad']
+            total_items += linea['cantidad']
+        return {
+            'subtotal': subtotal,
+            'total_items': total_items,
+            'cantidad_productos': len(self.lineas),
+        }
+
+    def agregar(self, producto_id, variante_id=None, cantidad=1):
+        """
+        Suma un producto al carrito validando stock con una sola lectura
+
+        Lanza DoesNotExist si el producto/variante no existe y ValidationError
+        si no hay stock suficiente.
+        """
+        if cantidad < 1:
+            raise ValidationError("La cantidad debe ser mayor a 0")
+
+        clave = self.clave_linea(producto_id, variante_id)
+
+        if variante_id:
+            variante = ProductoVariante.objects.select_related('producto', 'talla', 'color').get(
+                pk=variante_id, producto_id=producto_id
+            )
+            producto = variante.producto
+            disponible = variante.stock if variante.activo else 0
+            linea = {
+                'producto_id': producto.id,
+                'variante_id': variante.id,
+                'nombre': producto.nombre,
+                'talla': variante.talla.nombre,
+                'color': variante.color.nombre,
+                'precio_unitario': str(variante.precio_final),
+            }
+        else:
+            producto = Producto.objects.get(pk=producto_id)
+            disponible = producto.stock_total()
+            linea = {
+                'producto_id': producto.id,
+                'variante_id': None,
+                'nombre': producto.nombre,
+                'talla': None,
+                'color': None,
+                'precio_unitario': str(producto.precio_base),
+            }
+
+        linea['imagen'] = producto.imagen_principal.name if producto.imagen_principal else None
+
+        with _bloqueo(self.session_id):
+            # Se relee dentro del bloqueo: otra request pudo haber agregado
+            self._cargar()
+            actual = self.lineas.get(clave, {}).get('cantidad', 0)
+            if actual + cantidad > disponible:
+                raise ValidationError(f"Stock insuficiente para {producto.nombre}. Disponible: {disponible}")
+            linea['cantidad'] = actual + cantidad
+            self.lineas[clave] = linea
+            self.guardar()
+        return linea
+
+    def quitar(self, producto_id, variante_id=None, cantidad=None):
+        """Resta `cantidad` de la línea (o la elimina si es None o llega a cero)"""
+        if cantidad is not None and cantidad < 1:
+            raise ValidationError("La cantidad debe ser mayor a 0")
+        clave = self.clave_linea(producto_id, variante_id)
+        with _bloqueo(self.session_id):
+            self._cargar()
+            linea = self.lineas.get(clave)
+            if linea is None:
+                return None
+            if cantidad is None or linea['cantidad'] <= cantidad:
+                del self.lineas[clave]
+                linea = None
+            else:
+                linea['cantidad'] -= cantidad
+            self.guardar()
+        return linea
+
+    def vaciar(self):
+        self._datos = {'items': {}}
+        _cache().delete(self.clave)
+
+    def guardar(self):
+        self._datos['actualizado'] = time.time()
+        _cache().set(self.clave, self._datos, getattr(settings, 'CARRITO_SESION_TTL', 60 * 60 * 24 * 7))
+
+    def persistir(self, usuario=None):
+        """
+        Escribe el carrito en la base (checkout) y limpia la cache
+
+        Valida el stock de todas las líneas con dos consultas, crea el carrito
+        y sus items con bulk_create y registra los eventos de analytics en
+        bloque (bulk_create no dispara las señales de ItemCarrito).
+        """
+        if not self.lineas:
+            raise ValidationError("El carrito está vacío")
+
+        lineas = list(self.lineas.values())
+        variantes = ProductoVariante.objects.select_related('producto').in_bulk(
+            [linea['variante_id'] for linea in lineas if linea['variante_id']]
+        )
+        sin_variante = [linea['producto_id'] for linea in lineas if not linea['variante_id']]
+        productos = Producto.objects.in_bulk(sin_variante)
+        stock_productos = dict(
+            ProductoVariante.objects.filter(producto_id__in=sin_variante)
+            .order_by().values('producto').annotate(total=Sum('stock')).values_list('producto', 'total')
+        ) if sin_variante else {}
+
+        with transaction.atomic():
+            carrito = Carrito.objects.create(usuario=usuario, session_id=self.session_id)
+            items = []
+            for linea in lineas:
+                if linea['variante_id']:
+                    variante = variantes.get(linea['variante_id'])
+                    if variante is None:
+                        raise ValidationError(f"{linea['nombre']} ya no está disponible")
+                    producto = variante.producto
+                    disponible = variante.stock if variante.activo else 0
+                    precio_unitario = variante.precio_final
+                else:
+                    variante = None
+                    producto = productos.get(linea['producto_id'])
+                    if producto is None:
+                        raise ValidationError(f"{linea['nombre']} ya no está disponible")
+                    disponible = stock_productos.get(producto.pk) or 0
+                    precio_unitario = producto.precio_base
+
+                if linea['cantidad'] > disponible:
+                    raise ValidationError(f"Stock insuficiente para {producto.nombre}. Disponible: {disponible}")
+
+                items.append(ItemCarrito(
+                    carrito=carrito,
+                    producto=producto,
+                    variante=variante,
+                    cantidad=linea['cantidad'],
+                    precio_unitario=precio_unitario,
+                ))
+            ItemCarrito.objects.bulk_create(items)
+            EventoUsuario.objects.bulk_create([
+                EventoUsuario(
+                    usuario=usuario,
+                    tipo_evento='agregar_carrito',
+                    producto_id=item.producto_id,
+                    categoria_id=item.producto.categoria_id,
+                    session_id=self.session_id,
+                    metadata={
+                        'cantidad': item.cantidad,
+                        'precio_unitario': float(item.precio_unitario),
+                        'origen': 'carrito_sesion',
+                    }
+                )
+                for item in items
+            ])
+
+        self.vaciar()
+        return carrito
+
+    def fusionar(self, usuario):
+        """
+        Pasa las líneas al carrito activo del usuario (al iniciar sesión)
+
+        Usa Carrito.agregar_producto: suma sobre las líneas existentes y
+        valida stock. Las líneas sin stock suficiente se omiten y se retornan
+        junto al carrito para avisar al usuario.
+        """
+        if not self.lineas:
+            return None, []
+
+        carrito = Carrito.objects.filter(usuario=usuario, activo=True).order_by('-fecha_modificacion').first()
+        if carrito is None:
+            carrito = Carrito.objects.create(usuario=usuario, session_id=self.session_id)
+
+        omitidas = []
+        for linea in self.lineas.values():
+            try:
+                carrito.agregar_producto(
+                    linea['producto_id'],
+                    variante_id=linea['variante_id'],
+                    cantidad=linea['cantidad'],
+                )
+            except (Producto.DoesNotExist, ProductoVariante.DoesNotExist, ValidationError):
+                omitidas.append(linea)
+
+        self.vaciar()
+        return carrito, omitidas
+
+
+def fusionar_carrito_sesion(request, usuario):
+    """Fusiona el carrito anónimo de la request (si hay) con el del usuario"""
+    session_id = request.data.get('session_id') or obtener_session_id(request, crear=False)
+    if not session_id:
+        return None, []
+    return CarritoSesion(session_id).fusionar(usuario)
@@ -0,0 +1,34 @@
+"""
+Cache en archivos con add() atómico entre procesos
+
+FileBasedCache.add() consulta has_key() y después escribe: dos workers
+pueden "ganar" el mismo add. Se usa cuando no hay Redis para los carritos
+anónimos, donde add() hace de bloqueo por sesión (ver apps.carrito.almacen).
+"""
+import os
+import tempfile
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class FileBasedCacheAtomica(FileBasedCache):
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # has_key() borra el archivo si venció
+        if self.has_key(key, version):
+            return False
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, 'wb') as f:
+                self._write_content(f, timeout, value)
+            # link() falla si otro proceso ya creó el archivo
+            os.link(tmp_path, fname)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            os.remove(tmp_path)
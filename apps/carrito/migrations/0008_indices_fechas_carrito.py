@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0007_alter_itemcarrito_unique_together_and_more'),
+        ('catalogo', '0009_archivos_media_contenido'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='carrito',
+            index=models.Index(fields=['fecha_modificacion'], name='carritos_fecha_m_0ce226_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemcarrito',
+            index=models.Index(fields=['fecha_agregado'], name='items_carri_fecha_a_78c13a_idx'),
+        ),
+    ]
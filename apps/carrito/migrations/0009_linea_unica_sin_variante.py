@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:04
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def unificar_lineas_sin_variante(apps, schema_editor):
+    """
+    Junta las líneas repetidas sin variante (unique_together no las frenaba)
+
+    Queda la más antigua de cada carrito/producto con la suma de cantidades.
+    """
+    ItemCarrito = apps.get_model('carrito', 'ItemCarrito')
+    repetidas = (
+        ItemCarrito.objects.filter(variante__isnull=True)
+        .values('carrito_id', 'producto_id')
+        .annotate(lineas=Count('id'), primera=Min('id'), total=Sum('cantidad'))
+        .filter(lineas__gt=1)
+    )
+    for grupo in repetidas:
+        ItemCarrito.objects.filter(pk=grupo['primera']).update(cantidad=grupo['total'])
+        ItemCarrito.objects.filter(
+            carrito_id=grupo['carrito_id'], producto_id=grupo['producto_id'], variante__isnull=True
+        ).exclude(pk=grupo['primera']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carrito', '0008_indices_fechas_carrito'),
+        ('catalogo', '0009_archivos_media_contenido'),
+    ]
+
+    operations = [
+        migrations.RunPython(unificar_lineas_sin_variante, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='itemcarrito',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='itemcarrito',
+            constraint=models.UniqueConstraint(models.F('carrito'), models.F('producto'), django.db.models.functions.comparison.Coalesce('variante', 0), name='items_carrito_linea_unica'),
+        ),
+    ]
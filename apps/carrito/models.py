@@ -1,5 +1,8 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, FilteredRelation, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.utils import timezone
 from apps.catalogo.models import Producto, ProductoVariante
 from django.core.exceptions import ValidationError
 
@@ -24,19 +27,157 @@ class Carrito(models.Model):
         db_table = 'carritos'
         verbose_name = 'Carrito'
         verbose_name_plural = 'Carritos'
+        indexes = [
+            # Escaneo incremental de carritos abandonados
+            models.Index(fields=['fecha_modificacion']),
+        ]
     
     def __str__(self):
         if self.usuario:
             return f"Carrito de {self.usuario.username}"
         return f"Carrito anónimo {self.session_id}"
     
+    def resumen(self):
+        """
+        Totales del carrito calculados en una sola pasada por los items
+
+        Usa los items precargados (prefetch_related) si los hay y queda
+        guardado en la instancia: subtotal y total_items no vuelven a iterar.
+        """
+        if getattr(self, '_resumen', None) is None:
+            subtotal = 0
+            total_items = 0
+            items = self.items.all()
+            for item in items:
+                subtotal += item.subtotal()
+                total_items += item.cantidad
+            self._resumen = {
+                'subtotal': subtotal,
+                'total_items': total_items,
+                'cantidad_productos': len(items),
+            }
+        return self._resumen
+
+    def invalidar_resumen(self):
+        """Descarta los totales guardados luego de modificar los items"""
+        self._resumen = None
+
+    def agregar_producto(self, producto_id, variante_id=None, cantidad=1):
+        """
+        Agrega un producto al carrito (o suma a la línea existente) validando stock
+
+        Una consulta trae la variante con su producto, talla, color y la línea
+        actual del carrito; una segunda inserta la línea o suma la cantidad (y
+        en ese caso una tercera marca la actividad en fecha_modificacion del
+        carrito). Solo la suma verifica el stock en la misma sentencia UPDATE;
+        una línea nueva se valida contra el stock leído en la primera consulta
+        (el carrito no reserva stock: el checkout lo vuelve a validar con la
+        variante bloqueada).
+        Lanza DoesNotExist si el producto/variante no existe y ValidationError
+        si no hay stock suficiente.
+        """
+        if cantidad < 1:
+            raise ValidationError("La cantidad debe ser mayor a 0")
+
+        if variante_id:
+            variante = (
+                ProductoVariante.objects
+                .annotate(linea=FilteredRelation(
+                    'items_carrito',
+                    condition=Q(items_carrito__carrito_id=self.pk)
+                ))
+                .select_related('producto', 'talla', 'color', 'linea')
+                .order_by()
+                .get(pk=variante_id, producto_id=producto_id)
+            )
+            producto = variante.producto
+            linea = getattr(variante, 'linea', None)
+            disponible = variante.stock if variante.activo else 0
+            precio_unitario = variante.precio_final
+            stock_actual = Subquery(
+                ProductoVariante.objects.filter(pk=variante.pk, activo=True).values('stock')[:1]
+            )
+        else:
+            # Compatibilidad con líneas sin variante: stock total del producto
+            stock_variantes = (
+                ProductoVariante.objects.filter(producto=OuterRef('pk'))
+                .order_by().values('producto').annotate(total=Sum('stock')).values('total')
+            )
+            producto = (
+                Producto.objects
+                .annotate(
+                    stock_variantes=Subquery(stock_variantes),
+                    linea=FilteredRelation(
+                        'itemcarrito',
+                        condition=Q(itemcarrito__carrito_id=self.pk, itemcarrito__variante__isnull=True)
+                    ),
+                )
+                .select_related('linea')
+                .order_by()
+                .get(pk=producto_id)
+            )
+            variante = None
+            linea = getattr(producto, 'linea', None)
+            disponible = producto.stock_variantes or 0
+            precio_unitario = producto.precio_base
+            stock_actual = Subquery(
+                ProductoVariante.objects.filter(producto_id=producto.pk)
+                .order_by().values('producto').annotate(total=Sum('stock')).values('total')
+            )
+
+        item = ItemCarrito(carrito=self, producto=producto, variante=variante)
+        item.validar_cantidad((linea.cantidad if linea else 0) + cantidad, disponible)
+
+        if linea is None:
+            item.cantidad = cantidad
+            item.precio_unitario = precio_unitario
+            try:
+                with transaction.atomic():
+                    item.save(validar_stock=False)
+                self.invalidar_resumen()
+                return item
+            except IntegrityError:
+                # Otra request creó la línea en paralelo: se suma sobre ella
+                linea = (
+                    ItemCarrito.objects
+                    .filter(carrito=self, producto=producto, variante=variante)
+                    .order_by('pk').first()
+                )
+                if linea is None:
+                    raise
+
+        actualizados = ItemCarrito.objects.filter(
+            pk=linea.pk,
+            cantidad__lte=stock_actual - cantidad
+        ).update(cantidad=F('cantidad') + cantidad)
+        if not actualizados:
+            # El stock cambió entre la lectura y la actualización
+            if variante:
+                disponible = ProductoVariante.objects.filter(
+                    pk=variante.pk, activo=True
+                ).values_list('stock', flat=True).first() or 0
+            else:
+                disponible = producto.stock_total()
+            raise item.error_stock(disponible)
+
+        # update() no toca auto_now: sin esto detectar_carritos_abandonados no
+        # ve la actividad de sumar a una línea existente
+        Carrito.objects.filter(pk=self.pk).update(fecha_modificacion=timezone.now())
+
+        linea.cantidad += cantidad
+        linea.carrito = self
+        linea.producto = producto
+        linea.variante = variante
+        self.invalidar_resumen()
+        return linea
+
     def calcular_subtotal(self):
         """Calcula el subtotal del carrito"""
-        return sum(item.subtotal for item in self.items.all())
+        return self.resumen()['subtotal']
     
     def total_items(self):
         """Cuenta total de items en el carrito"""
-        return sum(item.cantidad for item in self.items.all())
+        return self.resumen()['total_items']
 
 
 class ItemCarrito(models.Model):
@@ -64,30 +205,52 @@ class ItemCarrito(models.Model):
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
     fecha_agregado = models.DateTimeField(auto_now_add=True)
     
-    def save(self, *args, **kwargs):
-        # Validar stock antes de guardar
-        if self.variante:
-            # Si hay variante, validar el stock de la variante
-            if not self.variante.tiene_stock(self.cantidad):
-                raise ValidationError(
-                    f"Stock insuficiente para {self.producto.nombre} "
-                    f"({self.variante.talla.nombre} - {self.variante.color.nombre}). "
-                    f"Disponible: {self.variante.stock}"
-                )
-        else:
-            # Si no hay variante (compatibilidad con datos antiguos), validar stock total
-            if not self.producto.stock_total() >= self.cantidad:
-                raise ValidationError(
-                    f"Stock insuficiente para {self.producto.nombre}. "
-                    f"Disponible: {self.producto.stock_total()}"
-                )
+    def save(self, *args, validar_stock=True, **kwargs):
+        # Validar stock antes de guardar (agregar_producto ya lo valida)
+        if validar_stock:
+            if self.variante_id:
+                # Si hay variante, validar el stock de la variante
+                variante = self.variante
+                self.validar_cantidad(self.cantidad, variante.stock if variante.activo else 0)
+            else:
+                # Si no hay variante (compatibilidad con datos antiguos), validar stock total
+                self.validar_cantidad(self.cantidad, self.producto.stock_total())
         super().save(*args, **kwargs)
+
+    def validar_cantidad(self, cantidad, disponible):
+        """Lanza ValidationError si la cantidad supera el stock disponible"""
+        if cantidad > disponible:
+            raise self.error_stock(disponible)
+
+    def error_stock(self, disponible):
+        """ValidationError de stock insuficiente (puede consultar talla y color)"""
+        if self.variante_id:
+            return ValidationError(
+                f"Stock insuficiente para {self.producto.nombre} "
+                f"({self.variante.talla.nombre} - {self.variante.color.nombre}). "
+                f"Disponible: {disponible}"
+            )
+        return ValidationError(
+            f"Stock insuficiente para {self.producto.nombre}. "
+            f"Disponible: {disponible}"
+        )
     
     class Meta:
         db_table = 'items_carrito'
         verbose_name = 'Item de Carrito'
         verbose_name_plural = 'Items de Carrito'
-        unique_together = ['carrito', 'producto', 'variante']  # No duplicar productos con misma variante
+        constraints = [
+            # No duplicar productos con misma variante. Con unique_together las
+            # líneas sin variante (NULL) no chocan entre sí en MySQL: se indexa
+            # la variante con NULL -> 0
+            models.UniqueConstraint(
+                'carrito', 'producto', Coalesce('variante', 0),
+                name='items_carrito_linea_unica',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['fecha_agregado']),
+        ]
 
     
     def __str__(self):
@@ -41,7 +41,15 @@ class CarritoSerializer(serializers.ModelSerializer):
         read_only = ('fecha_creacion','fecha_modificacion',)
 
     def get_subtotal(self, obj):
-        return obj.calcular_subtotal()
+        return obj.resumen()['subtotal']
 
     def get_total_items(self, obj):
-        return obj.total_items()
\ No newline at end of file
+        return obj.resumen()['total_items']
+
+
+class CarritoResumenSerializer(serializers.Serializer):
+    """Representación compacta para el mini-carrito del header"""
+    id = serializers.IntegerField()
+    total_items = serializers.IntegerField()
+    cantidad_productos = serializers.IntegerField()
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
\ No newline at end of file
@@ -1,3 +1,181 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from apps.catalogo.models import Categoria, Color, Producto, ProductoVariante, Talla
+from .almacen import CarritoSesion
+from .models import Carrito, ItemCarrito
+
+
+def cache_archivos(test):
+    """Corre el test con los carritos en una FileBasedCacheAtomica temporal"""
+    directorio = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+    ajustes = override_settings(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'carritos': {'BACKEND': 'apps.carrito.cache.FileBasedCacheAtomica', 'LOCATION': directorio},
+        },
+        CARRITO_SESION_CACHE='carritos',
+        CATALOGO_VERSION_CACHE='default',
+    )
+    ajustes.enable()
+    test.addCleanup(ajustes.disable)
+    return caches['carritos']
+
+
+class FileBasedCacheAtomicaTests(TestCase):
+
+    def setUp(self):
+        self.cache = cache_archivos(self)
+
+    def test_add_solo_gana_una_vez(self):
+        self.assertTrue(self.cache.add('bloqueo', 'a', 60))
+        self.assertFalse(self.cache.add('bloqueo', 'b', 60))
+        self.assertEqual(self.cache.get('bloqueo'), 'a')
+
+    def test_add_sobre_una_clave_vencida(self):
+        self.cache.set('bloqueo', 'viejo', -1)
+        self.assertTrue(self.cache.add('bloqueo', 'nuevo', 60))
+        self.assertEqual(self.cache.get('bloqueo'), 'nuevo')
+
+    def test_add_concurrente_tiene_un_solo_ganador(self):
+        ganadores = []
+        barrera = threading.Barrier(8)
+
+        def intentar(i):
+            barrera.wait()
+            if self.cache.add('bloqueo', i, 60):
+                ganadores.append(i)
+
+        hilos = [threading.Thread(target=intentar, args=(i,)) for i in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(len(ganadores), 1)
+
+
+class CarritoSesionConcurrenciaTests(TransactionTestCase):
+
+    def setUp(self):
+        cache_archivos(self)
+        categoria = Categoria.objects.create(nombre='Remeras')
+        talla = Talla.objects.create(nombre='M')
+        colores = [Color.objects.create(nombre=f'Color {i}') for i in range(6)]
+        self.producto = Producto.objects.create(nombre='Remera', categoria=categoria, precio_base=10)
+        self.variantes = [
+            ProductoVariante.objects.create(producto=self.producto, talla=talla, color=color, stock=10)
+            for color in colores
+        ]
+
+    def test_agregados_simultaneos_no_pierden_lineas(self):
+        barrera = threading.Barrier(len(self.variantes))
+        errores = []
+
+        def agregar(variante):
+            try:
+                barrera.wait()
+                CarritoSesion('sesion').agregar(self.producto.id, variante_id=variante.id, cantidad=1)
+            except Exception as e:  # pragma: no cover - se reporta abajo
+                errores.append(e)
+
+        hilos = [threading.Thread(target=agregar, args=(v,)) for v in self.variantes]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(CarritoSesion('sesion').lineas), len(self.variantes))
+
+    def test_agregar_y_quitar_sobre_la_misma_linea(self):
+        primera = CarritoSesion('sesion')
+        segunda = CarritoSesion('sesion')
+        variante = self.variantes[0]
+
+        primera.agregar(self.producto.id, variante_id=variante.id, cantidad=2)
+        # segunda se cargó antes del primer agregado: igual suma sobre lo guardado
+        segunda.agregar(self.producto.id, variante_id=variante.id, cantidad=3)
+        self.assertEqual(CarritoSesion('sesion').resumen()['total_items'], 5)
+
+        primera.quitar(self.producto.id, variante_id=variante.id, cantidad=4)
+        self.assertEqual(CarritoSesion('sesion').resumen()['total_items'], 1)
+
+    def test_quitar_rechaza_cantidades_no_positivas(self):
+        variante = self.variantes[0]
+        CarritoSesion('sesion').agregar(self.producto.id, variante_id=variante.id, cantidad=2)
+
+        for cantidad in (0, -5):
+            with self.assertRaises(ValidationError):
+                CarritoSesion('sesion').quitar(self.producto.id, variante_id=variante.id, cantidad=cantidad)
+        self.assertEqual(CarritoSesion('sesion').resumen()['total_items'], 2)
+
+        respuesta = self.client.post(
+            '/api/carrito/carrito-sesion/quitar/',
+            {'producto_id': self.producto.id, 'variante_id': variante.id, 'cantidad': -5},
+            content_type='application/json', HTTP_X_SESSION_ID='sesion',
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(CarritoSesion('sesion').resumen()['total_items'], 2)
+
+
+class LineaSinVarianteTests(TestCase):
+    """Las líneas sin variante (datos antiguos) también son únicas por producto"""
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Remeras')
+        self.producto = Producto.objects.create(nombre='Remera', categoria=categoria, precio_base=10)
+        ProductoVariante.objects.create(
+            producto=self.producto, talla=Talla.objects.create(nombre='M'),
+            color=Color.objects.create(nombre='Rojo'), stock=10,
+        )
+        self.carrito = Carrito.objects.create(session_id='sesion')
+
+    def test_la_base_rechaza_una_segunda_linea_sin_variante(self):
+        ItemCarrito.objects.create(carrito=self.carrito, producto=self.producto, cantidad=1, precio_unitario=10)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ItemCarrito.objects.create(carrito=self.carrito, producto=self.producto, cantidad=1, precio_unitario=10)
+
+    def test_agregar_sin_variante_suma_sobre_la_linea(self):
+        self.carrito.agregar_producto(self.producto.id, cantidad=2)
+        self.carrito.agregar_producto(self.producto.id, cantidad=3)
+
+        self.assertEqual(
+            list(ItemCarrito.objects.filter(carrito=self.carrito).values_list('cantidad', flat=True)), [5]
+        )
+
+
+class AgregarProductoStockTests(TestCase):
+
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre='Remeras')
+        self.producto = Producto.objects.create(nombre='Remera', categoria=categoria, precio_base=10)
+        self.variante = ProductoVariante.objects.create(
+            producto=self.producto, talla=Talla.objects.create(nombre='M'),
+            color=Color.objects.create(nombre='Rojo'), stock=5,
+        )
+        self.carrito = Carrito.objects.create(session_id='sesion')
+
+    def test_stock_que_cae_antes_del_update_informa_lo_disponible(self):
+        self.carrito.agregar_producto(self.producto.id, self.variante.id, 2)
+        filtrar = ItemCarrito.objects.filter
+
+        def filtro(*args, **kwargs):
+            if 'cantidad__lte' in kwargs:
+                # Otra compra se lleva el stock entre la lectura y el UPDATE
+                ProductoVariante.objects.filter(pk=self.variante.pk).update(stock=2)
+            return filtrar(*args, **kwargs)
+
+        with mock.patch.object(ItemCarrito.objects, 'filter', side_effect=filtro):
+            with self.assertRaisesMessage(ValidationError, 'Disponible: 2'):
+                self.carrito.agregar_producto(self.producto.id, self.variante.id, 1)
+
+        self.assertEqual(ItemCarrito.objects.get(carrito=self.carrito).cantidad, 2)
@@ -1,8 +1,9 @@
 from rest_framework.routers import DefaultRouter
-from .views import CarritoViewSet, ItemCarritoViewSet
+from .views import CarritoViewSet, ItemCarritoViewSet, CarritoSesionViewSet
 
 router = DefaultRouter()
 router.register(r'carrito', CarritoViewSet, basename='carrito')
 router.register(r'item-carrito', ItemCarritoViewSet, basename='item_carrito')
+router.register(r'carrito-sesion', CarritoSesionViewSet, basename='carrito_sesion')
 
 urlpatterns = router.urls
\ No newline at end of file
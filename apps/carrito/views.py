@@ -1,16 +1,53 @@
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import render
 from django.core.exceptions import ValidationError 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
+from django.core.files.storage import default_storage
+from django.db.models import Count, DecimalField, F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
 from .models import Carrito, ItemCarrito
 from apps.catalogo.models import Producto, ProductoVariante
-from .serializer import CarritoSerializer, ItemCarritoSerializer
+from .serializer import CarritoSerializer, ItemCarritoSerializer, CarritoResumenSerializer
+from .almacen import CarritoSesion, COOKIE_SESION, obtener_session_id
 
 class CarritoViewSet(viewsets.ModelViewSet):
     queryset = Carrito.objects.all()
     serializer_class = CarritoSerializer
 
+    def get_queryset(self):
+        """
+        Carga carritos, items, productos y variantes en dos consultas fijas
+        """
+        queryset = Carrito.objects.all()
+        if self.action in ['list', 'retrieve']:
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'items',
+                    queryset=ItemCarrito.objects.select_related(
+                        'producto', 'variante__talla', 'variante__color'
+                    )
+                )
+            )
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def resumen(self, request, pk=None):
+        """Totales del carrito para el mini-carrito (una sola consulta agregada)"""
+        resumen = Carrito.objects.filter(pk=pk).annotate(
+            total_items=Coalesce(Sum('items__cantidad'), 0),
+            cantidad_productos=Count('items'),
+            subtotal=Coalesce(
+                Sum(F('items__cantidad') * F('items__precio_unitario'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+                Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+            ),
+        ).values('id', 'total_items', 'cantidad_productos', 'subtotal').first()
+
+        if resumen is None:
+            return Response({'error': 'Carrito no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(CarritoResumenSerializer(resumen).data)
+
     def perform_create(self, serializer):
         serializer.save(usuario=self.request.user)
     
@@ -19,31 +56,14 @@ class CarritoViewSet(viewsets.ModelViewSet):
         carrito = self.get_object()
         producto_id = request.data.get('producto_id')
         variante_id = request.data.get('variante_id')  # NUEVO: Recibir variante_id
-        cantidad = int(request.data.get('cantidad', 1))
-        producto = get_object_or_404(Producto, pk=producto_id)
 
         try:
-            # Si se especifica variante, obtenerla
-            variante = None
-            if variante_id:
-                variante = get_object_or_404(ProductoVariante, pk=variante_id, producto=producto)
-                precio_unitario = variante.precio_final
-            else:
-                precio_unitario = producto.precio_base
-
-            # Intentar obtener o crear el item con la variante
-            item, creado = ItemCarrito.objects.get_or_create(
-                carrito=carrito,
-                producto=producto,
-                variante=variante,  # NUEVO: Incluir variante en la búsqueda
-                defaults={'cantidad': cantidad, 'precio_unitario': precio_unitario}  
-            )
-
-            if not creado:
-                item.cantidad += cantidad
-                item.save()
-            
+            cantidad = int(request.data.get('cantidad', 1))
+            # Inserta o suma la línea validando stock en la misma sentencia
+            item = carrito.agregar_producto(producto_id, variante_id=variante_id, cantidad=cantidad)
             return Response(ItemCarritoSerializer(item).data, status=status.HTTP_201_CREATED)
+        except (Producto.DoesNotExist, ProductoVariante.DoesNotExist):
+            return Response({'error': 'Producto o variante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -54,6 +74,103 @@ class CarritoViewSet(viewsets.ModelViewSet):
         return Response({'mensaje': 'Carrito vaciado correctamente.'}, status=status.HTTP_200_OK)
 
 class ItemCarritoViewSet(viewsets.ModelViewSet):
-    queryset = ItemCarrito.objects.all()
+    queryset = ItemCarrito.objects.select_related('producto', 'variante__talla', 'variante__color')
     serializer_class = ItemCarritoSerializer
 
+
+class CarritoSesionViewSet(viewsets.ViewSet):
+    """
+    Carrito de compradores anónimos guardado en cache
+
+    GET  /api/carrito/carrito-sesion/            -> items y totales
+    POST /api/carrito/carrito-sesion/agregar/    -> { producto_id, variante_id, cantidad }
+    POST /api/carrito/carrito-sesion/quitar/     -> { producto_id, variante_id, cantidad? }
+    POST /api/carrito/carrito-sesion/vaciar/
+    POST /api/carrito/carrito-sesion/checkout/   -> guarda el carrito en la base
+
+    La sesión viaja en el header X-Session-ID o la cookie carrito_sesion
+    (se crea en la primera respuesta y se devuelve como session_id). El
+    frontend, en otro origen, no recibe la cookie: tiene que guardar el
+    session_id de la primera respuesta y mandarlo en X-Session-ID.
+    """
+    permission_classes = [AllowAny]
+
+    def _carrito(self, request):
+        return CarritoSesion(obtener_session_id(request))
+
+    def _respuesta(self, request, carrito, status_code=status.HTTP_200_OK):
+        items = carrito.items()
+        for item in items:
+            if item['imagen']:
+                item['imagen'] = request.build_absolute_uri(default_storage.url(item['imagen']))
+        resumen = carrito.resumen()
+        respuesta = Response({
+            'session_id': carrito.session_id,
+            'items': items,
+            'subtotal': str(resumen['subtotal']),
+            'total_items': resumen['total_items'],
+            'cantidad_productos': resumen['cantidad_productos'],
+        }, status=status_code)
+        if request.COOKIES.get(COOKIE_SESION) != carrito.session_id:
+            respuesta.set_cookie(COOKIE_SESION, carrito.session_id, max_age=60 * 60 * 24 * 30, samesite='Lax')
+        return respuesta
+
+    def list(self, request):
+        return self._respuesta(request, self._carrito(request))
+
+    @action(detail=False, methods=['post'])
+    def agregar(self, request):
+        carrito = self._carrito(request)
+        try:
+            cantidad = int(request.data.get('cantidad', 1))
+            carrito.agregar(
+                request.data.get('producto_id'),
+                variante_id=request.data.get('variante_id'),
+                cantidad=cantidad,
+            )
+        except (Producto.DoesNotExist, ProductoVariante.DoesNotExist):
+            return Response({'error': 'Producto o variante no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({'error': 'Datos inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+        return self._respuesta(request, carrito, status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'])
+    def quitar(self, request):
+        carrito = self._carrito(request)
+        cantidad = request.data.get('cantidad')
+        try:
+            carrito.quitar(
+                request.data.get('producto_id'),
+                variante_id=request.data.get('variante_id'),
+                cantidad=int(cantidad) if cantidad is not None else None,
+            )
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({'error': 'Datos inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+        return self._respuesta(request, carrito)
+
+    @action(detail=False, methods=['post'])
+    def vaciar(self, request):
+        carrito = self._carrito(request)
+        carrito.vaciar()
+        return self._respuesta(request, carrito)
+
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """Escribe el carrito de sesión en la base para continuar con el pedido"""
+        carrito = self._carrito(request)
+        usuario = request.user if request.user.is_authenticated else None
+        try:
+            persistido = carrito.persistir(usuario=usuario)
+        except ValidationError as e:
+            return Response({'error': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        persistido = Carrito.objects.prefetch_related(
+            Prefetch('items', queryset=ItemCarrito.objects.select_related(
+                'producto', 'variante__talla', 'variante__color'
+            ))
+        ).get(pk=persistido.pk)
+        return Response(CarritoSerializer(persistido, context={'request': request}).data, status=status.HTTP_201_CREATED)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Categoria, Talla, Color, Producto, ProductoVariante, ImagenProducto
+from .models import Categoria, Talla, Color, Producto, ProductoVariante, ImagenProducto, ArchivoMedia
 
 
 @admin.register(Categoria)
@@ -123,4 +123,11 @@ class ImagenProductoAdmin(admin.ModelAdmin):
                     )
                 except (ValueError, TypeError):
                     pass
-        return super().formfield_for_foreignkey(db_field, request, **kwargs)
\ No newline at end of file
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+@admin.register(ArchivoMedia)
+class ArchivoMediaAdmin(admin.ModelAdmin):
+    list_display = ['ruta', 'tamano', 'referencias', 'fecha_creacion']
+    search_fields = ['hash', 'ruta']
+    readonly_fields = ['hash', 'ruta', 'tamano', 'referencias', 'fecha_creacion']
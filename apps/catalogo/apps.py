@@ -5,3 +5,7 @@ class CatalogoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.catalogo'
     label = 'catalogo'
+
+    def ready(self):
+        """Importar signals cuando la app esté lista"""
+        import apps.catalogo.signals
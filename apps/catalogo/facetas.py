@@ -0,0 +1,183 @@
+"""
+Índice de facetas del catálogo (talla, color, sexo, categoría)
+
+Cada producto activo con alguna variante activa con stock ocupa un bit; por
+cada valor de faceta se guarda un entero de Python usado como bitmap con
+los productos que lo tienen. Talla y color se guardan también por par
+(talla, color) para que "talla M y color rojo" pida una misma variante con
+stock. Contar es hacer AND/OR entre enteros y bit_count(): ninguna consulta
+por pedido.
+
+Cada worker tiene su índice en memoria. Las señales del catálogo registran
+en `versionado` qué productos cambiaron; antes de responder se comparan
+versiones y solo se recargan esos productos (una consulta). Los cambios
+generales (tallas, colores, categorías) reconstruyen el índice.
+"""
+import threading
+from collections import defaultdict
+
+from .models import Categoria, Color, Producto, ProductoVariante, Talla
+from . import versionado
+
+DIMENSIONES = ('categoria', 'sexo', 'talla', 'color')
+
+
+def _unir(bitmaps, valores):
+    bits = 0
+    for valor in valores:
+        bits |= bitmaps.get(valor, 0)
+    return bits
+
+
+class IndiceFacetas:
+
+    def __init__(self, version):
+        self.version = version
+        self.posiciones = {}   # producto_id -> bit
+        self.libres = []       # bits de productos que salieron del índice
+        self.productos = {}    # producto_id -> (sexo, categoria_id, pares (talla, color))
+        self.universo = 0
+        self.bitmaps = {dimension: defaultdict(int) for dimension in (*DIMENSIONES, 'par')}
+        self.etiquetas = {}
+
+    # ==================== CARGA ====================
+
+    @staticmethod
+    def _variantes(producto_ids=None):
+        """Variantes con stock de productos activos, agrupadas por producto"""
+        variantes = ProductoVariante.objects.filter(activo=True, stock__gt=0, producto__activo=True)
+        if producto_ids is not None:
+            variantes = variantes.filter(producto_id__in=producto_ids)
+        por_producto = {}
+        for producto_id, sexo, categoria_id, talla_id, color_id in variantes.order_by().values_list(
+            'producto_id', 'producto__sexo', 'producto__categoria_id', 'talla_id', 'color_id'
+        ).iterator(chunk_size=5000):
+            _, _, pares = por_producto.setdefault(producto_id, (sexo, categoria_id, set()))
+            pares.add((talla_id, color_id))
+        return por_producto
+
+    @classmethod
+    def construir(cls, version):
+        indice = cls(version)
+        indice.etiquetas = {
+            'categoria': {c['id']: c for c in Categoria.objects.filter(activo=True).values('id', 'nombre')},
+            'talla': {
+                t['id']: t for t in Talla.objects.filter(activo=True).order_by('orden', 'nombre').values('id', 'nombre')
+            },
+            'color': {
+                c['id']: c for c in Color.objects.filter(activo=True).order_by('nombre').values('id', 'nombre', 'codigo_hex')
+            },
+            'sexo': {codigo: {'codigo': codigo, 'nombre': nombre} for codigo, nombre in Producto.SEXO_CHOICES},
+        }
+        for producto_id, datos in indice._variantes().items():
+            indice._agregar(producto_id, datos)
+        return indice
+
+    def _valores(self, datos):
+        sexo, categoria_id, pares = datos
+        yield 'categoria', categoria_id
+        if sexo:
+            yield 'sexo', sexo
+        for talla_id, color_id in pares:
+            yield 'talla', talla_id
+            yield 'color', color_id
+            yield 'par', (talla_id, color_id)
+
+    def _agregar(self, producto_id, datos):
+        posicion = self.libres.pop() if self.libres else len(self.posiciones)
+        bit = 1 << posicion
+        self.posiciones[producto_id] = posicion
+        self.productos[producto_id] = datos
+        self.universo |= bit
+        for dimension, valor in self._valores(datos):
+            self.bitmaps[dimension][valor] |= bit
+
+    def _quitar(self, producto_id):
+        posicion = self.posiciones.pop(producto_id)
+        mascara = ~(1 << posicion)
+        self.universo &= mascara
+        for dimension, valor in self._valores(self.productos.pop(producto_id)):
+            bitmaps = self.bitmaps[dimension]
+            bitmaps[valor] &= mascara
+            if not bitmaps[valor]:
+                del bitmaps[valor]
+        self.libres.append(posicion)
+
+    def aplicar(self, producto_ids, version):
+        """Recarga solo los productos cambiados"""
+        nuevos = self._variantes(producto_ids) if producto_ids else {}
+        for producto_id in producto_ids:
+            if producto_id in self.posiciones:
+                self._quitar(producto_id)
+            if producto_id in nuevos:
+                self._agregar(producto_id, nuevos[producto_id])
+        self.version = version
+
+    # ==================== CONTEO ====================
+
+    def _talla_color(self, tallas, colores):
+        """Productos con una variante con stock en alguna de las tallas y alguno de los colores"""
+        if tallas and colores:
+            return _unir(self.bitmaps['par'], [(t, c) for t in tallas for c in colores])
+        if tallas:
+            return _unir(self.bitmaps['talla'], tallas)
+        if colores:
+            return _unir(self.bitmaps['color'], colores)
+        return self.universo
+
+    def contar(self, filtros):
+        """
+        Total con todos los filtros y conteo de cada valor de cada faceta
+
+        filtros: {dimension: set de valores}; dentro de una dimensión los
+        valores se combinan con OR y entre dimensiones con AND. El conteo de
+        una faceta ignora su propio filtro, así se ven las alternativas.
+        """
+        tallas = filtros.get('talla')
+        colores = filtros.get('color')
+        por_producto = {
+            dimension: _unir(self.bitmaps[dimension], filtros[dimension]) if filtros.get(dimension) else self.universo
+            for dimension in ('categoria', 'sexo')
+        }
+
+        facetas = {}
+        for dimension, etiquetas in self.etiquetas.items():
+            # Todos los filtros menos el de esta dimensión
+            base = self.universo
+            for otra, bits in por_producto.items():
+                if otra != dimension:
+                    base &= bits
+            if dimension == 'talla':
+                contar_valor = lambda v, base=base: (self._talla_color([v], colores) & base).bit_count()
+            elif dimension == 'color':
+                contar_valor = lambda v, base=base: (self._talla_color(tallas, [v]) & base).bit_count()
+            else:
+                base &= self._talla_color(tallas, colores)
+                contar_valor = lambda v, base=base, bitmaps=self.bitmaps[dimension]: (bitmaps.get(v, 0) & base).bit_count()
+            facetas[dimension] = [
+                {**etiqueta, 'total': contar_valor(valor)}
+                for valor, etiqueta in etiquetas.items()
+                if dimension == 'sexo' or valor in self.bitmaps[dimension]
+            ]
+
+        total = self._talla_color(tallas, colores) & por_producto['categoria'] & por_producto['sexo']
+        return {'total': total.bit_count(), 'facetas': facetas}
+
+
+_indice = None
+_lock = threading.Lock()
+
+
+def contar(filtros):
+    """Conteos con el índice del proceso, poniéndolo al día con la versión del catálogo"""
+    global _indice
+    # La versión se lee antes de cargar datos: si algo cambia en el medio se vuelve a aplicar
+    version = versionado.version_actual()
+    with _lock:
+        if _indice is None or _indice.version != version:
+            cambios = versionado.cambios_desde(_indice.version, version) if _indice is not None else None
+            if cambios is None:
+                _indice = IndiceFacetas.construir(version)
+            else:
+                _indice.aplicar(cambios, version)
+        return {**_indice.contar(filtros), 'version': version}
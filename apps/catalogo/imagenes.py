@@ -0,0 +1,155 @@
+"""
+Derivados de imágenes de productos (miniaturas WebP/AVIF)
+
+Al subir una imagen se generan versiones reducidas en segundo plano (pool de
+hilos, después del commit) y sus rutas se guardan en un JSONField del modelo:
+
+    {"webp": {"150": "derivados/productos/foto-150.webp", ...}, "avif": {...}}
+
+Los serializers exponen esas rutas como URLs absolutas para armar srcset.
+"""
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .models import Producto
+from .storage import es_contenido
+from .versionado import registrar_cambio
+
+logger = logging.getLogger(__name__)
+
+TAMANOS = tuple(getattr(settings, 'IMAGENES_TAMANOS', (150, 320, 640)))
+
+# AVIF solo si Pillow fue compilado con soporte
+FORMATOS = ('webp', 'avif') if features.check('avif') else ('webp',)
+
+CALIDAD = {
+    'webp': 80,
+    'avif': 60,
+}
+
+CARPETA_DERIVADOS = 'derivados'
+
+# Campo de imagen -> campo JSON donde se guardan sus derivados
+CAMPOS_DERIVADOS = {
+    'imagen_principal': 'imagen_principal_derivados',
+    'imagen': 'derivados',
+}
+
+_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGENES_WORKERS', 2),
+    thread_name_prefix='derivados-imagenes',
+)
+
+
+def programar_derivados(instancia, campo):
+    """
+    Encola la generación de derivados de `instancia.<campo>`
+
+    Se ejecuta después del commit para que el worker vea la fila guardada.
+    """
+    archivo = getattr(instancia, campo)
+    if not archivo:
+        return
+
+    modelo = type(instancia)
+    pk = instancia.pk
+    nombre = archivo.name
+    transaction.on_commit(lambda: _pool.submit(_procesar, modelo, pk, campo, nombre))
+
+
+def registrar_cambio_imagen(modelo, pk):
+    """
+    Anota en la versión del catálogo el producto de una imagen actualizada
+
+    Los derivados y las rutas se guardan con queryset.update(), que no
+    dispara las señales: sin esto el snapshot del catálogo seguiría sin
+    las miniaturas hasta el próximo cambio.
+    """
+    if modelo is Producto:
+        producto_id = pk
+    else:
+        producto_id = modelo.objects.filter(pk=pk).values_list('producto_id', flat=True).first()
+    if producto_id is not None:
+        registrar_cambio([producto_id])
+
+
+def _procesar(modelo, pk, campo, nombre):
+    try:
+        # La imagen pudo reemplazarse o borrarse antes de que llegue el turno
+        if not modelo.objects.filter(pk=pk, **{campo: nombre}).exists():
+            return
+        derivados = generar_derivados(nombre)
+        # Si la imagen cambió mientras se procesaba, no pisar los derivados nuevos
+        if modelo.objects.filter(pk=pk, **{campo: nombre}).update(
+            **{CAMPOS_DERIVADOS[campo]: derivados}
+        ):
+            registrar_cambio_imagen(modelo, pk)
+    except Exception as e:
+        logger.error(f"Error generando derivados de {nombre}: {str(e)}")
+    finally:
+        connections.close_all()
+
+
+def generar_derivados(nombre, storage=None):
+    """
+    Genera las miniaturas de una imagen guardada y retorna sus rutas por formato y ancho
+
+    No se agranda la imagen: se omiten los anchos mayores al original.
+    """
+    storage = storage or default_storage
+
+    with storage.open(nombre, 'rb') as archivo:
+        imagen = Image.open(archivo)
+        imagen.load()
+
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'A' in imagen.getbands() else 'RGB')
+
+    base = posixpath.splitext(nombre)[0]
+    derivados = {}
+
+    for ancho in TAMANOS:
+        if ancho > imagen.width:
+            continue
+
+        alto = max(1, round(imagen.height * ancho / imagen.width))
+        reducida = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+
+        for formato in FORMATOS:
+            ruta = f'{CARPETA_DERIVADOS}/{base}-{ancho}.{formato}'
+            if storage.exists(ruta):
+                if es_contenido(nombre):
+                    # Mismo contenido, mismo derivado: se reutiliza
+                    derivados.setdefault(formato, {})[str(ancho)] = ruta
+                    continue
+                storage.delete(ruta)
+
+            buffer = BytesIO()
+            reducida.save(buffer, format=formato.upper(), quality=CALIDAD[formato])
+            derivados.setdefault(formato, {})[str(ancho)] = storage.save(ruta, ContentFile(buffer.getvalue()))
+
+    return derivados
+
+
+def urls_derivados(derivados, request=None, storage=None):
+    """Convierte las rutas guardadas en URLs (absolutas si hay request)"""
+    if not derivados:
+        return {}
+
+    storage = storage or default_storage
+    urls = {}
+    for formato, anchos in derivados.items():
+        urls[formato] = {}
+        for ancho, ruta in anchos.items():
+            url = storage.url(ruta)
+            urls[formato][ancho] = request.build_absolute_uri(url) if request else url
+    return urls
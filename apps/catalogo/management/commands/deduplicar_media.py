@@ -0,0 +1,128 @@
+import hashlib
+from collections import Counter
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+from apps.catalogo.models import Producto, ImagenProducto, ArchivoMedia
+from apps.catalogo.imagenes import registrar_cambio_imagen
+from apps.catalogo.storage import almacenamiento_contenido, es_contenido
+
+
+class Command(BaseCommand):
+    help = 'Migra las imágenes de productos al almacenamiento por contenido y elimina duplicados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--confirmar',
+            action='store_true',
+            help='Aplicar los cambios (sin este flag solo se muestra el resumen)'
+        )
+
+    def handle(self, *args, **options):
+        confirmar = options['confirmar']
+        storage = almacenamiento_contenido
+
+        referencias = [
+            (Producto, 'imagen_principal', 'imagen_principal_derivados', pk, nombre)
+            for pk, nombre in Producto.objects.exclude(imagen_principal='').exclude(
+                imagen_principal__isnull=True
+            ).values_list('id', 'imagen_principal')
+        ] + [
+            (ImagenProducto, 'imagen', 'derivados', pk, nombre)
+            for pk, nombre in ImagenProducto.objects.exclude(imagen='').values_list('id', 'imagen')
+        ]
+
+        pendientes = [ref for ref in referencias if not es_contenido(ref[4])]
+        self.stdout.write(
+            f'Imágenes referenciadas: {len(referencias)} | '
+            f'pendientes de migrar: {len(pendientes)}\n'
+        )
+
+        if not confirmar:
+            self._resumen_sin_cambios(pendientes)
+            return
+
+        # ==================== MIGRAR ARCHIVOS ====================
+        migradas = 0
+        faltantes = 0
+        originales = set()
+
+        for modelo, campo, campo_derivados, pk, nombre in pendientes:
+            if not storage.exists(nombre):
+                faltantes += 1
+                self.stdout.write(self.style.WARNING(f'  ⚠️  No existe: {nombre}'))
+                continue
+
+            with storage.open(nombre, 'rb') as archivo:
+                nuevo = storage.save(nombre, File(archivo, nombre))
+
+            # queryset.update: no dispara las señales que liberan referencias
+            modelo.objects.filter(pk=pk).update(**{campo: nuevo, campo_derivados: {}})
+            registrar_cambio_imagen(modelo, pk)
+            originales.add(nombre)
+            migradas += 1
+            self.stdout.write(f'  ✅ {nombre} -> {nuevo}')
+
+        # ==================== RECALCULAR REFERENCIAS ====================
+        # Cuenta real de uso: corrige referencias de subidas que fallaron a mitad
+        en_uso = Counter(
+            list(Producto.objects.filter(imagen_principal__startswith='contenido/').values_list('imagen_principal', flat=True))
+            + list(ImagenProducto.objects.filter(imagen__startswith='contenido/').values_list('imagen', flat=True))
+        )
+
+        huerfanos = 0
+        for archivo in ArchivoMedia.objects.all():
+            usos = en_uso.get(archivo.ruta, 0)
+            if usos == 0:
+                archivo.delete()
+                storage.eliminar_archivo(archivo.ruta)
+                huerfanos += 1
+            elif usos != archivo.referencias:
+                ArchivoMedia.objects.filter(pk=archivo.pk).update(referencias=usos)
+
+        # ==================== BORRAR ORIGINALES ====================
+        liberado = 0
+        for nombre in originales:
+            liberado += storage.size(nombre)
+            storage.delete(nombre)
+
+        total = ArchivoMedia.objects.aggregate(total=Sum('tamano'))['total'] or 0
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Imágenes migradas: {migradas}'))
+        self.stdout.write(f'   Archivos únicos: {ArchivoMedia.objects.count()} ({total / 1024 / 1024:.1f} MB)')
+        self.stdout.write(f'   Originales eliminados: {len(originales)} ({liberado / 1024 / 1024:.1f} MB)')
+        self.stdout.write(f'   Archivos huérfanos eliminados: {huerfanos}')
+        if faltantes:
+            self.stdout.write(self.style.WARNING(f'   Archivos faltantes: {faltantes}'))
+        if migradas:
+            self.stdout.write(self.style.WARNING(
+                '⚠️  Ejecutar generar_derivados_imagenes para regenerar las miniaturas'
+            ))
+
+    def _resumen_sin_cambios(self, pendientes):
+        """Calcula cuánto espacio se liberaría agrupando por hash"""
+        storage = almacenamiento_contenido
+        hashes = {}
+        tamano_total = 0
+        for *_, nombre in pendientes:
+            if nombre in hashes or not storage.exists(nombre):
+                continue
+            digest = hashlib.sha256()
+            with storage.open(nombre, 'rb') as archivo:
+                for bloque in archivo.chunks():
+                    digest.update(bloque)
+            hashes[nombre] = digest.hexdigest()
+            tamano_total += storage.size(nombre)
+
+        tamano_unico = sum(
+            storage.size(nombre)
+            for nombre in {h: n for n, h in hashes.items()}.values()
+        )
+
+        self.stdout.write(f'Archivos distintos en disco: {len(hashes)}')
+        self.stdout.write(f'Contenidos únicos: {len(set(hashes.values()))}')
+        self.stdout.write(
+            f'Espacio: {tamano_total / 1024 / 1024:.1f} MB -> {tamano_unico / 1024 / 1024:.1f} MB'
+        )
+        self.stdout.write(self.style.WARNING('\n⚠️  Ejecutar con --confirmar para aplicar los cambios'))
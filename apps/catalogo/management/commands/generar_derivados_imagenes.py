@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+from apps.catalogo.models import Producto, ImagenProducto
+from apps.catalogo.imagenes import generar_derivados, registrar_cambio_imagen
+
+
+class Command(BaseCommand):
+    help = 'Genera las miniaturas WebP/AVIF de las imágenes de productos existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todos',
+            action='store_true',
+            help='Regenerar también las imágenes que ya tienen derivados'
+        )
+
+    def handle(self, *args, **options):
+        todos = options['todos']
+
+        productos = Producto.objects.exclude(imagen_principal='').exclude(imagen_principal__isnull=True)
+        imagenes = ImagenProducto.objects.exclude(imagen='')
+        if not todos:
+            productos = productos.filter(imagen_principal_derivados={})
+            imagenes = imagenes.filter(derivados={})
+
+        self.stdout.write(f'Generando derivados para {productos.count()} producto(s) y {imagenes.count()} imagen(es)...\n')
+
+        generados = 0
+        errores = 0
+
+        for producto_id, nombre in productos.values_list('id', 'imagen_principal').iterator():
+            if self._procesar(Producto, producto_id, 'imagen_principal', 'imagen_principal_derivados', nombre):
+                generados += 1
+            else:
+                errores += 1
+
+        for imagen_id, nombre in imagenes.values_list('id', 'imagen').iterator():
+            if self._procesar(ImagenProducto, imagen_id, 'imagen', 'derivados', nombre):
+                generados += 1
+            else:
+                errores += 1
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Derivados generados: {generados}'))
+        if errores:
+            self.stdout.write(self.style.WARNING(f'⚠️  Imágenes con error: {errores}'))
+
+    def _procesar(self, modelo, pk, campo, campo_derivados, nombre):
+        try:
+            derivados = generar_derivados(nombre)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'  ❌ {nombre}: {str(e)}'))
+            return False
+
+        if modelo.objects.filter(pk=pk, **{campo: nombre}).update(**{campo_derivados: derivados}):
+            registrar_cambio_imagen(modelo, pk)
+        self.stdout.write(f'  ✅ {nombre}')
+        return True
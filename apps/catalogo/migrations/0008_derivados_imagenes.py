@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0007_producto_sexo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagenproducto',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict, help_text='Miniaturas generadas por formato y ancho'),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_principal_derivados',
+            field=models.JSONField(blank=True, default=dict, help_text='Miniaturas generadas por formato y ancho'),
+        ),
+    ]
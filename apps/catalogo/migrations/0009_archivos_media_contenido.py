@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:50
+
+import apps.catalogo.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0008_derivados_imagenes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hash', models.CharField(max_length=64, unique=True)),
+                ('ruta', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo Media',
+                'verbose_name_plural': 'Archivos Media',
+                'db_table': 'archivos_media',
+            },
+        ),
+        migrations.AlterField(
+            model_name='imagenproducto',
+            name='imagen',
+            field=models.ImageField(storage=apps.catalogo.storage.obtener_almacenamiento_imagenes, upload_to='productos/galeria/'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen_principal',
+            field=models.ImageField(blank=True, null=True, storage=apps.catalogo.storage.obtener_almacenamiento_imagenes, upload_to='productos/'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:06
+
+import apps.catalogo.storage
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogo', '0009_archivos_media_contenido'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='imagenproducto',
+            name='imagen',
+            field=apps.catalogo.storage.ImagenContenidoField(storage=apps.catalogo.storage.obtener_almacenamiento_imagenes, upload_to='productos/galeria/'),
+        ),
+        migrations.AlterField(
+            model_name='producto',
+            name='imagen_principal',
+            field=apps.catalogo.storage.ImagenContenidoField(blank=True, null=True, storage=apps.catalogo.storage.obtener_almacenamiento_imagenes, upload_to='productos/'),
+        ),
+    ]
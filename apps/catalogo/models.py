@@ -1,5 +1,7 @@
 from django.db import models
+from django.db.models import Sum
 from django.core.exceptions import ValidationError
+from .storage import ImagenContenidoField, obtener_almacenamiento_imagenes
 
 # Create your models here.
 class Categoria(models.Model):
@@ -70,7 +72,8 @@ class Producto(models.Model):
     precio_base = models.DecimalField(max_digits=10, decimal_places=2, help_text="Precio base del producto")
     sexo = models.CharField(max_length=1, choices=SEXO_CHOICES, blank=True, null=True, help_text="Sexo del producto (M: Masculino, F: Femenino)")
     material = models.CharField(max_length=100, blank=True, null=True)
-    imagen_principal = models.ImageField(upload_to='productos/', blank=True, null=True)
+    imagen_principal = ImagenContenidoField(upload_to='productos/', storage=obtener_almacenamiento_imagenes, blank=True, null=True)
+    imagen_principal_derivados = models.JSONField(default=dict, blank=True, help_text="Miniaturas generadas por formato y ancho")
     activo = models.BooleanField(default=True)
     destacado = models.BooleanField(default=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -99,7 +102,10 @@ class Producto(models.Model):
     
     def stock_total(self):
         """Retorna el stock total de todas las variantes"""
-        return sum(variante.stock for variante in self.variantes.all())
+        # Con las variantes precargadas (prefetch_related) no se consulta la base
+        if 'variantes' in getattr(self, '_prefetched_objects_cache', {}):
+            return sum(variante.stock for variante in self.variantes.all())
+        return self.variantes.aggregate(total=Sum('stock'))['total'] or 0
     
     @property
     def stock_disponible(self):
@@ -184,7 +190,8 @@ class ImagenProducto(models.Model):
         on_delete=models.CASCADE, 
         related_name='imagenes'
     )
-    imagen = models.ImageField(upload_to='productos/galeria/')
+    imagen = ImagenContenidoField(upload_to='productos/galeria/', storage=obtener_almacenamiento_imagenes)
+    derivados = models.JSONField(default=dict, blank=True, help_text="Miniaturas generadas por formato y ancho")
     orden = models.IntegerField(default=0)
     
     # NUEVO CAMPO: Permite asociar imágenes a variantes específicas
@@ -211,4 +218,24 @@ class ImagenProducto(models.Model):
     def clean(self):
         """Validación para asegurar consistencia"""
         if self.variante and self.variante.producto != self.producto:
-            raise ValidationError("La variante debe pertenecer al mismo producto")
\ No newline at end of file
+            raise ValidationError("La variante debe pertenecer al mismo producto")
+
+
+class ArchivoMedia(models.Model):
+    """
+    Archivo guardado por contenido (ver storage.AlmacenamientoContenido)
+    con la cantidad de imágenes que lo referencian
+    """
+    hash = models.CharField(max_length=64, unique=True)
+    ruta = models.CharField(max_length=255, unique=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    referencias = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'archivos_media'
+        verbose_name = 'Archivo Media'
+        verbose_name_plural = 'Archivos Media'
+
+    def __str__(self):
+        return f"{self.ruta} ({self.referencias} ref.)"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Categoria, Producto, ImagenProducto, Talla, Color, ProductoVariante
+from .imagenes import urls_derivados
 import json
 
 
@@ -23,10 +24,11 @@ class ColorSerializer(serializers.ModelSerializer):
 
 class ImagenProductoSerializer(serializers.ModelSerializer):
     imagen_url = serializers.SerializerMethodField()
+    imagen_responsive = serializers.SerializerMethodField()
 
     class Meta:
         model = ImagenProducto
-        fields = ["id", "producto", "orden", "imagen", "imagen_url", "variante"]
+        fields = ["id", "producto", "orden", "imagen", "imagen_url", "imagen_responsive", "variante"]
 
     def get_imagen_url(self, obj):
         try:
@@ -38,6 +40,10 @@ class ImagenProductoSerializer(serializers.ModelSerializer):
             pass
         return None
 
+    def get_imagen_responsive(self, obj):
+        """URLs de las miniaturas por formato y ancho (vacío hasta que se generan)"""
+        return urls_derivados(obj.derivados, self.context.get("request"))
+
 
 class ProductoVarianteSerializer(serializers.ModelSerializer):
     talla_nombre = serializers.CharField(source='talla.nombre', read_only=True)
@@ -68,6 +74,7 @@ class ProductoListSerializer(serializers.ModelSerializer):
     """Serializer para listar productos - vista resumida"""
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
     imagen_principal_url = serializers.SerializerMethodField()
+    imagen_principal_responsive = serializers.SerializerMethodField()
     stock_total = serializers.SerializerMethodField()
     stock = serializers.SerializerMethodField()
     stock_disponible = serializers.SerializerMethodField()
@@ -91,6 +98,7 @@ class ProductoListSerializer(serializers.ModelSerializer):
             "destacado",
             "imagen_principal",
             "imagen_principal_url",
+            "imagen_principal_responsive",
             "categoria",
             "categoria_nombre",
             "variantes_count"
@@ -105,6 +113,10 @@ class ProductoListSerializer(serializers.ModelSerializer):
         except Exception:
             pass
         return None
+
+    def get_imagen_principal_responsive(self, obj):
+        """URLs de las miniaturas por formato y ancho (vacío hasta que se generan)"""
+        return urls_derivados(obj.imagen_principal_derivados, self.context.get("request"))
     
     def get_stock_total(self, obj):
         """Calcula el stock total de todas las variantes"""
@@ -116,9 +128,13 @@ class ProductoListSerializer(serializers.ModelSerializer):
     
     def get_stock_disponible(self, obj):
         """Verifica si hay stock disponible"""
+        if 'variantes' in getattr(obj, '_prefetched_objects_cache', {}):
+            return any(v.stock > 0 and v.activo for v in obj.variantes.all())
         return obj.stock_disponible
     
     def get_variantes_count(self, obj):
+        if 'variantes' in getattr(obj, '_prefetched_objects_cache', {}):
+            return sum(1 for v in obj.variantes.all() if v.activo)
         return obj.variantes.filter(activo=True).count()
 
 
@@ -126,6 +142,7 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
     """Serializer para detalle de producto - vista completa con variantes"""
     categoria_nombre = serializers.CharField(source='categoria.nombre', read_only=True)
     imagen_principal_url = serializers.SerializerMethodField()
+    imagen_principal_responsive = serializers.SerializerMethodField()
     imagenes = serializers.SerializerMethodField()
     variantes = ProductoVarianteSerializer(many=True, read_only=True)
     stock_total = serializers.SerializerMethodField()
@@ -152,6 +169,7 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
             "destacado",
             "imagen_principal",
             "imagen_principal_url",
+            "imagen_principal_responsive",
             "categoria",
             "categoria_nombre",
             "imagenes",
@@ -168,6 +186,10 @@ class ProductoDetailSerializer(serializers.ModelSerializer):
         except Exception:
             pass
         return None
+
+    def get_imagen_principal_responsive(self, obj):
+        """URLs de las miniaturas por formato y ancho (vacío hasta que se generan)"""
+        return urls_derivados(obj.imagen_principal_derivados, self.context.get("request"))
     
     def get_imagenes(self, obj):
         """Retorna solo las imágenes generales (sin variante asignada)"""
@@ -0,0 +1,73 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Categoria, Color, Producto, ProductoVariante, ImagenProducto, Talla
+from .storage import almacenamiento_contenido, es_contenido
+from .versionado import registrar_cambio
+
+# Campo de imagen de cada modelo cuyo archivo lleva cuenta de referencias
+CAMPOS_IMAGEN = {
+    Producto: 'imagen_principal',
+    ImagenProducto: 'imagen',
+}
+
+
+def _nombre_actual(instance, campo):
+    # Sin pasar por el descriptor: no dispara consultas en campos diferidos
+    valor = instance.__dict__.get(campo)
+    return getattr(valor, 'name', valor) or ''
+
+
+def _liberar(nombre):
+    """Descuenta la referencia al archivo cuando la transacción confirma"""
+    if es_contenido(nombre):
+        transaction.on_commit(lambda: almacenamiento_contenido.delete(nombre))
+
+
+@receiver(post_init, sender=Producto)
+@receiver(post_init, sender=ImagenProducto)
+def recordar_imagen_original(sender, instance, **kwargs):
+    instance._imagen_original = _nombre_actual(instance, CAMPOS_IMAGEN[sender])
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=ImagenProducto)
+def liberar_imagen_reemplazada(sender, instance, **kwargs):
+    """Al reemplazar o quitar la imagen se libera la referencia anterior"""
+    actual = _nombre_actual(instance, CAMPOS_IMAGEN[sender])
+    anterior = getattr(instance, '_imagen_original', '')
+    if anterior != actual:
+        _liberar(anterior)
+    instance._imagen_original = actual
+
+
+@receiver(post_delete, sender=Producto)
+@receiver(post_delete, sender=ImagenProducto)
+def liberar_imagen_eliminada(sender, instance, **kwargs):
+    _liberar(_nombre_actual(instance, CAMPOS_IMAGEN[sender]))
+
+
+# ==================== VERSIÓN DEL CATÁLOGO ====================
+# El stock se modifica con save() (reducir_stock / aumentar_stock), así que
+# estas señales ven todos los cambios que afectan al índice de facetas
+
+@receiver(post_save, sender=ProductoVariante)
+@receiver(post_delete, sender=ProductoVariante)
+def registrar_cambio_variante(sender, instance, **kwargs):
+    registrar_cambio([instance.producto_id])
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def registrar_cambio_producto(sender, instance, **kwargs):
+    registrar_cambio([instance.pk])
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Talla)
+@receiver(post_delete, sender=Talla)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+def registrar_cambio_general(sender, instance, **kwargs):
+    registrar_cambio()
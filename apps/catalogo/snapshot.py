@@ -0,0 +1,199 @@
+"""
+Copia en memoria del catálogo público para el listado de productos
+
+Con CATALOGO_SNAPSHOT activo, cada worker arma una vez los productos activos
+ya serializados (ProductoListSerializer, con categoría y variantes
+precargadas: dos consultas) junto con las claves para filtrar y ordenar. El
+listado público se responde desde esa copia sin tocar la base; solo se lee
+la versión del catálogo (ver versionado).
+
+Cuando la versión cambia se arma una copia nueva y se reemplaza la
+referencia de una vez: las copias no se modifican nunca, así que las
+peticiones en curso siguen con la anterior. Mientras un hilo reconstruye,
+los demás responden con la copia anterior.
+"""
+import threading
+import time
+import unicodedata
+from collections import namedtuple
+
+from . import versionado
+
+# ?ordenar= del listado -> campo del modelo (el primero es el orden por defecto)
+ORDENAMIENTOS = {
+    'recientes': '-fecha_creacion',
+    'precio': 'precio_base',
+    '-precio': '-precio_base',
+    'nombre': 'nombre',
+    '-nombre': '-nombre',
+}
+CAMPOS_URL = ('imagen_principal', 'imagen_principal_url')
+# Hosts distintos para los que se guardan las URLs absolutas ya armadas
+MAXIMO_HOSTS = 8
+
+ProductoCatalogo = namedtuple('ProductoCatalogo', 'datos categoria_id sexo destacado texto')
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos, como compara icontains con la collation de MySQL"""
+    texto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def _absoluta(base, url):
+    return base + url if isinstance(url, str) and url.startswith('/') else url
+
+
+class Snapshot:
+
+    def __init__(self, version, productos, ordenes, duracion):
+        self.version = version
+        self.productos = productos
+        self.ordenes = ordenes
+        self.duracion = duracion
+        self.generado = time.time()
+        self._por_host = {}
+
+    @classmethod
+    def construir(cls, version):
+        from .models import Producto
+        from .serializers import ProductoListSerializer
+
+        inicio = time.perf_counter()
+        productos = list(
+            Producto.objects.filter(activo=True)
+            .select_related('categoria')
+            .prefetch_related('variantes')
+            .order_by('-fecha_creacion', '-id')
+        )
+        # Sin request: las URLs quedan relativas y se completan por host al listar
+        datos = ProductoListSerializer(productos, many=True).data
+        registros = tuple(
+            ProductoCatalogo(
+                datos=dict(dato),
+                categoria_id=producto.categoria_id,
+                sexo=producto.sexo,
+                destacado=producto.destacado,
+                texto=normalizar(f'{producto.nombre}\n{producto.descripcion or ""}'),
+            )
+            for producto, dato in zip(productos, datos)
+        )
+
+        claves = {
+            'fecha_creacion': lambda i: productos[i].fecha_creacion,
+            'precio_base': lambda i: productos[i].precio_base,
+            'nombre': lambda i: normalizar(productos[i].nombre),
+        }
+        ordenes = {}
+        for nombre, campo in ORDENAMIENTOS.items():
+            ordenes[nombre] = tuple(sorted(
+                range(len(productos)), key=claves[campo.lstrip('-')], reverse=campo.startswith('-')
+            ))
+        return cls(version, registros, ordenes, time.perf_counter() - inicio)
+
+    def _datos(self, request):
+        """Datos de cada producto con las URLs absolutas del host del request"""
+        base = request.build_absolute_uri('/')[:-1] if request else ''
+        datos = self._por_host.get(base)
+        if datos is None:
+            datos = tuple(self._con_base(base, producto.datos) for producto in self.productos)
+            if len(self._por_host) < MAXIMO_HOSTS:
+                self._por_host[base] = datos
+        return datos
+
+    @staticmethod
+    def _con_base(base, dato):
+        if not base:
+            return dato
+        dato = {**dato, **{campo: _absoluta(base, dato[campo]) for campo in CAMPOS_URL}}
+        dato['imagen_principal_responsive'] = {
+            formato: {ancho: _absoluta(base, url) for ancho, url in anchos.items()}
+            for formato, anchos in dato['imagen_principal_responsive'].items()
+        }
+        return dato
+
+    def listar(self, request=None, categoria=None, sexo=None, buscar=None, destacado=False, ordenar='recientes'):
+        """Mismos filtros que ProductoViewSet.get_queryset para usuarios no admin"""
+        buscar = normalizar(buscar) if buscar else None
+        datos = self._datos(request)
+        resultado = []
+        for i in self.ordenes[ordenar]:
+            producto = self.productos[i]
+            if categoria is not None and producto.categoria_id != categoria:
+                continue
+            if sexo and producto.sexo != sexo:
+                continue
+            if destacado and not producto.destacado:
+                continue
+            if buscar and buscar not in producto.texto:
+                continue
+            resultado.append(datos[i])
+        return resultado
+
+    def metricas(self):
+        return {
+            'version': self.version,
+            'productos': len(self.productos),
+            'edad_segundos': round(time.time() - self.generado, 3),
+            'reconstruccion_ms': round(self.duracion * 1000, 2),
+        }
+
+
+def filtros(params):
+    """
+    Parámetros del listado como argumentos de Snapshot.listar
+
+    Retorna None si hay que ir a la base (stock_bajo o una categoría no
+    numérica, que la copia no resuelve igual que el queryset).
+    """
+    if params.get('stock_bajo'):
+        return None
+    categoria = params.get('categoria') or None
+    if categoria is not None:
+        try:
+            categoria = int(categoria)
+        except ValueError:
+            return None
+    sexo = params.get('sexo')
+    ordenar = params.get('ordenar')
+    return {
+        'categoria': categoria,
+        'sexo': sexo if sexo in ('M', 'F') else None,
+        'buscar': params.get('search') or None,
+        'destacado': bool(params.get('destacado')),
+        'ordenar': ordenar if ordenar in ORDENAMIENTOS else 'recientes',
+    }
+
+
+_vigente = None
+_lock = threading.Lock()
+_reconstrucciones = 0
+
+
+def obtener():
+    """Copia vigente del catálogo, reconstruida si cambió la versión"""
+    global _vigente, _reconstrucciones
+    version = versionado.version_actual()
+    actual = _vigente
+    if actual is not None and actual.version == version:
+        return actual
+    # Solo la primera vez se espera; después se sirve la copia anterior
+    if not _lock.acquire(blocking=actual is None):
+        return actual
+    try:
+        if _vigente is None or _vigente.version != version:
+            _vigente = Snapshot.construir(version)
+            _reconstrucciones += 1
+        return _vigente
+    finally:
+        _lock.release()
+
+
+def metricas():
+    """Estado de la copia de este proceso (solo contadores si todavía no se armó)"""
+    actual = _vigente
+    return {
+        **(actual.metricas() if actual is not None else {}),
+        'reconstrucciones': _reconstrucciones,
+        'version_catalogo': versionado.version_actual(),
+    }
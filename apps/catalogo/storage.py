@@ -0,0 +1,170 @@
+"""
+Almacenamiento direccionado por contenido para imágenes de productos
+
+Cada archivo se guarda una sola vez bajo el sha256 de su contenido
+(`contenido/ab/abcdef....jpg`), así dos subidas de la misma foto comparten
+el archivo y su URL nunca cambia de contenido (cacheable para siempre).
+ArchivoMedia lleva la cuenta de referencias; el archivo se borra cuando la
+última referencia desaparece (después del commit y volviendo a verificar
+con la fila bloqueada, ya que un save() concurrente puede haberlo registrado).
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.fields.files import ImageFieldFile
+
+CARPETA_CONTENIDO = 'contenido'
+
+
+class AlmacenamientoContenido(FileSystemStorage):
+    """FileSystemStorage que nombra los archivos por su hash y cuenta referencias"""
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        temporal, hash_contenido, tamano = self._volcar_a_temporal(content)
+
+        try:
+            with transaction.atomic():
+                nombre = self._sumar_referencia(hash_contenido, name, tamano)
+                # Con la fila bloqueada: un delete() en curso no puede borrar
+                # el archivo entre que se ubica y se confirma la referencia
+                self._ubicar(temporal, nombre)
+        finally:
+            if os.path.exists(temporal):
+                os.unlink(temporal)
+        return nombre
+
+    def delete(self, name):
+        """Descuenta una referencia; el archivo se borra al llegar a cero"""
+        if not es_contenido(name):
+            return super().delete(name)
+
+        ArchivoMedia = apps.get_model('catalogo', 'ArchivoMedia')
+        with transaction.atomic():
+            archivo = ArchivoMedia.objects.select_for_update().filter(ruta=name).first()
+            if archivo is None:
+                return
+            if archivo.referencias > 1:
+                ArchivoMedia.objects.filter(pk=archivo.pk).update(referencias=F('referencias') - 1)
+                return
+            archivo.delete()
+            # Si la transacción se revierte la fila vuelve y el archivo debe seguir
+            transaction.on_commit(lambda: self._eliminar_si_libre(name))
+
+    def _eliminar_si_libre(self, name):
+        """Borra el archivo salvo que un save() lo haya vuelto a registrar"""
+        ArchivoMedia = apps.get_model('catalogo', 'ArchivoMedia')
+        with transaction.atomic():
+            if ArchivoMedia.objects.select_for_update().filter(ruta=name).exists():
+                return
+            self.eliminar_archivo(name)
+
+    def eliminar_archivo(self, name):
+        """Borra el archivo y sus miniaturas sin consultar referencias"""
+        super().delete(name)
+        self._borrar_derivados(name)
+
+    def _borrar_derivados(self, name):
+        """Las miniaturas de un archivo por contenido se comparten: se borran con él"""
+        from .imagenes import CARPETA_DERIVADOS
+
+        carpeta = posixpath.join(CARPETA_DERIVADOS, posixpath.dirname(name))
+        prefijo = posixpath.splitext(posixpath.basename(name))[0] + '-'
+        if not self.exists(carpeta):
+            return
+        for archivo in self.listdir(carpeta)[1]:
+            if archivo.startswith(prefijo):
+                super().delete(posixpath.join(carpeta, archivo))
+
+    def _volcar_a_temporal(self, content):
+        """Copia el contenido por bloques a un temporal mientras calcula el hash"""
+        carpeta = self.path(posixpath.join(CARPETA_CONTENIDO, 'tmp'))
+        os.makedirs(carpeta, exist_ok=True)
+
+        hash_contenido = hashlib.sha256()
+        tamano = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+
+        with tempfile.NamedTemporaryFile(dir=carpeta, delete=False) as temporal:
+            for bloque in content.chunks():
+                if isinstance(bloque, str):
+                    bloque = bloque.encode()
+                hash_contenido.update(bloque)
+                temporal.write(bloque)
+                tamano += len(bloque)
+
+        return temporal.name, hash_contenido.hexdigest(), tamano
+
+    def _ubicar(self, temporal, nombre):
+        destino = self.path(nombre)
+        if os.path.exists(destino):
+            return
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        # Mismo sistema de archivos: el reemplazo es atómico
+        os.replace(temporal, destino)
+        if self.file_permissions_mode is not None:
+            os.chmod(destino, self.file_permissions_mode)
+
+    def _sumar_referencia(self, hash_contenido, name, tamano):
+        """Suma una referencia con la fila bloqueada y retorna la ruta del archivo"""
+        ArchivoMedia = apps.get_model('catalogo', 'ArchivoMedia')
+        archivo = ArchivoMedia.objects.select_for_update().filter(hash=hash_contenido).first()
+        if archivo is None:
+            # El mismo contenido con otra extensión reutiliza el archivo ya registrado
+            extension = posixpath.splitext(name)[1].lower()
+            nombre = f'{CARPETA_CONTENIDO}/{hash_contenido[:2]}/{hash_contenido}{extension}'
+            try:
+                with transaction.atomic():
+                    ArchivoMedia.objects.create(hash=hash_contenido, ruta=nombre, tamano=tamano, referencias=1)
+                return nombre
+            except IntegrityError:
+                # Otra subida del mismo contenido creó la fila en paralelo
+                archivo = ArchivoMedia.objects.select_for_update().get(hash=hash_contenido)
+        ArchivoMedia.objects.filter(pk=archivo.pk).update(referencias=F('referencias') + 1)
+        return archivo.ruta
+
+
+def es_contenido(nombre):
+    return bool(nombre) and nombre.startswith(f'{CARPETA_CONTENIDO}/')
+
+
+almacenamiento_contenido = AlmacenamientoContenido()
+
+
+class ImagenContenidoFieldFile(ImageFieldFile):
+
+    def save(self, name, content, save=True):
+        # Nombre guardado en la base (signals.recordar_imagen_original): al
+        # asignar un archivo nuevo self.name ya no es el anterior
+        anterior = getattr(self.instance, '_imagen_original', '')
+        super().save(name, content, save=False)
+        if self.name == anterior and es_contenido(anterior):
+            # Mismo contenido que ya tenía la instancia: storage.save() sumó
+            # una referencia que nadie va a liberar
+            self.storage.delete(anterior)
+        if save:
+            self.instance.save()
+
+    save.alters_data = True
+
+
+class ImagenContenidoField(models.ImageField):
+    """ImageField cuyo archivo no suma referencias al volver a subir el mismo contenido"""
+    attr_class = ImagenContenidoFieldFile
+
+
+def obtener_almacenamiento_imagenes():
+    """Storage de las imágenes de productos (callable para no fijarlo en migraciones)"""
+    return almacenamiento_contenido
@@ -1,3 +1,193 @@
-from django.test import TestCase
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from . import facetas
+from .models import ArchivoMedia, Categoria, Color, Producto, ProductoVariante, Talla
+from .storage import almacenamiento_contenido
+
+
+class IndiceFacetasTests(TestCase):
+    """Conteos del índice de facetas contra un catálogo chico armado a mano"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.remeras = Categoria.objects.create(nombre='Remeras')
+        cls.buzos = Categoria.objects.create(nombre='Buzos')
+        cls.s = Talla.objects.create(nombre='S', orden=1)
+        cls.m = Talla.objects.create(nombre='M', orden=2)
+        cls.rojo = Color.objects.create(nombre='Rojo')
+        cls.azul = Color.objects.create(nombre='Azul')
+
+        # A: S/rojo y M/azul (no hay M roja)
+        cls.a = cls.producto('A', cls.remeras, 'F', [(cls.s, cls.rojo, 3), (cls.m, cls.azul, 1)])
+        # B: M/rojo
+        cls.b = cls.producto('B', cls.remeras, 'M', [(cls.m, cls.rojo, 2)])
+        # C: buzo S/azul
+        cls.c = cls.producto('C', cls.buzos, 'F', [(cls.s, cls.azul, 5)])
+        # Fuera del índice: sin stock e inactivo
+        cls.producto('Sin stock', cls.remeras, 'F', [(cls.s, cls.rojo, 0)])
+        cls.producto('Inactivo', cls.buzos, 'M', [(cls.m, cls.azul, 4)], activo=False)
+
+    @classmethod
+    def producto(cls, nombre, categoria, sexo, variantes, activo=True):
+        producto = Producto.objects.create(
+            nombre=nombre, categoria=categoria, sexo=sexo, precio_base=10, activo=activo
+        )
+        for talla, color, stock in variantes:
+            ProductoVariante.objects.create(producto=producto, talla=talla, color=color, stock=stock)
+        return producto
+
+    def totales(self, resultado, dimension):
+        return {item.get('id', item.get('codigo')): item['total'] for item in resultado['facetas'][dimension]}
+
+    def test_sin_filtros_cuenta_solo_productos_con_stock(self):
+        resultado = facetas.IndiceFacetas.construir(0).contar({})
+
+        self.assertEqual(resultado['total'], 3)
+        self.assertEqual(self.totales(resultado, 'talla'), {self.s.id: 2, self.m.id: 2})
+        self.assertEqual(self.totales(resultado, 'color'), {self.rojo.id: 2, self.azul.id: 2})
+        self.assertEqual(self.totales(resultado, 'sexo'), {'M': 1, 'F': 2})
+        self.assertEqual(self.totales(resultado, 'categoria'), {self.remeras.id: 2, self.buzos.id: 1})
+
+    def test_cada_faceta_ignora_su_propio_filtro(self):
+        resultado = facetas.IndiceFacetas.construir(0).contar({'categoria': {self.buzos.id}})
+
+        self.assertEqual(resultado['total'], 1)
+        # La faceta categoría muestra las alternativas
+        self.assertEqual(self.totales(resultado, 'categoria'), {self.remeras.id: 2, self.buzos.id: 1})
+        # Las demás aplican el filtro
+        self.assertEqual(self.totales(resultado, 'talla'), {self.s.id: 1, self.m.id: 0})
+        self.assertEqual(self.totales(resultado, 'sexo'), {'M': 0, 'F': 1})
+
+    def test_valores_de_una_dimension_se_combinan_con_or(self):
+        resultado = facetas.IndiceFacetas.construir(0).contar({'sexo': {'M', 'F'}, 'talla': {self.s.id, self.m.id}})
+        self.assertEqual(resultado['total'], 3)
+
+    def test_talla_y_color_piden_la_misma_variante(self):
+        indice = facetas.IndiceFacetas.construir(0)
+
+        # A tiene talla M y color rojo, pero no una M roja
+        resultado = indice.contar({'talla': {self.m.id}, 'color': {self.rojo.id}})
+        self.assertEqual(resultado['total'], 1)
+        self.assertEqual(self.totales(resultado, 'categoria'), {self.remeras.id: 1, self.buzos.id: 0})
+
+        resultado = indice.contar({'talla': {self.m.id}})
+        self.assertEqual(self.totales(resultado, 'color'), {self.rojo.id: 1, self.azul.id: 1})
+        resultado = indice.contar({'color': {self.rojo.id}})
+        self.assertEqual(self.totales(resultado, 'talla'), {self.s.id: 1, self.m.id: 1})
+
+    def test_aplicar_quita_y_reutiliza_la_posicion(self):
+        indice = facetas.IndiceFacetas.construir(0)
+        posicion_b = indice.posiciones[self.b.id]
+
+        ProductoVariante.objects.filter(producto=self.b).update(stock=0)
+        indice.aplicar({self.b.id}, 1)
+
+        self.assertNotIn(self.b.id, indice.posiciones)
+        self.assertEqual(indice.version, 1)
+        # Sin B ya no hay ningún producto en M roja: el valor desaparece del bitmap
+        self.assertNotIn((self.m.id, self.rojo.id), indice.bitmaps['par'])
+        self.assertEqual(indice.contar({'sexo': {'M'}})['total'], 0)
+
+        d = self.producto('D', self.buzos, 'M', [(self.m, self.rojo, 1)])
+        indice.aplicar({d.id}, 2)
+
+        # D ocupa el bit que dejó B y no hereda nada de B
+        self.assertEqual(indice.posiciones[d.id], posicion_b)
+        resultado = indice.contar({'talla': {self.m.id}, 'color': {self.rojo.id}})
+        self.assertEqual(resultado['total'], 1)
+        self.assertEqual(self.totales(resultado, 'categoria'), {self.remeras.id: 0, self.buzos.id: 1})
+        self.assertEqual(indice.contar({})['total'], 3)
+
+    @override_settings(CATALOGO_VERSION_CACHE='default')
+    def test_contar_sigue_los_cambios_registrados(self):
+        facetas._indice = None
+        self.addCleanup(setattr, facetas, '_indice', None)
+        self.assertEqual(facetas.contar({})['total'], 3)
+
+        variante = self.c.variantes.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            variante.reducir_stock(5)
+
+        resultado = facetas.contar({})
+        self.assertEqual(resultado['total'], 2)
+        # Sin productos con stock la categoría sale de la faceta
+        self.assertEqual(self.totales(resultado, 'categoria'), {self.remeras.id: 2})
+
+
+@override_settings(CATALOGO_VERSION_CACHE='default')
+class AlmacenamientoContenidoTests(TestCase):
+    """Cuenta de referencias de las imágenes guardadas por contenido"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.producto = Producto.objects.create(
+            nombre='Remera', categoria=Categoria.objects.create(nombre='Remeras'), precio_base=10
+        )
+
+    def subir(self, producto, contenido=b'foto'):
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.imagen_principal.save('foto.jpg', ContentFile(contenido))
+        return producto.imagen_principal.name
+
+    def referencias(self, nombre):
+        return ArchivoMedia.objects.get(ruta=nombre).referencias
+
+    def test_volver_a_subir_el_mismo_contenido_no_suma_referencias(self):
+        nombre = self.subir(self.producto)
+        self.assertEqual(self.subir(self.producto), nombre)
+        self.assertEqual(self.subir(Producto.objects.get(pk=self.producto.pk)), nombre)
+        # Asignando el archivo, como hace el serializer
+        producto = Producto.objects.get(pk=self.producto.pk)
+        producto.imagen_principal = ContentFile(b'foto', name='foto.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            producto.save()
+        self.assertEqual(producto.imagen_principal.name, nombre)
+
+        self.assertEqual(self.referencias(nombre), 1)
+
+    def test_el_archivo_se_borra_con_la_ultima_referencia(self):
+        nombre = self.subir(self.producto)
+        otro = Producto.objects.create(nombre='Otra', categoria=self.producto.categoria, precio_base=10)
+        self.subir(otro)
+        self.assertEqual(self.referencias(nombre), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.delete()
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.delete()
+        self.assertFalse(ArchivoMedia.objects.filter(ruta=nombre).exists())
+        self.assertFalse(almacenamiento_contenido.exists(nombre))
+
+    def test_el_archivo_sigue_si_se_revierte_el_borrado(self):
+        nombre = self.subir(self.producto)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            almacenamiento_contenido.delete(nombre)
+            raise RuntimeError
+
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
+
+    def test_subir_de_nuevo_un_contenido_liberado_lo_vuelve_a_escribir(self):
+        nombre = self.subir(self.producto)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            almacenamiento_contenido.delete(nombre)
+            # Antes del commit otra imagen registra el mismo contenido
+            otro = Producto.objects.create(nombre='Otra', categoria=self.producto.categoria, precio_base=10)
+            otro.imagen_principal.save('foto.jpg', ContentFile(b'foto'))
+        self.assertTrue(callbacks)
+
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertTrue(almacenamiento_contenido.exists(nombre))
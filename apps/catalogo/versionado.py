@@ -0,0 +1,74 @@
+"""
+Versión del catálogo y registro de cambios compartido entre procesos
+
+Cada cambio confirmado de productos, variantes, tallas, colores o
+categorías incrementa `catalogo:version` en la cache compartida
+(CATALOGO_VERSION_CACHE: Redis o, sin Redis, archivos) y guarda qué
+productos cambiaron en esa versión (None = cambio general, hay que
+recalcular todo). Las estructuras en memoria de cada worker (índice de
+facetas, snapshot) comparan su versión con la de la cache y aplican solo
+los productos cambiados o se reconstruyen.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+CLAVE_VERSION = 'catalogo:version'
+PREFIJO_CAMBIO = 'catalogo:cambio:'
+# Cambios que se conservan; un worker más atrasado recalcula todo
+DURACION_CAMBIOS = 60 * 60 * 24
+
+
+def _cache():
+    return caches[settings.CATALOGO_VERSION_CACHE]
+
+
+def version_actual():
+    return _cache().get(CLAVE_VERSION) or 0
+
+
+def registrar_cambio(productos=None):
+    """
+    Anota un cambio del catálogo al confirmar la transacción
+
+    productos: ids de los productos afectados, o None si el cambio afecta a
+    todo el catálogo (ej: se renombró una talla).
+    """
+    productos = sorted(set(productos)) if productos is not None else None
+    transaction.on_commit(lambda: _publicar(productos))
+
+
+def _publicar(productos):
+    cache = _cache()
+    while True:
+        try:
+            version = cache.incr(CLAVE_VERSION)
+        except ValueError:
+            # Primera vez (o la cache se vació): los workers ven otra versión y recalculan
+            cache.add(CLAVE_VERSION, 0, None)
+            version = cache.incr(CLAVE_VERSION)
+        # En la cache de archivos incr no es atómico: si otro proceso ya usó
+        # esta versión se toma la siguiente
+        if cache.add(f'{PREFIJO_CAMBIO}{version}', productos, DURACION_CAMBIOS):
+            return version
+
+
+def cambios_desde(version, hasta, maximo=500):
+    """
+    Productos cambiados entre dos versiones
+
+    Retorna un set de ids, o None si hay que recalcular todo (cambio
+    general, registros vencidos o demasiadas versiones de diferencia).
+    """
+    if hasta < version or hasta - version > maximo:
+        return None
+    claves = [f'{PREFIJO_CAMBIO}{v}' for v in range(version + 1, hasta + 1)]
+    registros = _cache().get_many(claves)
+    if len(registros) != len(claves):
+        return None
+    productos = set()
+    for cambio in registros.values():
+        if cambio is None:
+            return None
+        productos.update(cambio)
+    return productos
@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from django.conf import settings
 from django.db.models import Count
 from django.core.exceptions import ValidationError
 from .models import Categoria, Producto, ImagenProducto, Talla, Color, ProductoVariante
@@ -18,7 +19,12 @@ from .serializers import (
     ProductoVarianteCreateUpdateSerializer,
     ImagenProductoSerializer
 )
+from apps.analytics.models import RecomendacionProducto
+from apps.analytics.serializers import RecomendacionProductoSerializer
 from apps.analytics.utils import AnalyticsTracker
+from .imagenes import programar_derivados
+from . import facetas as indice_facetas
+from . import snapshot as catalogo_snapshot
 
 
 class CategoriaViewSet(viewsets.ModelViewSet):
@@ -156,6 +162,11 @@ class ProductoViewSet(viewsets.ModelViewSet):
             except (TypeError, ValueError):
                 pass
 
+        # Orden (?ordenar=precio, -precio, nombre, -nombre, recientes)
+        ordenar = self.request.query_params.get('ordenar', None)
+        if ordenar in catalogo_snapshot.ORDENAMIENTOS:
+            queryset = queryset.order_by(catalogo_snapshot.ORDENAMIENTOS[ordenar])
+
         return queryset.select_related('categoria').prefetch_related('imagenes', 'variantes', 'variantes__talla', 'variantes__color', 'variantes__imagenes')
     
     def get_permissions(self):
@@ -163,10 +174,23 @@ class ProductoViewSet(viewsets.ModelViewSet):
         GET: Cualquiera puede ver productos
         POST/PUT/DELETE: Solo administradores
         """
-        if self.action in ['list', 'retrieve', 'buscar', 'sexos_disponibles']:
+        if self.action in ['list', 'retrieve', 'buscar', 'sexos_disponibles', 'recomendados', 'facetas']:
             return [AllowAny()]
         return [IsAuthenticated(), IsAdminUser()]
 
+    def list(self, request, *args, **kwargs):
+        """
+        Listado de productos
+
+        Con CATALOGO_SNAPSHOT el listado público (usuarios no admin) sale de
+        la copia en memoria del catálogo, sin consultas a la base.
+        """
+        if settings.CATALOGO_SNAPSHOT and not request.user.is_staff:
+            filtros = catalogo_snapshot.filtros(request.query_params)
+            if filtros is not None:
+                return Response(catalogo_snapshot.obtener().listar(request, **filtros))
+        return super().list(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         """Override para debugging y mejor manejo de errores"""
         try:
@@ -194,6 +218,18 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    def perform_create(self, serializer):
+        producto = serializer.save()
+        programar_derivados(producto, 'imagen_principal')
+
+    def perform_update(self, serializer):
+        if 'imagen_principal' in serializer.validated_data:
+            # Los derivados anteriores corresponden a la imagen reemplazada
+            producto = serializer.save(imagen_principal_derivados={})
+            programar_derivados(producto, 'imagen_principal')
+        else:
+            serializer.save()
+
     @action(detail=False, methods=['get'], url_path='sexos_disponibles')
     def sexos_disponibles(self, request):
         """Retorna los sexos definidos en el modelo y su cantidad en productos activos"""
@@ -214,6 +250,50 @@ class ProductoViewSet(viewsets.ModelViewSet):
         ]
         return Response({'sexos': data})
 
+    @action(detail=False, methods=['get'], url_path='facetas')
+    def facetas(self, request):
+        """
+        Conteos de productos con stock por talla, color, sexo y categoría
+        GET /api/catalogo/producto/facetas/?categoria=3&sexo=F&talla=2,5&color=7
+
+        Cada filtro acepta varios valores (separados por coma o repitiendo el
+        parámetro). El conteo de cada faceta aplica los demás filtros pero no
+        el suyo. Se responde desde el índice en memoria de facetas.py.
+        """
+        filtros = {}
+        for dimension in indice_facetas.DIMENSIONES:
+            valores = [
+                valor.strip()
+                for parametro in request.query_params.getlist(dimension)
+                for valor in parametro.split(',')
+                if valor.strip()
+            ]
+            if dimension == 'sexo':
+                filtros[dimension] = set(valores)
+                continue
+            try:
+                filtros[dimension] = {int(valor) for valor in valores}
+            except ValueError:
+                return Response(
+                    {'error': f'El filtro {dimension} debe contener ids numéricos'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        return Response(indice_facetas.contar(filtros))
+
+    @action(detail=False, methods=['get'], url_path='snapshot')
+    def snapshot(self, request):
+        """
+        Métricas de la copia en memoria del catálogo de este worker (admin)
+        GET /api/catalogo/producto/snapshot/
+
+        Edad de la copia, cuánto tardó en armarse, versión con la que se
+        armó y la versión actual del catálogo.
+        """
+        return Response({
+            'activo': settings.CATALOGO_SNAPSHOT,
+            **catalogo_snapshot.metricas(),
+        })
+
     def update(self, request, *args, **kwargs):
         """Override para debugging y mejor manejo de errores"""
         partial = kwargs.pop('partial', False)
@@ -246,23 +326,28 @@ class ProductoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-    def retrieve(self, request, *args, **kwargs):
-        """Override para trackear vista de producto"""
-        instance = self.get_object()
-        
-        # Track analytics
+    @action(detail=True, methods=['get'])
+    def recomendados(self, request, pk=None):
+        """
+        Productos que se compran o ven junto a este ("también compraron")
+        GET /api/catalogo/producto/{id}/recomendados/?limite=8
+
+        Una sola consulta por el índice (producto, posicion) de la tabla que
+        arma calcular_recomendaciones; no se carga el producto consultado.
+        """
         try:
-            AnalyticsTracker.track_vista_producto(
-                producto=instance,
-                usuario=request.user if request.user.is_authenticated else None,
-                session_id=request.session.session_key,
-                request=request
-            )
-        except:
-            pass  # No fallar si hay error en analytics
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+            limite = min(max(int(request.query_params.get('limite', 8)), 1), 50)
+            producto_id = int(pk)
+        except (TypeError, ValueError):
+            return Response({'error': 'Parámetros numéricos inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        recomendaciones = RecomendacionProducto.objects.filter(
+            producto_id=producto_id,
+            recomendado__activo=True
+        ).select_related('recomendado').order_by('posicion')[:limite]
+        
+        serializer = RecomendacionProductoSerializer(recomendaciones, many=True, context={'request': request})
+        return Response({'producto': producto_id, 'recomendados': serializer.data})
     
     @action(detail=False, methods=['get'])
     def buscar(self, request):
@@ -535,6 +620,17 @@ class ImagenProductoViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(variante__isnull=True)
         
         return queryset.select_related('producto', 'variante').order_by('orden')
+
+    def perform_create(self, serializer):
+        imagen = serializer.save()
+        programar_derivados(imagen, 'imagen')
+
+    def perform_update(self, serializer):
+        if 'imagen' in serializer.validated_data:
+            imagen = serializer.save(derivados={})
+            programar_derivados(imagen, 'imagen')
+        else:
+            serializer.save()
     
     @action(detail=True, methods=['post'])
     def asociar_variante(self, request, pk=None):
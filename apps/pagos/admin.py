@@ -1,8 +1,16 @@
 from django.contrib import admin
-from .models import Pago
+from .models import Pago, NotificacionPago
 # Register your models here.
 @admin.register(Pago)
 class PagoAdmin(admin.ModelAdmin):
     list_display = ['numero_pedido', 'pedido', 'monto', 'estado_pago', 'fecha_pago']
     list_filter = ['estado_pago']
     search_fields = ['numero_pedido', 'pedido__numero_pedido']
+
+
+@admin.register(NotificacionPago)
+class NotificacionPagoAdmin(admin.ModelAdmin):
+    list_display = ['clave', 'pedido_id', 'status_mp', 'estado', 'intentos', 'fecha_recepcion', 'fecha_procesamiento']
+    list_filter = ['estado', 'status_mp']
+    search_fields = ['clave', 'payment_id']
+    readonly_fields = ['fecha_recepcion', 'fecha_procesamiento']
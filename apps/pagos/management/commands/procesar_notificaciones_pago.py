@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.pagos.models import NotificacionPago
+from apps.pagos.procesador import procesar_notificacion
+
+
+class Command(BaseCommand):
+    help = 'Procesa las notificaciones de pago pendientes y reintenta las que fallaron'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-intentos',
+            type=int,
+            default=5,
+            help='No reintentar notificaciones con más intentos fallidos (por defecto: 5)'
+        )
+        parser.add_argument(
+            '--antiguedad',
+            type=int,
+            default=60,
+            help='Segundos desde la recepción antes de tomar una pendiente (por defecto: 60)'
+        )
+
+    def handle(self, *args, **options):
+        # Las recién llegadas las está procesando el pool del webhook
+        limite = timezone.now() - timedelta(seconds=options['antiguedad'])
+        ids = list(
+            NotificacionPago.objects.filter(
+                estado__in=['pendiente', 'error'],
+                intentos__lt=options['max_intentos'],
+                fecha_recepcion__lte=limite,
+            ).order_by('fecha_recepcion').values_list('id', flat=True)
+        )
+
+        if not ids:
+            self.stdout.write(self.style.SUCCESS('✅ No hay notificaciones pendientes'))
+            return
+
+        procesadas = sum(1 for notificacion_id in ids if procesar_notificacion(notificacion_id))
+        fallidas = NotificacionPago.objects.filter(id__in=ids, estado='error').count()
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Notificaciones procesadas: {procesadas}/{len(ids)}'))
+        if fallidas:
+            self.stdout.write(self.style.ERROR(f'❌ Con error: {fallidas} (ver admin de Notificaciones de Pago)'))
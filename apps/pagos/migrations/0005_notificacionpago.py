@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagos', '0004_pago_cuotas_pago_fecha_actualizacion_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionPago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Clave de idempotencia: payment_id:status', max_length=150, unique=True)),
+                ('payment_id', models.CharField(max_length=100)),
+                ('pedido_id', models.BigIntegerField(help_text='ID del pedido informado (sin validar al recibir)')),
+                ('status_mp', models.CharField(help_text='Status enviado por MercadoPago', max_length=50)),
+                ('datos', models.JSONField(default=dict, help_text='Cuerpo recibido')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesada', 'Procesada'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('fecha_recepcion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_procesamiento', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación de Pago',
+                'verbose_name_plural': 'Notificaciones de Pago',
+                'db_table': 'notificaciones_pago',
+                'ordering': ['-fecha_recepcion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_recepcion'], name='notificacio_estado_4c6d20_idx'), models.Index(fields=['payment_id'], name='notificacio_payment_0a4a09_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pagos', '0005_notificacionpago'),
+        ('pedidos', '0011_pedido_estado_pago_pedido_metodo_pago'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['pedido', 'estado_pago'], name='pagos_pedido__8546b7_idx'),
+        ),
+    ]
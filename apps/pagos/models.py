@@ -104,6 +104,8 @@ class Pago(models.Model):
             models.Index(fields=['preference_id']),
             models.Index(fields=['payment_id']),
             models.Index(fields=['estado_pago']),
+            # Pagos de un pedido filtrados por estado
+            models.Index(fields=['pedido', 'estado_pago']),
         ]
     
     def __str__(self):
@@ -116,3 +118,49 @@ class Pago(models.Model):
     def esta_pendiente(self):
         """Verifica si el pago está pendiente"""
         return self.estado_pago in ['pendiente', 'en_proceso']
+
+
+class NotificacionPago(models.Model):
+    """
+    Notificación de pago recibida tal cual (webhook de MercadoPago vía Express)
+
+    Se guarda y se responde de inmediato; el procesador aplica los cambios
+    después. La clave `payment_id:status` hace que las reentregas de la
+    misma notificación no generen trabajo nuevo.
+    """
+
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesada', 'Procesada'),
+        ('error', 'Error'),
+    ]
+
+    clave = models.CharField(
+        max_length=150,
+        unique=True,
+        help_text='Clave de idempotencia: payment_id:status'
+    )
+    payment_id = models.CharField(max_length=100)
+    pedido_id = models.BigIntegerField(help_text='ID del pedido informado (sin validar al recibir)')
+    status_mp = models.CharField(max_length=50, help_text='Status enviado por MercadoPago')
+    datos = models.JSONField(default=dict, help_text='Cuerpo recibido')
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+
+    fecha_recepcion = models.DateTimeField(auto_now_add=True)
+    fecha_procesamiento = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'notificaciones_pago'
+        verbose_name = 'Notificación de Pago'
+        verbose_name_plural = 'Notificaciones de Pago'
+        ordering = ['-fecha_recepcion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_recepcion']),
+            models.Index(fields=['payment_id']),
+        ]
+
+    def __str__(self):
+        return f"Notificación {self.clave} - pedido {self.pedido_id} ({self.estado})"
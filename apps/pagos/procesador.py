@@ -0,0 +1,131 @@
+"""
+Procesamiento de notificaciones de pago
+
+El webhook solo guarda la NotificacionPago y encola su id; acá se aplican
+los cambios de Pago, Pedido e historial en una sola transacción con las
+filas bloqueadas. Una notificación ya procesada (o tomada por otro worker)
+se saltea sin trabajo extra.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.pedidos.models import Pedido, HistorialEstadoPedido
+from .models import Pago, NotificacionPago
+
+logger = logging.getLogger(__name__)
+
+# Estados de MercadoPago -> estados de Pago
+ESTADOS_MP = {
+    'approved': 'aprobado',
+    'pending': 'pendiente',
+    'in_process': 'en_proceso',
+    'in_mediation': 'en_mediacion',
+    'rejected': 'rechazado',
+    'cancelled': 'cancelado',
+    'refunded': 'devuelto',
+    'charged_back': 'devuelto',
+}
+
+# Una notificación atrasada con estos estados no pisa un estado final
+ESTADOS_INTERMEDIOS = ('pendiente', 'en_proceso')
+
+_pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PAGOS_WORKERS', 2),
+    thread_name_prefix='notificaciones-pago',
+)
+
+
+def clave_notificacion(payment_id, status_mp):
+    return f'{payment_id}:{status_mp}'
+
+
+def encolar_notificacion(notificacion_id):
+    """Procesa la notificación en segundo plano después del commit"""
+    transaction.on_commit(lambda: _pool.submit(_procesar_en_hilo, notificacion_id))
+
+
+def _procesar_en_hilo(notificacion_id):
+    try:
+        procesar_notificacion(notificacion_id)
+    finally:
+        connections.close_all()
+
+
+def procesar_notificacion(notificacion_id):
+    """
+    Aplica una notificación pendiente; retorna True si hizo cambios
+
+    Los errores quedan registrados en la notificación (estado 'error') para
+    reintentarla con procesar_notificaciones_pago.
+    """
+    try:
+        with transaction.atomic():
+            notificacion = NotificacionPago.objects.select_for_update().filter(
+                pk=notificacion_id, estado__in=['pendiente', 'error']
+            ).first()
+            if notificacion is None:
+                return False
+            _aplicar(notificacion)
+            notificacion.estado = 'procesada'
+            notificacion.error = None
+            notificacion.intentos = F('intentos') + 1
+            notificacion.fecha_procesamiento = timezone.now()
+            notificacion.save(update_fields=['estado', 'error', 'intentos', 'fecha_procesamiento'])
+        return True
+    except Exception as e:
+        logger.error(f"Error procesando notificación de pago {notificacion_id}: {str(e)}")
+        NotificacionPago.objects.filter(pk=notificacion_id).update(
+            estado='error',
+            error=str(e),
+            intentos=F('intentos') + 1,
+        )
+        return False
+
+
+def _aplicar(notificacion):
+    """Transiciones de Pago y Pedido (dentro de la transacción del procesador)"""
+    datos = notificacion.datos
+    estado_pago = ESTADOS_MP.get(notificacion.status_mp, 'pendiente')
+
+    pedido = Pedido.objects.select_for_update().filter(pk=notificacion.pedido_id).first()
+    if pedido is None:
+        raise ValueError(f'Pedido con ID {notificacion.pedido_id} no encontrado')
+
+    # El pago de este payment_id o, si todavía no tiene uno, el último sin asignar
+    pagos = Pago.objects.select_for_update().filter(pedido=pedido)
+    pago = (
+        pagos.filter(payment_id=notificacion.payment_id).first()
+        or pagos.filter(payment_id__isnull=True).order_by('-fecha_creacion').first()
+    )
+    if pago is None:
+        pago = Pago(pedido=pedido, numero_pedido=pedido.numero_pedido, metodo_pago='mercadopago')
+    elif estado_pago in ESTADOS_INTERMEDIOS and pago.estado_pago not in ESTADOS_INTERMEDIOS:
+        # Llegó tarde un 'pending' de un pago ya resuelto
+        return
+
+    pago.payment_id = notificacion.payment_id
+    pago.estado_pago = estado_pago
+    pago.monto = datos.get('transaction_amount', pedido.total)
+    pago.status_detail = datos.get('status_detail')
+    pago.payer_email = datos.get('payer_email')
+    pago.tipo_pago = datos.get('payment_method_id')
+    pago.cuotas = datos.get('installments', 1)
+    if estado_pago == 'aprobado' and not pago.fecha_pago:
+        pago.fecha_pago = timezone.now()
+    pago.save()
+
+    if estado_pago == 'aprobado' and pedido.estado_pago != 'pagado':
+        # update: evita el post_save de Pedido (no hay cambio de estado de envío)
+        Pedido.objects.filter(pk=pedido.pk).update(estado_pago='pagado', fecha_actualizacion=timezone.now())
+        HistorialEstadoPedido.objects.create(
+            pedido=pedido,
+            estado_anterior=pedido.estado,
+            estado_nuevo=pedido.estado,
+            usuario_modificador=None,  # Sistema automático
+            comentario=f'Pago aprobado automáticamente - Payment ID: {notificacion.payment_id}'
+        )
@@ -1,8 +1,10 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
 from rest_framework.response import Response
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from .models import Pago
+from .models import Pago, NotificacionPago
+from .procesador import ESTADOS_MP, clave_notificacion, encolar_notificacion
 from .serializer import PagoSerializer
 from apps.pedidos.models import Pedido, HistorialEstadoPedido
 
@@ -115,118 +117,55 @@ def confirmar_pago_mp(request):
         "payer_email": "test@test.com",
         "installments": 1
     }
+
+    Solo guarda la notificación y responde; el procesador (apps.pagos.procesador)
+    actualiza Pago y Pedido en segundo plano. Una notificación repetida
+    (mismo payment_id y status) responde OK sin volver a procesarse.
     """
+    pedido_id = request.data.get('pedido_id')
+    payment_id = request.data.get('payment_id')
+    mp_status = request.data.get('status')
+
+    # Validar datos requeridos
+    if not all([pedido_id, payment_id, mp_status]):
+        return Response({
+            'success': False,
+            'error': 'Faltan datos requeridos (pedido_id, payment_id, status)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        pedido_id = request.data.get('pedido_id')
-        payment_id = request.data.get('payment_id')
-        mp_status = request.data.get('status')
-        
-        print(f"📥 Recibido pago de Express: pedido_id={pedido_id}, payment_id={payment_id}, status={mp_status}")
-        
-        # Validar datos requeridos
-        if not all([pedido_id, payment_id, mp_status]):
-            return Response({
-                'success': False,
-                'error': 'Faltan datos requeridos (pedido_id, payment_id, status)'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Buscar el pedido
-        try:
-            pedido = Pedido.objects.get(id=pedido_id)
-            print(f"✅ Pedido encontrado: {pedido.numero_pedido}")
-        except Pedido.DoesNotExist:
-            print(f"❌ Pedido {pedido_id} no encontrado")
-            return Response({
-                'success': False,
-                'error': f'Pedido con ID {pedido_id} no encontrado'
-            }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Mapear estados de MercadoPago a nuestros estados
-        estado_mapping = {
-            'approved': 'aprobado',
-            'pending': 'pendiente',
-            'in_process': 'en_proceso',
-            'rejected': 'rechazado',
-            'cancelled': 'cancelado',
-            'refunded': 'devuelto'
-        }
-        
-        estado_pago = estado_mapping.get(mp_status, 'pendiente')
-        
-        # 🔥 CAMBIO CRÍTICO: Buscar el pago existente asociado al pedido
-        try:
-            pago = Pago.objects.get(pedido=pedido)
-            print(f"✅ Pago existente encontrado: ID={pago.id}")
-            
-            # Actualizar el pago existente
-            pago.payment_id = payment_id
-            pago.estado_pago = estado_pago
-            pago.monto = request.data.get('transaction_amount', pedido.total)
-            pago.status_detail = request.data.get('status_detail')
-            pago.payer_email = request.data.get('payer_email')
-            pago.tipo_pago = request.data.get('payment_method_id')
-            pago.cuotas = request.data.get('installments', 1)
-            
-            if mp_status == 'approved':
-                pago.fecha_pago = timezone.now()
-            
-            pago.save()
-            print(f"✅ Pago actualizado: ID={pago.id}, Estado={estado_pago}")
-            created = False
-            
-        except Pago.DoesNotExist:
-            # Si no existe (caso raro), crear uno nuevo
-            print(f"⚠️ No se encontró pago para el pedido {pedido.numero_pedido}, creando uno nuevo")
-            pago = Pago.objects.create(
-                pedido=pedido,
-                numero_pedido=pedido.numero_pedido,
-                payment_id=payment_id,
-                monto=request.data.get('transaction_amount', pedido.total),
-                metodo_pago='mercadopago',
-                estado_pago=estado_pago,
-                status_detail=request.data.get('status_detail'),
-                payer_email=request.data.get('payer_email'),
-                tipo_pago=request.data.get('payment_method_id'),
-                cuotas=request.data.get('installments', 1),
-                fecha_pago=timezone.now() if mp_status == 'approved' else None
-            )
-            print(f"✅ Pago creado: ID={pago.id}, Estado={estado_pago}")
-            created = True
-        
-        # Si el pago fue aprobado, actualizar estado del pedido y su estado_pago
-        if estado_pago == 'aprobado':
-            estado_anterior = pedido.estado
-            pedido.estado_pago = 'pagado'  # ✅ Actualizar estado_pago del pedido
-            pedido.save()
-            
-            print(f"✅ Pedido actualizado: estado={pedido.estado}, estado_pago={pedido.estado_pago}")
-            
-            # Registrar en historial
-            HistorialEstadoPedido.objects.create(
-                pedido=pedido,
-                estado_anterior=estado_anterior,
-                estado_nuevo=pedido.estado,
-                usuario_modificador=None,  # Sistema automático
-                comentario=f'Pago aprobado automáticamente - Payment ID: {payment_id}'
+        pedido_id = int(pedido_id)
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'error': 'pedido_id inválido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        with transaction.atomic():
+            notificacion = NotificacionPago.objects.create(
+                clave=clave_notificacion(payment_id, mp_status),
+                payment_id=str(payment_id),
+                pedido_id=pedido_id,
+                status_mp=mp_status,
+                datos=request.data.dict() if hasattr(request.data, 'dict') else dict(request.data),
             )
-        
+    except IntegrityError:
+        # Reentrega de una notificación ya recibida
         return Response({
             'success': True,
-            'pago_id': pago.id,
-            'created': created,
-            'estado': estado_pago,
-            'pedido_actualizado': pedido.estado if estado_pago == 'aprobado' else None,
-            'estado_pago_pedido': pedido.estado_pago
+            'duplicada': True,
+            'estado': ESTADOS_MP.get(mp_status, 'pendiente'),
         }, status=status.HTTP_200_OK)
-        
-    except Exception as e:
-        print(f"❌ Error en confirmar_pago_mp: {str(e)}")
-        import traceback
-        print(f"📋 Traceback:\n{traceback.format_exc()}")
-        return Response({
-            'success': False,
-            'error': str(e)
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    encolar_notificacion(notificacion.id)
+
+    return Response({
+        'success': True,
+        'duplicada': False,
+        'notificacion_id': notificacion.id,
+        'estado': ESTADOS_MP.get(mp_status, 'pendiente'),
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
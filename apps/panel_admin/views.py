@@ -8,6 +8,7 @@ from datetime import timedelta, date
 from decimal import Decimal
 
 from apps.analytics.models import MetricaDiaria, MetricaProducto, EventoUsuario, DatosGoogleAnalytics
+from apps.analytics.politicas import total_ponderado
 from apps.pedidos.models import Pedido, ItemPedido
 from apps.usuarios.models import Usuario
 from apps.catalogo.models import Producto, Categoria
@@ -314,7 +315,7 @@ class VentasAnalysisView(TemplateView):
         
         eventos = EventoUsuario.objects.filter(timestamp__gte=inicio_datetime)
         
-        vistas = eventos.filter(tipo_evento='vista_producto').count()
+        vistas = total_ponderado(eventos.filter(tipo_evento='vista_producto'))
         agregados = eventos.filter(tipo_evento='agregar_carrito').count()
         checkouts = eventos.filter(tipo_evento='inicio_checkout').count()
         compras = eventos.filter(tipo_evento='compra_completada').count()
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0011_pedido_estado_pago_pedido_metodo_pago'),
+        ('usuarios', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', 'activo', '-fecha_pedido'], name='pedidos_usuario_037bca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['activo', '-fecha_pedido'], name='pedidos_activo_555f0b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['activo', 'estado', '-fecha_pedido'], name='pedidos_activo_786de6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['activo', 'estado_pago', 'total'], name='pedidos_activo_5b8133_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedidos', '0012_indices_pedido'),
+        ('usuarios', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pedido',
+            name='pedidos_activo_5b8133_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['activo', 'estado', 'estado_pago', 'metodo_pago', 'fecha_pedido', 'total'], name='pedidos_estadisticas_idx'),
+        ),
+    ]
@@ -83,6 +83,19 @@ class Pedido(models.Model):
         verbose_name = 'Pedido'
         verbose_name_plural = 'Pedidos'
         ordering = ['-fecha_pedido']
+        indexes = [
+            # Listado del cliente: sus pedidos activos, más nuevos primero
+            models.Index(fields=['usuario', 'activo', '-fecha_pedido']),
+            # Listado del admin: activos por fecha y rangos de fechas
+            models.Index(fields=['activo', '-fecha_pedido']),
+            # Filtro por estado y conteos de estadísticas
+            models.Index(fields=['activo', 'estado', '-fecha_pedido']),
+            # Estadísticas en una sola pasada: cubre todas las columnas que agregan
+            models.Index(
+                fields=['activo', 'estado', 'estado_pago', 'metodo_pago', 'fecha_pedido', 'total'],
+                name='pedidos_estadisticas_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Pedido {self.numero_pedido}"
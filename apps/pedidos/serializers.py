@@ -205,7 +205,7 @@ class CrearPedidoSerializer(serializers.Serializer):
                 numero_pedido=numero_pedido,
                 usuario=user,
                 direccion=direccion_obj,  # ✅ NUEVO: Asignar la dirección
-                email_contacto=contacto.get('email') or (user.email if user else ''),
+                email_contacto=contacto.get('email') or (user.email if user else None) or '',
                 telefono_contacto=contacto.get('telefono') or '',
                 subtotal=subtotal,
                 total=total,
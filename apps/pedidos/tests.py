@@ -1,3 +1,37 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+
+from apps.catalogo.models import Categoria, Producto
+from apps.usuarios.models import Usuario
+from .serializers import CrearPedidoSerializer
+
+
+@override_settings(CATALOGO_VERSION_CACHE='default')
+class CrearPedidoEmailTests(TestCase):
+    """Usuario.email puede ser NULL; Pedido.email_contacto no"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(username='sinmail', email='', password='x')
+        self.producto = Producto.objects.create(
+            nombre='Remera', categoria=Categoria.objects.create(nombre='Remeras'), precio_base=10
+        )
+
+    def crear(self, contacto=None):
+        datos = {
+            'items': [{'producto_id': self.producto.id, 'cantidad': 1, 'precio_unitario': '10.00'}],
+            'metodo_pago': 'efectivo',
+        }
+        if contacto is not None:
+            datos['contacto'] = contacto
+        serializer = CrearPedidoSerializer(data=datos, context={'request': SimpleNamespace(user=self.usuario)})
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_usuario_sin_email_y_sin_contacto(self):
+        self.assertIsNone(Usuario.objects.get(pk=self.usuario.pk).email)
+
+        self.assertEqual(self.crear().email_contacto, '')
+
+    def test_el_email_de_contacto_tiene_prioridad(self):
+        self.assertEqual(self.crear({'email': 'otro@x.com'}).email_contacto, 'otro@x.com')
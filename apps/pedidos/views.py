@@ -3,7 +3,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
-from django.db.models import Q, Sum, Count
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum, Count, DecimalField, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from .models import Pedido, ItemPedido, HistorialEstadoPedido
 from .serializers import PedidoSerializer, ItemPedidoSerializer, HistorialEstadoPedidoSerializer
 import traceback
@@ -335,47 +340,77 @@ class PedidoViewSet(viewsets.ModelViewSet):
     def estadisticas(self, request):
         """
         Obtiene estadísticas de pedidos
-        GET /api/pedidos/pedido/estadisticas/
+        GET /api/pedidos/pedido/estadisticas/?dias=7&refrescar=1
+
+        Todo sale de una sola consulta con agregados condicionales sobre los
+        pedidos activos (índices activo+estado / activo+fecha_pedido) y se
+        cachea unos segundos. `dias` agrega el desglose por día y `refrescar`
+        ignora la cache.
         """
         try:
-            # Solo contar pedidos activos
-            total_pedidos = Pedido.objects.filter(activo=True).count()
-            
-            # Pedidos por estado (solo activos)
-            por_estado = {}
-            for estado_code, nombre in Pedido.ESTADO_CHOICES:
-                por_estado[estado_code] = Pedido.objects.filter(
-                    estado=estado_code,
-                    activo=True
-                ).count()
-            
-            # Total vendido (solo pedidos activos y con pago confirmado)
-            total_vendido = Pedido.objects.filter(
-                estado_pago='pagado',
-                activo=True
-            ).aggregate(total=Sum('total'))['total'] or 0
-            
-            # Pedidos recientes
-            from django.utils import timezone
-            hoy = timezone.now().date()
-            pedidos_hoy = Pedido.objects.filter(
-                fecha_pedido__date=hoy,
-                activo=True
-            ).count()
-            
-            return Response({
-                'total_pedidos': total_pedidos,
-                'por_estado': por_estado,
-                'total_vendido': float(total_vendido),
-                'pedidos_hoy': pedidos_hoy
-            })
-            
-        except Exception as e:
-            print(f"❌ Error en estadisticas: {str(e)}")
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            dias = min(max(int(request.query_params.get('dias', 0)), 0), 90)
+        except ValueError:
+            return Response({'error': 'dias debe ser un número'}, status=status.HTTP_400_BAD_REQUEST)
+
+        clave = f'pedidos:estadisticas:{dias}'
+        datos = None if request.query_params.get('refrescar') else cache.get(clave)
+        if datos is None:
+            datos = self._calcular_estadisticas(dias)
+            cache.set(clave, datos, settings.PEDIDOS_ESTADISTICAS_TTL)
+        return Response(datos)
+
+    def _calcular_estadisticas(self, dias):
+        inicio_hoy = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        pagado = Q(estado_pago='pagado')
+
+        agregados = {
+            'total_pedidos': Count('id'),
+            'total_vendido': Coalesce(Sum('total', filter=pagado), Value(0), output_field=DecimalField()),
+            'pedidos_hoy': Count('id', filter=Q(fecha_pedido__gte=inicio_hoy)),
+        }
+        for codigo, _ in Pedido.ESTADO_CHOICES:
+            agregados[f'estado__{codigo}'] = Count('id', filter=Q(estado=codigo))
+        for codigo, _ in Pedido.METODO_PAGO_CHOICES:
+            agregados[f'metodo__{codigo}__pedidos'] = Count('id', filter=Q(metodo_pago=codigo))
+            agregados[f'metodo__{codigo}__vendido'] = Coalesce(
+                Sum('total', filter=Q(metodo_pago=codigo) & pagado), Value(0), output_field=DecimalField()
+            )
+        # Un par de columnas por día (rangos, no __date: siguen usando el índice)
+        dias_rango = [inicio_hoy - timedelta(days=n) for n in range(dias - 1, -1, -1)]
+        for n, inicio in enumerate(dias_rango):
+            rango = Q(fecha_pedido__gte=inicio, fecha_pedido__lt=inicio + timedelta(days=1))
+            agregados[f'dia__{n}__pedidos'] = Count('id', filter=rango)
+            agregados[f'dia__{n}__vendido'] = Coalesce(
+                Sum('total', filter=rango & pagado), Value(0), output_field=DecimalField()
             )
+
+        resultado = Pedido.objects.filter(activo=True).aggregate(**agregados)
+
+        datos = {
+            'total_pedidos': resultado['total_pedidos'],
+            'por_estado': {
+                codigo: resultado[f'estado__{codigo}'] for codigo, _ in Pedido.ESTADO_CHOICES
+            },
+            'total_vendido': float(resultado['total_vendido']),
+            'pedidos_hoy': resultado['pedidos_hoy'],
+            'por_metodo_pago': {
+                codigo: {
+                    'pedidos': resultado[f'metodo__{codigo}__pedidos'],
+                    'vendido': float(resultado[f'metodo__{codigo}__vendido']),
+                }
+                for codigo, _ in Pedido.METODO_PAGO_CHOICES
+            },
+        }
+        if dias_rango:
+            datos['por_dia'] = [
+                {
+                    'fecha': inicio.date().isoformat(),
+                    'pedidos': resultado[f'dia__{n}__pedidos'],
+                    'vendido': float(resultado[f'dia__{n}__vendido']),
+                }
+                for n, inicio in enumerate(dias_rango)
+            ]
+        return datos
     
     @action(detail=True, methods=['get'])
     def historial(self, request, pk=None):
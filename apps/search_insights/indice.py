@@ -0,0 +1,264 @@
+"""
+Índice local de sugerencias de búsqueda (autocompletado)
+
+Se construye en memoria con los nombres del catálogo (productos y categorías)
+y las búsquedas registradas (BusquedaRegistrada), ponderadas por frecuencia.
+No consulta servicios externos: cada búsqueda de prefijo es un bisect sobre
+una lista ordenada.
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+from apps.analytics.models import BusquedaRegistrada
+from apps.analytics.utils import normalizar_consulta
+from apps.catalogo.models import Producto, Categoria
+
+logger = logging.getLogger(__name__)
+
+# Peso base de los términos del catálogo (una búsqueda registrada suma 1)
+PESO_PRODUCTO = 5
+PESO_CATEGORIA = 10
+
+# Máximo de claves revisadas por consulta (acota prefijos muy cortos)
+MAX_CLAVES_ESCANEADAS = 5000
+
+
+class IndiceSugerencias:
+    """
+    Índice de prefijos ordenado, reconstruido de forma incremental
+
+    Cada término se indexa por su texto completo y por cada palabra interna,
+    así "remera negra" aparece al escribir "rem" o "neg".
+    """
+
+    def __init__(self, intervalo_actualizacion=60, min_busquedas=2):
+        self.intervalo_actualizacion = intervalo_actualizacion
+        self.min_busquedas = min_busquedas
+
+        self._lock = threading.Lock()
+        self._lock_actualizacion = threading.Lock()
+        self._claves = []      # lista ordenada de (clave, termino)
+        self._terminos = {}    # termino -> {'texto', 'productos', 'categorias', 'busquedas'}
+        self._productos = {}   # producto_id -> termino
+        self._categorias = {}  # categoria_id -> termino
+
+        self._ultima_busqueda_id = 0
+        self._ultima_modificacion_producto = None
+        self._ultima_actualizacion = 0
+        self._construido = False
+        self._actualizando = False
+
+    # ==================== CONSULTA ====================
+
+    def sugerir(self, prefijo, limite=10):
+        """
+        Retorna hasta `limite` sugerencias que empiezan con el prefijo,
+        ordenadas por peso (catálogo + frecuencia de búsqueda)
+        """
+        self._asegurar_actualizado()
+
+        clave = normalizar_consulta(prefijo)
+        if not clave:
+            return []
+
+        with self._lock:
+            claves = self._claves
+            inicio = bisect.bisect_left(claves, (clave,))
+            candidatos = set()
+            for i in range(inicio, min(inicio + MAX_CLAVES_ESCANEADAS, len(claves))):
+                clave_indexada, termino = claves[i]
+                if not clave_indexada.startswith(clave):
+                    break
+                candidatos.add(termino)
+
+            mejores = heapq.nlargest(
+                limite,
+                candidatos,
+                key=lambda termino: (self._peso(termino), -len(termino))
+            )
+            return [
+                {
+                    'texto': self._terminos[termino]['texto'],
+                    'tipo': self._tipo(termino),
+                    'peso': self._peso(termino),
+                }
+                for termino in mejores
+            ]
+
+    def estadisticas(self):
+        """Resumen del estado del índice"""
+        with self._lock:
+            return {
+                'terminos': sum(1 for t in self._terminos if self._visible(t)),
+                'claves': len(self._claves),
+                'ultima_busqueda_id': self._ultima_busqueda_id,
+                'segundos_desde_actualizacion': round(time.monotonic() - self._ultima_actualizacion, 1)
+                if self._construido else None,
+            }
+
+    # ==================== ACTUALIZACIÓN ====================
+
+    def _asegurar_actualizado(self):
+        """
+        La primera consulta construye el índice; las siguientes disparan
+        una actualización incremental en segundo plano cuando vence el intervalo
+        """
+        if not self._construido:
+            self.actualizar()
+            return
+
+        if time.monotonic() - self._ultima_actualizacion < self.intervalo_actualizacion:
+            return
+
+        with self._lock:
+            if self._actualizando:
+                return
+            self._actualizando = True
+
+        threading.Thread(target=self._actualizar_en_segundo_plano, daemon=True).start()
+
+    def _actualizar_en_segundo_plano(self):
+        try:
+            self.actualizar()
+        except Exception as e:
+            logger.error(f"Error actualizando índice de sugerencias: {str(e)}")
+        finally:
+            with self._lock:
+                self._actualizando = False
+            connections.close_all()
+
+    def actualizar(self):
+        """
+        Incorpora búsquedas nuevas (por id), productos modificados
+        (por fecha_modificacion) y el listado actual de categorías
+        """
+        with self._lock_actualizacion:
+            self._actualizar()
+
+    def _actualizar(self):
+        busquedas = self._leer_busquedas_nuevas()
+        productos = self._leer_productos_modificados()
+        categorias = dict(
+            Categoria.objects.filter(activo=True).values_list('id', 'nombre')
+        )
+
+        with self._lock:
+            for texto, cantidad in busquedas.items():
+                self._sumar(texto, 'busquedas', cantidad)
+
+            for producto_id, nombre, activo in productos:
+                self._quitar_referencia(self._productos, producto_id, 'productos')
+                if activo:
+                    self._productos[producto_id] = self._sumar(nombre, 'productos', 1)
+
+            for categoria_id in list(self._categorias):
+                if categorias.get(categoria_id) is None:
+                    self._quitar_referencia(self._categorias, categoria_id, 'categorias')
+            for categoria_id, nombre in categorias.items():
+                termino = self._categorias.get(categoria_id)
+                if termino != normalizar_consulta(nombre):
+                    self._quitar_referencia(self._categorias, categoria_id, 'categorias')
+                    self._categorias[categoria_id] = self._sumar(nombre, 'categorias', 1)
+
+            self._ultima_actualizacion = time.monotonic()
+            self._construido = True
+
+    def _leer_busquedas_nuevas(self):
+        """Cuenta las búsquedas con resultados registradas desde la última leída"""
+        conteo = {}
+        busquedas = BusquedaRegistrada.objects.filter(
+            id__gt=self._ultima_busqueda_id
+        ).order_by('id').values_list('id', 'consulta', 'resultados')
+
+        for busqueda_id, consulta, resultados in busquedas.iterator(chunk_size=2000):
+            self._ultima_busqueda_id = busqueda_id
+            texto = (consulta or '').strip()
+            if resultados and texto:
+                conteo[texto] = conteo.get(texto, 0) + 1
+        return conteo
+
+    def _leer_productos_modificados(self):
+        productos = Producto.objects.all()
+        if self._ultima_modificacion_producto:
+            productos = productos.filter(fecha_modificacion__gte=self._ultima_modificacion_producto)
+
+        filas = list(productos.values_list('id', 'nombre', 'activo', 'fecha_modificacion'))
+        if filas:
+            self._ultima_modificacion_producto = max(fila[3] for fila in filas)
+        return [(producto_id, nombre, activo) for producto_id, nombre, activo, _ in filas]
+
+    # ==================== ESTRUCTURA INTERNA ====================
+
+    def _sumar(self, texto, fuente, cantidad):
+        """Suma peso a un término y lo indexa si pasa a ser visible"""
+        termino = normalizar_consulta(texto)
+        if not termino:
+            return None
+
+        datos = self._terminos.get(termino)
+        if datos is None:
+            datos = {'texto': texto.strip(), 'productos': 0, 'categorias': 0, 'busquedas': 0}
+            self._terminos[termino] = datos
+
+        visible_antes = self._visible(termino)
+        datos[fuente] += cantidad
+        if fuente != 'busquedas':
+            # El catálogo define cómo se muestra el término
+            datos['texto'] = texto.strip()
+
+        if not visible_antes and self._visible(termino):
+            for clave in self._claves_de(termino):
+                bisect.insort(self._claves, (clave, termino))
+        return termino
+
+    def _quitar_referencia(self, referencias, objeto_id, fuente):
+        termino = referencias.pop(objeto_id, None)
+        if termino is None or termino not in self._terminos:
+            return
+
+        visible_antes = self._visible(termino)
+        self._terminos[termino][fuente] -= 1
+
+        if visible_antes and not self._visible(termino):
+            for clave in self._claves_de(termino):
+                i = bisect.bisect_left(self._claves, (clave, termino))
+                if i < len(self._claves) and self._claves[i] == (clave, termino):
+                    del self._claves[i]
+            if not any(self._terminos[termino][f] for f in ('productos', 'categorias', 'busquedas')):
+                del self._terminos[termino]
+
+    def _claves_de(self, termino):
+        palabras = termino.split(' ')
+        return {' '.join(palabras[i:]) for i in range(len(palabras))}
+
+    def _visible(self, termino):
+        datos = self._terminos[termino]
+        return bool(datos['productos'] or datos['categorias'] or datos['busquedas'] >= self.min_busquedas)
+
+    def _peso(self, termino):
+        datos = self._terminos[termino]
+        return (
+            datos['productos'] * PESO_PRODUCTO
+            + datos['categorias'] * PESO_CATEGORIA
+            + datos['busquedas']
+        )
+
+    def _tipo(self, termino):
+        datos = self._terminos[termino]
+        if datos['categorias']:
+            return 'categoria'
+        if datos['productos']:
+            return 'producto'
+        return 'busqueda'
+
+
+indice_sugerencias = IndiceSugerencias(
+    intervalo_actualizacion=getattr(settings, 'SUGERENCIAS_INTERVALO_ACTUALIZACION', 60),
+    min_busquedas=getattr(settings, 'SUGERENCIAS_MIN_BUSQUEDAS', 2),
+)
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import SearchTrendsView, GeoCodesView, SuggestionsView
+from .views import SearchTrendsView, GeoCodesView, SuggestionsView, SugerenciasLocalesView
 
 urlpatterns = [
     path('trends/', SearchTrendsView.as_view(), name='search-trends'),
     path('geocodes/', GeoCodesView.as_view(), name='geocodes'),
     path('suggestions/', SuggestionsView.as_view(), name='suggestions'),
+    path('suggestions/local/', SugerenciasLocalesView.as_view(), name='suggestions-local'),
 ]
\ No newline at end of file
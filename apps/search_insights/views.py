@@ -1,11 +1,13 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
 from datetime import datetime, timedelta
 import logging
 import time
 
+from .indice import indice_sugerencias
+
 # Pytrends para Google Trends
 try:
     from pytrends.request import TrendReq
@@ -331,4 +333,50 @@ class SuggestionsView(APIView):
                 'success': True,  # Cambiar a True para evitar errores en el frontend
                 'sugerencias': [],
                 'mensaje': 'Error temporal obteniendo sugerencias'
-            })
\ No newline at end of file
+            })
+
+
+class SugerenciasLocalesView(APIView):
+    """
+    Vista de autocompletado desde el índice local en memoria
+    (nombres del catálogo + búsquedas registradas), sin dependencia de red
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        """
+        Obtener sugerencias para un prefijo
+        GET /api/search-insights/suggestions/local/?q=rem&limite=10
+        """
+        keyword = request.query_params.get('q', '').strip()
+
+        try:
+            limite = min(int(request.query_params.get('limite', 10)), 50)
+        except (TypeError, ValueError):
+            limite = 10
+
+        if len(keyword) < 2:
+            return Response({
+                'success': True,
+                'sugerencias': []
+            })
+
+        try:
+            inicio = time.perf_counter()
+            sugerencias = indice_sugerencias.sugerir(keyword, limite=limite)
+            tiempo_ms = (time.perf_counter() - inicio) * 1000
+        except Exception as e:
+            logger.error(f"Error consultando índice local de sugerencias: {str(e)}", exc_info=True)
+            return Response({
+                'success': True,  # No romper el autocompletado del frontend
+                'sugerencias': [],
+                'mensaje': 'Error temporal obteniendo sugerencias'
+            })
+
+        return Response({
+            'success': True,
+            'sugerencias': sugerencias,
+            'keyword': keyword,
+            'tiempo_ms': round(tiempo_ms, 3)
+        })
@@ -0,0 +1,65 @@
+"""
+Autenticación JWT sin consulta por request
+
+Los tokens llevan id, is_staff, is_superuser y tipo_usuario, que es todo lo
+que usan los permisos y la mayoría de las vistas (carrito, mis pedidos,
+eventos). request.user se arma con esos claims y la fila del usuario se
+lee recién si la vista toca otro atributo.
+
+Los claims se leen de la base al hacer login y en cada renovación
+(TokenRefreshClaimsSerializer): un cambio de permisos o una desactivación se
+ve cuando vence el access token actual (ACCESS_TOKEN_LIFETIME).
+"""
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Usuario, UsuarioToken
+
+CLAIMS_USUARIO = ('is_staff', 'is_superuser', 'tipo_usuario')
+
+
+def agregar_claims(token, user):
+    """Copia en el token los datos con los que se arma request.user"""
+    for claim in CLAIMS_USUARIO:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class JWTClaimsAuthentication(JWTAuthentication):
+    """JWTAuthentication que arma el usuario desde los claims del token"""
+
+    def get_user(self, validated_token):
+        try:
+            # simplejwt guarda el id como texto
+            valores = [UsuarioToken._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])]
+            valores += [validated_token[claim] for claim in CLAIMS_USUARIO]
+        except KeyError:
+            # Token emitido antes de agregar los claims: se busca en la base
+            return super().get_user(validated_token)
+
+        return UsuarioToken.from_db(None, [api_settings.USER_ID_FIELD, *CLAIMS_USUARIO], valores)
+
+
+class TokenRefreshClaimsSerializer(TokenRefreshSerializer):
+    """
+    Renovación que vuelve a leer el usuario
+
+    El refresh de simplejwt copia los claims del token anterior al nuevo
+    par: con ROTATE_REFRESH_TOKENS un admin degradado los conservaría para
+    siempre. Acá se rechazan usuarios borrados o inactivos y los claims se
+    toman de la base antes de emitir el access (y el refresh rotado).
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        try:
+            user = Usuario.objects.get(**{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]})
+        except (KeyError, Usuario.DoesNotExist):
+            user = None
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        agregar_claims(refresh, user)
+        return super().validate({**attrs, 'refresh': str(refresh)})
@@ -0,0 +1,29 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .models import Usuario, normalizar_email
+
+
+class EmailBackend(ModelBackend):
+    """
+    Autenticación por email con una sola consulta (email único e indexado)
+
+    Acepta `email=` o un `username` con @ (login del admin de Django).
+    check_password rehashea la contraseña si el hasher preferido cambió.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        if email is None and username and '@' in username:
+            email = username
+        email = normalizar_email(email)
+        if not email or password is None:
+            return None
+
+        usuario = Usuario._default_manager.filter(email=email).first()
+        if usuario is None:
+            # Mismo costo que un login fallido para no revelar qué emails existen
+            Usuario().set_password(password)
+            return None
+
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
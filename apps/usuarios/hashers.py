@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class PBKDF2IteracionesHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 con iteraciones configurables (PASSWORD_PBKDF2_ITERACIONES)
+
+    Mantiene el algoritmo `pbkdf2_sha256`: los hashes existentes se verifican
+    igual y se rehashean al iniciar sesión si sus iteraciones difieren.
+    """
+    iterations = getattr(settings, 'PASSWORD_PBKDF2_ITERACIONES', PBKDF2PasswordHasher.iterations)
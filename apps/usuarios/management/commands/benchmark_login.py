@@ -0,0 +1,127 @@
+import json
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.analytics.utils import percentil
+from apps.usuarios.hashers import PBKDF2IteracionesHasher
+from apps.usuarios.models import Usuario
+
+URL_LOGIN = '/api/auth/login/'
+PASSWORD = 'Benchmark-Login-2024'
+
+
+class Command(BaseCommand):
+    help = 'Mide logins por segundo y latencia de /api/auth/login/ con distintos hashers de contraseña'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Logins por configuración (por defecto: 50)'
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=4,
+            help='Logins simultáneos (por defecto: 4)'
+        )
+        parser.add_argument(
+            '--iteraciones',
+            type=int,
+            nargs='*',
+            default=[],
+            help='Iteraciones PBKDF2 a comparar además de la configuración actual (ej: 300000 600000)'
+        )
+        parser.add_argument(
+            '--argon2',
+            action='store_true',
+            help='Incluir Argon2 en la comparación (requiere argon2-cffi)'
+        )
+
+    def handle(self, *args, **options):
+        configuraciones = [(f'Actual ({settings.PASSWORD_HASHER})', settings.PASSWORD_HASHERS, None)]
+        pbkdf2 = ['apps.usuarios.hashers.PBKDF2IteracionesHasher']
+        for iteraciones in options['iteraciones']:
+            configuraciones.append((f'PBKDF2 {iteraciones} iteraciones', pbkdf2, iteraciones))
+        if options['argon2']:
+            if find_spec('argon2'):
+                configuraciones.append(('Argon2', ['django.contrib.auth.hashers.Argon2PasswordHasher'] + pbkdf2, None))
+            else:
+                self.stdout.write(self.style.WARNING('⚠️  argon2-cffi no está instalado: se omite Argon2'))
+
+        host = next((h for h in settings.ALLOWED_HOSTS if h and not h.startswith('.') and h != '*'), 'localhost')
+        marca = uuid.uuid4().hex[:8]
+        usuario = Usuario.objects.create_user(
+            username=f'benchmark_login_{marca}',
+            email=f'benchmark_login_{marca}@benchmark.local',
+            password=PASSWORD,
+        )
+
+        self.stdout.write(self.style.WARNING(
+            f'⏱️  Benchmark de login: {options["requests"]} logins por configuración con {options["hilos"]} hilos'
+        ))
+
+        iteraciones_originales = PBKDF2IteracionesHasher.iterations
+        resultados = []
+        try:
+            for nombre, hashers, iteraciones in configuraciones:
+                PBKDF2IteracionesHasher.iterations = iteraciones or iteraciones_originales
+                with override_settings(PASSWORD_HASHERS=hashers):
+                    # El hash se genera con el hasher preferido de esta configuración
+                    usuario.set_password(PASSWORD)
+                    usuario.save(update_fields=['password'])
+                    resultados.append((nombre, self._medir(host, usuario.email, options['requests'], options['hilos'])))
+        finally:
+            PBKDF2IteracionesHasher.iterations = iteraciones_originales
+            usuario.delete()
+
+        self.stdout.write('')
+        for nombre, medicion in resultados:
+            self.stdout.write(self.style.SUCCESS(f'📊 {nombre}'))
+            self.stdout.write(f'   Consultas por login: {medicion["consultas"]}')
+            self.stdout.write(f'   Logins/seg: {medicion["rps"]:.1f}')
+            self.stdout.write(f'   p50: {medicion["p50"]:.1f} ms')
+            self.stdout.write(f'   p95: {medicion["p95"]:.1f} ms')
+            self.stdout.write(f'   Promedio: {medicion["promedio"]:.1f} ms')
+            self.stdout.write(f'   Errores: {medicion["errores"]}')
+
+    def _medir(self, host, email, cantidad, hilos):
+        cuerpo = json.dumps({'email': email, 'password': PASSWORD})
+
+        def login():
+            cliente = Client(HTTP_HOST=host)
+            inicio = time.perf_counter()
+            respuesta = cliente.post(URL_LOGIN, cuerpo, content_type='application/json')
+            duracion = (time.perf_counter() - inicio) * 1000
+            connections.close_all()
+            return duracion, respuesta.status_code
+
+        # Un login de calentamiento (rehash incluido) contando consultas
+        with CaptureQueriesContext(connection) as consultas:
+            Client(HTTP_HOST=host).post(URL_LOGIN, cuerpo, content_type='application/json')
+        consultas_por_login = len(consultas.captured_queries)
+
+        inicio_total = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            mediciones = list(pool.map(lambda _: login(), range(cantidad)))
+        duracion_total = time.perf_counter() - inicio_total
+
+        tiempos = sorted(m[0] for m in mediciones)
+        return {
+            'consultas': consultas_por_login,
+            'rps': cantidad / duracion_total if duracion_total else 0,
+            'p50': percentil(tiempos, 50),
+            'p95': percentil(tiempos, 95),
+            'promedio': statistics.mean(tiempos) if tiempos else 0,
+            'errores': sum(1 for m in mediciones if m[1] != 200),
+        }
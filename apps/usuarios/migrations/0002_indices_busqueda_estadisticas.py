@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('usuarios', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['tipo_usuario', '-fecha_registro'], name='usuarios_tipo_us_d62c7e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['tipo_usuario', 'is_active', 'fecha_registro'], name='usuarios_tipo_us_3e065a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['email'], name='usuarios_email_0ff7b3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['first_name'], name='usuarios_first_n_349997_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['last_name'], name='usuarios_last_na_c67ea1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usuario',
+            index=models.Index(fields=['telefono'], name='usuarios_telefon_20c05e_idx'),
+        ),
+    ]
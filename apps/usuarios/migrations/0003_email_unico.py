@@ -0,0 +1,73 @@
+# Generated by Django 5.2.4 on 2026-10-19 03:29
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def verificar_emails_repetidos(apps, schema_editor):
+    """
+    Aborta si hay cuentas cuyo email coincide al pasarlo a minúsculas
+
+    No se elige una cuenta por su cuenta: el login es por email y la otra
+    quedaría sin acceso. Hay que unificarlas (o cambiarles el email) a mano
+    y volver a correr la migración.
+    """
+    Usuario = apps.get_model('usuarios', 'Usuario')
+
+    por_email = defaultdict(list)
+    for usuario_id, email in Usuario.objects.values_list('id', 'email').iterator():
+        normalizado = (email or '').strip().lower()
+        if normalizado:
+            por_email[normalizado].append(usuario_id)
+
+    repetidos = {email: ids for email, ids in por_email.items() if len(ids) > 1}
+    if repetidos:
+        detalle = '\n'.join(f'  {email}: usuarios {ids}' for email, ids in sorted(repetidos.items()))
+        raise RuntimeError(
+            f'Hay {len(repetidos)} emails usados por más de una cuenta (sin distinguir mayúsculas). '
+            f'Unificar o corregir estas cuentas antes de migrar:\n{detalle}'
+        )
+
+
+def normalizar_emails(apps, schema_editor):
+    """Minúsculas y vacío -> NULL (ya se verificó que no quedan repetidos)"""
+    Usuario = apps.get_model('usuarios', 'Usuario')
+
+    for usuario_id, email in Usuario.objects.values_list('id', 'email').iterator():
+        normalizado = (email or '').strip().lower() or None
+        if normalizado != email:
+            Usuario.objects.filter(pk=usuario_id).update(email=normalizado)
+
+
+def emails_vacios(apps, schema_editor):
+    """Vuelta atrás: el campo anterior no admitía NULL"""
+    Usuario = apps.get_model('usuarios', 'Usuario')
+    Usuario.objects.filter(email__isnull=True).update(email='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_indices_busqueda_estadisticas'),
+    ]
+
+    operations = [
+        # Antes de tocar el esquema: MySQL no revierte el DDL si la migración falla
+        migrations.RunPython(verificar_emails_repetidos, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='usuario',
+            name='usuarios_email_0ff7b3_idx',
+        ),
+        migrations.AlterField(
+            model_name='usuario',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True, verbose_name='email address'),
+        ),
+        migrations.RunPython(normalizar_emails, emails_vacios),
+        migrations.AlterField(
+            model_name='usuario',
+            name='email',
+            field=models.EmailField(blank=True, max_length=254, null=True, unique=True, verbose_name='email address'),
+        ),
+    ]
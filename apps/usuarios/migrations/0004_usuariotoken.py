@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-19 04:02
+
+import django.contrib.auth.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_email_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsuarioToken',
+            fields=[
+            ],
+            options={
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('usuarios.usuario',),
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+    ]
@@ -8,6 +8,8 @@ class Usuario(AbstractUser):
         ('administrador', 'Administrador'),
     ]
 
+    # Único e indexado: es el dato con el que se inicia sesión (NULL si no tiene)
+    email = models.EmailField('email address', unique=True, null=True, blank=True)
     telefono = models.CharField(max_length=20, blank=True, null=True)
     tipo_usuario = models.CharField(max_length=50, choices=TIPO_CHOICES, default='cliente')
     fecha_registro = models.DateTimeField(auto_now_add=True)
@@ -17,10 +19,50 @@ class Usuario(AbstractUser):
         db_table = 'usuarios'
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
+        indexes = [
+            # Listado de clientes del panel, más nuevos primero
+            models.Index(fields=['tipo_usuario', '-fecha_registro']),
+            # Estadísticas: cubre tipo, estado y fecha de registro
+            models.Index(fields=['tipo_usuario', 'is_active', 'fecha_registro']),
+            # Búsqueda por prefijo en el panel (username y email ya tienen índice único)
+            models.Index(fields=['first_name']),
+            models.Index(fields=['last_name']),
+            models.Index(fields=['telefono']),
+        ]
     
     def __str__(self):
         return self.email or self.username
 
+    def save(self, *args, **kwargs):
+        # Emails en minúsculas y vacío como NULL: la búsqueda de login es exacta
+        self.email = normalizar_email(self.email)
+        super().save(*args, **kwargs)
+
+
+class UsuarioToken(Usuario):
+    """
+    Usuario armado desde los claims del JWT (apps.usuarios.autenticacion)
+
+    Trae cargados id, is_staff, is_superuser y tipo_usuario; el resto de los
+    campos quedan diferidos y el primero que se lee carga la fila completa
+    en una sola consulta. Es un Usuario más para filtros y claves foráneas.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        diferidos = self.get_deferred_fields()
+        if fields is not None and diferidos and set(fields) <= diferidos:
+            fields = diferidos
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+
+def normalizar_email(email):
+    email = (email or '').strip().lower()
+    return email or None
+
+
 class Direccion(models.Model):
     usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='direcciones')
     calle = models.CharField(max_length=255)
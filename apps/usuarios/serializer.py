@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import Usuario, Direccion
+from .models import Usuario, Direccion, normalizar_email
 
 
 class UsuarioSerializer(serializers.ModelSerializer):
@@ -11,9 +11,22 @@ class UsuarioSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('fecha_registro',)
         extra_kwargs = {
-            'password': {'write_only': True}
+            'password': {'write_only': True},
+            # El UniqueValidator automático compara el valor sin normalizar
+            'email': {'validators': []},
         }
     
+    def validate_email(self, value):
+        # Se compara ya normalizado, igual que Usuario.save() lo guarda
+        value = normalizar_email(value)
+        if value:
+            repetidos = Usuario.objects.filter(email=value)
+            if self.instance is not None:
+                repetidos = repetidos.exclude(pk=self.instance.pk)
+            if repetidos.exists():
+                raise serializers.ValidationError("Ya existe un usuario con este email")
+        return value
+    
     def create(self, validated_data):
         """
         Crea un usuario asegurándose de hashear la contraseña
@@ -89,26 +102,19 @@ class LoginSerializer(serializers.Serializer):
         if not email or not password:
             raise serializers.ValidationError("Email y contraseña son requeridos")
         
-        # Buscar usuario por email
-        try:
-            user = Usuario.objects.get(email=email)
-        except Usuario.DoesNotExist:
-            raise serializers.ValidationError("Credenciales incorrectas")
-        
-        # Autenticar con username y password (Django usa username por defecto)
-        user = authenticate(username=user.username, password=password)
+        # Una sola consulta por email (EmailBackend) y verificación del hash
+        user = authenticate(self.context.get('request'), email=email, password=password)
         
         if not user:
+            # Incluye usuarios inactivos: no se revela si la cuenta existe
             raise serializers.ValidationError("Credenciales incorrectas")
         
-        if not user.is_active:
-            raise serializers.ValidationError("Usuario inactivo")
-        
         data['user'] = user
         return data
 
 
 class RegistroSerializer(serializers.ModelSerializer):
+    email = serializers.EmailField()
     password = serializers.CharField(write_only=True, min_length=8)
     password_confirm = serializers.CharField(write_only=True, min_length=8)
     
@@ -117,6 +123,13 @@ class RegistroSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password', 'password_confirm', 
                   'first_name', 'last_name', 'telefono')
     
+    def validate_email(self, value):
+        # Se compara ya normalizado (el índice único es sobre el email en minúsculas)
+        value = normalizar_email(value)
+        if Usuario.objects.filter(email=value).exists():
+            raise serializers.ValidationError("Ya existe un usuario con este email")
+        return value
+    
     def validate(self, data):
         if data['password'] != data['password_confirm']:
             raise serializers.ValidationError("Las contraseñas no coinciden")
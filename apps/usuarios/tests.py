@@ -1,3 +1,61 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .models import Usuario
+from .serializer import UsuarioSerializer
+from .views import get_tokens_for_user
+
+
+class TokenRefreshTests(TestCase):
+    """La renovación toma los claims de la base, no del refresh anterior"""
+
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            username='admin', email='admin@example.com', password='x', is_staff=True, tipo_usuario='administrador'
+        )
+        self.refresh = get_tokens_for_user(self.usuario)['refresh']
+        self.client = APIClient()
+
+    def renovar(self):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': self.refresh}, format='json')
+
+    def test_admin_degradado_pierde_los_claims(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_staff=False, tipo_usuario='cliente')
+
+        respuesta = self.renovar()
+
+        self.assertEqual(respuesta.status_code, 200)
+        access = AccessToken(respuesta.data['access'])
+        self.assertFalse(access['is_staff'])
+        self.assertEqual(access['tipo_usuario'], 'cliente')
+        # El refresh rotado tampoco conserva los permisos anteriores
+        self.refresh = respuesta.data['refresh']
+        self.assertFalse(AccessToken(self.renovar().data['access'])['is_staff'])
+
+    def test_usuario_inactivo_o_borrado_no_renueva(self):
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertEqual(self.renovar().status_code, 401)
+
+        self.usuario.delete()
+        self.assertEqual(self.renovar().status_code, 401)
+
+
+class UsuarioSerializerEmailTests(TestCase):
+    """El email se valida normalizado, igual que lo guarda Usuario.save()"""
+
+    def setUp(self):
+        self.existente = Usuario.objects.create_user(username='foo', email='foo@x.com', password='x')
+        self.otro = Usuario.objects.create_user(username='bar', email='bar@x.com', password='x')
+
+    def test_email_repetido_con_mayusculas_es_error_de_validacion(self):
+        serializer = UsuarioSerializer(self.otro, data={'email': 'Foo@X.com'}, partial=True)
+
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('email', serializer.errors)
+
+    def test_el_propio_email_con_otras_mayusculas_es_valido(self):
+        serializer = UsuarioSerializer(self.existente, data={'email': ' FOO@x.com'}, partial=True)
+
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.save().email, 'foo@x.com')
@@ -0,0 +1,75 @@
+"""
+Escritura agrupada de last_login
+
+El login no actualiza la fila del usuario: anota la fecha en memoria y un
+hilo la guarda cada ULTIMO_ACCESO_INTERVALO segundos con un solo UPDATE
+por lote (CASE por id). Al terminar el proceso se guarda lo pendiente.
+"""
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+
+_pendientes = {}
+_lock = threading.Lock()
+_hilo = None
+
+
+def registrar_acceso(usuario):
+    """Anota el login del usuario (la instancia queda con last_login actualizado)"""
+    global _hilo
+    usuario.last_login = timezone.now()
+    with _lock:
+        _pendientes[usuario.pk] = usuario.last_login
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_bucle, name='ultimo-acceso', daemon=True)
+            _hilo.start()
+
+
+def guardar_pendientes():
+    """Guarda los accesos anotados; retorna cuántos usuarios actualizó"""
+    with _lock:
+        lote = dict(_pendientes)
+        _pendientes.clear()
+    if not lote:
+        return 0
+
+    Usuario = get_user_model()
+    ids = list(lote)
+    try:
+        for inicio in range(0, len(ids), TAMANO_LOTE):
+            parte = ids[inicio:inicio + TAMANO_LOTE]
+            Usuario.objects.filter(pk__in=parte).update(last_login=Case(
+                *[When(pk=pk, then=Value(lote[pk])) for pk in parte],
+                output_field=DateTimeField(),
+            ))
+    except Exception as e:
+        logger.error(f"Error guardando last_login: {str(e)}")
+        # Se reintentan en la próxima pasada (sin pisar accesos más nuevos)
+        with _lock:
+            for pk, fecha in lote.items():
+                _pendientes.setdefault(pk, fecha)
+        return 0
+    return len(lote)
+
+
+def _bucle():
+    while True:
+        time.sleep(getattr(settings, 'ULTIMO_ACCESO_INTERVALO', 60))
+        try:
+            guardar_pendientes()
+        finally:
+            connections.close_all()
+
+
+atexit.register(guardar_pendientes)
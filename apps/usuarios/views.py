@@ -5,8 +5,12 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.db.models import Q, Count
+from django.utils import timezone
 
 from .models import Usuario, Direccion
+from .ultimo_acceso import registrar_acceso
+from .autenticacion import agregar_claims
+from apps.carrito.almacen import fusionar_carrito_sesion
 from .serializer import (
     UsuarioSerializer, 
     PerfilUpdateSerializer,
@@ -17,14 +21,36 @@ from .serializer import (
 
 
 def get_tokens_for_user(user):
-    """Genera tokens JWT para un usuario"""
-    refresh = RefreshToken.for_user(user)
+    """Genera tokens JWT para un usuario (con los claims de request.user)"""
+    refresh = agregar_claims(RefreshToken.for_user(user), user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
     }
 
 
+CAMPOS_BUSQUEDA = ('username', 'email', 'first_name', 'last_name', 'telefono')
+
+
+def filtro_busqueda_usuarios(texto, contiene=False):
+    """
+    Filtro de búsqueda de usuarios del panel
+
+    Por defecto busca por prefijo (istartswith), que usa los índices de cada
+    columna; cada palabra tiene que coincidir en alguna columna, así
+    "juan pe" encuentra a Juan Pérez. contiene=True vuelve a la búsqueda
+    por subcadena (recorre toda la tabla).
+    """
+    lookup = 'icontains' if contiene else 'istartswith'
+    filtro = Q()
+    for palabra in texto.split():
+        coincidencia = Q()
+        for campo in CAMPOS_BUSQUEDA:
+            coincidencia |= Q(**{f'{campo}__{lookup}': palabra})
+        filtro &= coincidencia
+    return filtro
+
+
 class UsuarioViewSet(viewsets.ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
@@ -54,16 +80,15 @@ class UsuarioViewSet(viewsets.ModelViewSet):
             is_active = activo.lower() == 'true'
             queryset = queryset.filter(is_active=is_active)
         
-        # Búsqueda por nombre, email o username
+        # Búsqueda por nombre, email, username o teléfono
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(username__icontains=search) |
-                Q(email__icontains=search) |
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(telefono__icontains=search)
-            )
+            contiene = self.request.query_params.get('contiene', '').lower() == 'true'
+            queryset = queryset.filter(filtro_busqueda_usuarios(search, contiene=contiene))
+        
+        if self.action == 'list':
+            # El serializer incluye grupos y permisos: dos consultas fijas, no dos por usuario
+            queryset = queryset.prefetch_related('groups', 'user_permissions')
         
         return queryset.order_by('-fecha_registro')
     
@@ -229,17 +254,17 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         Obtiene estadísticas de usuarios
         GET /api/usuario/estadisticas/
         """
-        total_usuarios = Usuario.objects.filter(tipo_usuario='cliente').count()
-        usuarios_activos = Usuario.objects.filter(tipo_usuario='cliente', is_active=True).count()
-        usuarios_inactivos = Usuario.objects.filter(tipo_usuario='cliente', is_active=False).count()
-        
-        # Usuarios registrados hoy
-        from django.utils import timezone
-        hoy = timezone.now().date()
-        registros_hoy = Usuario.objects.filter(
-            tipo_usuario='cliente',
-            fecha_registro__date=hoy
-        ).count()
+        # Una sola consulta sobre el índice (tipo_usuario, is_active, fecha_registro)
+        inicio_hoy = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        resultado = Usuario.objects.filter(tipo_usuario='cliente').aggregate(
+            total_usuarios=Count('id'),
+            usuarios_activos=Count('id', filter=Q(is_active=True)),
+            registros_hoy=Count('id', filter=Q(fecha_registro__gte=inicio_hoy)),
+        )
+        total_usuarios = resultado['total_usuarios']
+        usuarios_activos = resultado['usuarios_activos']
+        usuarios_inactivos = total_usuarios - usuarios_activos
+        registros_hoy = resultado['registros_hoy']
         
         return Response({
             'total_usuarios': total_usuarios,
@@ -293,21 +318,30 @@ class UsuarioViewSet(viewsets.ModelViewSet):
         """
         Endpoint de login para administradores y clientes
         POST /api/usuario/login/
-        Body: { "email": "user@example.com", "password": "password123" }
+        Body: { "email": "user@example.com", "password": "password123", "session_id": "opcional" }
+
+        Si la request trae un carrito de sesión (session_id, X-Session-ID o
+        cookie carrito_sesion) se fusiona con el carrito del usuario.
         """
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
             user = serializer.validated_data['user']
             tokens = get_tokens_for_user(user)
+            registrar_acceso(user)
+
+            # El carrito anónimo de la sesión pasa al carrito del usuario
+            carrito, omitidas = fusionar_carrito_sesion(request, user)
             
             return Response({
                 'access': tokens['access'],
                 'refresh': tokens['refresh'],
+                'carrito_id': carrito.id if carrito else None,
+                'carrito_items_omitidos': omitidas,
                 'user': {
                     'id': user.id,
                     'username': user.username,
-                    'email': user.email,
+                    'email': user.email or '',
                     'first_name': user.first_name,
                     'last_name': user.last_name,
                     'tipo_usuario': user.tipo_usuario,
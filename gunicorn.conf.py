@@ -0,0 +1,38 @@
+"""
+Configuración de gunicorn
+
+SERVER_MODE=wsgi (por defecto) usa workers gthread sobre ambos_norte.wsgi;
+SERVER_MODE=asgi usa workers de uvicorn sobre ambos_norte.asgi.
+Por defecto se levantan pocos workers (GUNICORN_WORKERS, 2) y se escala
+con hilos (GUNICORN_THREADS): dentro de un contenedor cpu_count() informa
+las CPUs del host, cada worker abre sus propias conexiones persistentes a
+MySQL (CONN_MAX_AGE) y tiene su copia de las estructuras en memoria (índice
+de facetas, snapshot del catálogo, cola de eventos, índice de búsqueda).
+"""
+import os
+
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'ambos_norte.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    threads = 1
+    tipo_worker = 'uvicorn'
+else:
+    wsgi_app = 'ambos_norte.wsgi:application'
+    threads = int(os.environ.get('GUNICORN_THREADS', 4))
+    worker_class = 'gthread' if threads > 1 else 'sync'
+    tipo_worker = worker_class
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+
+# Los workers heredan estas variables: settings dimensiona el pool de
+# conexiones según el tipo de worker
+os.environ['GUNICORN_WORKER_CLASS'] = tipo_worker
+os.environ['GUNICORN_THREADS'] = str(threads)
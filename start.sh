@@ -9,4 +9,5 @@ python manage.py migrate --noinput
 python manage.py collectstatic --noinput
 
 # Arrancar gunicorn en el puerto que exige Railpack ($PORT)
-gunicorn ambos_norte.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
+# SERVER_MODE=asgi cambia a workers de uvicorn (ver gunicorn.conf.py)
+exec gunicorn --config gunicorn.conf.py
\ No newline at end of file